@@ -1,35 +1,58 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app.core.config import settings
-from app.crud.user import get_user_by_username
-from app.database import get_db
+from app.crud.user import get_user_by_username, get_user_by_username_async
+from app.database import get_db, get_async_db
 from app.schemas.user import TokenData
-from app.models.user import User
+from app.models.user import User, Student
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_data(token: str) -> TokenData:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
+            raise credentials_exception()
+        return TokenData(username=username)
     except JWTError:
-        raise credentials_exception
+        raise credentials_exception()
+
+# Hàm sync: FastAPI chạy trong threadpool, không chặn event loop.
+# Dùng chung session với endpoint sync nên endpoint có thể sửa current_user rồi commit.
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    token_data = _token_data(token)
     user = get_user_by_username(db, username=token_data.username)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active: 
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Bản async cho endpoint async; nạp sẵn hồ sơ sinh viên vì AsyncSession không lazy load được"""
+    token_data = _token_data(token)
+    user = await get_user_by_username_async(
+        db, token_data.username, selectinload(User.student).selectinload(Student.department)
+    )
+    if user is None:
+        raise credentials_exception()
+    return user
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)):
+    if not current_user.is_active: 
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
@@ -0,0 +1,139 @@
+import argparse
+from app.database import SessionLocal
+from app.models.academic_year import Semester
+from app.utils.academic_calculator import (
+    rebuild_cumulative_results, refresh_cpa_snapshots, rebuild_enrollment_grades
+)
+from app.utils.semester_ranking import refresh_semester_rankings
+from app.services.standing_service import evaluate_semester_standing
+from app.utils.class_statistics import rebuild_class_statistics
+
+def rebuild_cumulative(args) -> int:
+    db = SessionLocal()
+    try:
+        report = rebuild_cumulative_results(db, check_only=args.check)
+    finally:
+        db.close()
+    
+    action = "found" if args.check else "fixed"
+    print(f"Checked {report['total_students']} students, {action} {report['mismatched']} mismatched cumulative results")
+    if report["mismatched_student_ids"]:
+        print(f"Student IDs: {report['mismatched_student_ids']}")
+    return 1 if args.check and report["mismatched"] else 0
+
+def rebuild_cpa_snapshots(args) -> int:
+    db = SessionLocal()
+    try:
+        count = refresh_cpa_snapshots(db)
+    finally:
+        db.close()
+    
+    print(f"Refreshed per-semester CPA for {count} students")
+    return 0
+
+def rebuild_grades(args) -> int:
+    db = SessionLocal()
+    try:
+        count = rebuild_enrollment_grades(db)
+    finally:
+        db.close()
+    
+    print(f"Updated final grades on {count} enrollments")
+    return 0
+
+def rebuild_rankings(args) -> int:
+    db = SessionLocal()
+    try:
+        semester_ids = [semester_id for (semester_id,) in db.query(Semester.id).order_by(Semester.id).all()]
+        groups = 0
+        for semester_id in semester_ids:
+            groups += refresh_semester_rankings(db, semester_id)
+            db.commit()
+    finally:
+        db.close()
+    
+    print(f"Ranked {groups} groups across {len(semester_ids)} semesters")
+    return 0
+
+def evaluate_standing(args) -> int:
+    db = SessionLocal()
+    try:
+        semester = db.query(Semester).filter(Semester.code == args.semester_code).first()
+        if not semester:
+            print(f"Semester {args.semester_code} not found")
+            return 1
+        summary = evaluate_semester_standing(semester.id, db)
+    finally:
+        db.close()
+    
+    print(f"Evaluated {summary['evaluated']} students, {summary['warnings']} with academic warnings")
+    print(f"By level: {summary['by_level']}, by reason: {summary['by_reason']}")
+    return 0
+
+def rebuild_statistics(args) -> int:
+    db = SessionLocal()
+    try:
+        report = rebuild_class_statistics(db, check_only=args.check)
+    finally:
+        db.close()
+    
+    action = "found" if args.check else "fixed"
+    print(f"Checked {report['total_statistics']} class statistics, {action} {report['mismatched']} mismatched")
+    if report["mismatched_class_ids"]:
+        print(f"Class IDs: {report['mismatched_class_ids']}")
+    return 1 if args.check and report["mismatched"] else 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="LMS maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    cumulative_parser = subparsers.add_parser(
+        "rebuild-cumulative",
+        help="Recompute CPA running totals from all enrollments"
+    )
+    cumulative_parser.add_argument(
+        "--check", action="store_true",
+        help="Only report mismatches, do not write"
+    )
+    cumulative_parser.set_defaults(func=rebuild_cumulative)
+    
+    snapshot_parser = subparsers.add_parser(
+        "rebuild-cpa-snapshots",
+        help="Recompute CPA and cumulative credits as of each semester"
+    )
+    snapshot_parser.set_defaults(func=rebuild_cpa_snapshots)
+    
+    grades_parser = subparsers.add_parser(
+        "rebuild-enrollment-grades",
+        help="Recompute final score, grade points and letter stored on enrollments"
+    )
+    grades_parser.set_defaults(func=rebuild_grades)
+    
+    rankings_parser = subparsers.add_parser(
+        "rebuild-rankings",
+        help="Recompute semester GPA rankings for every semester"
+    )
+    rankings_parser.set_defaults(func=rebuild_rankings)
+    
+    standing_parser = subparsers.add_parser(
+        "evaluate-standing",
+        help="Evaluate academic warnings for a semester"
+    )
+    standing_parser.add_argument("semester_code", help="Semester code, e.g. 20231")
+    standing_parser.set_defaults(func=evaluate_standing)
+    
+    statistics_parser = subparsers.add_parser(
+        "rebuild-class-statistics",
+        help="Recompute per-class grade statistics from all grades"
+    )
+    statistics_parser.add_argument(
+        "--check", action="store_true",
+        help="Only report mismatches, do not write"
+    )
+    statistics_parser.set_defaults(func=rebuild_statistics)
+    
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
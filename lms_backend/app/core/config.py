@@ -3,6 +3,31 @@ from typing import Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # Mặc định suy ra từ DATABASE_URL (postgresql -> postgresql+asyncpg)
+    ASYNC_DATABASE_URL: Optional[str] = None
+    # Replica chỉ đọc cho các endpoint GET; không đặt thì mọi truy vấn đi primary
+    DATABASE_REPLICA_URL: Optional[str] = None
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CHECK_INTERVAL_SECONDS: float = 10.0
+    # Pool kết nối, mỗi process có 2 engine tới primary (sync, async) và 2 tới replica nếu có.
+    # Số kết nối tối đa mỗi process tới mỗi server =
+    #   (DB_POOL_SIZE + DB_MAX_OVERFLOW) + (DB_ASYNC_POOL_SIZE + DB_ASYNC_MAX_OVERFLOW) = 30 với mặc định;
+    # nhân với số worker (uvicorn/gunicorn) rồi so với max_connections của Postgres (mặc định 100).
+    # Engine sync phục vụ threadpool của FastAPI (40 luồng) và job nền (BACKGROUND_WORKERS),
+    # request chờ tối đa DB_POOL_TIMEOUT khi hết kết nối; engine async dùng chung ít kết nối hơn.
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_ASYNC_POOL_SIZE: int = 5
+    DB_ASYNC_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Đếm câu SQL theo request (header X-DB-Queries, Server-Timing) và tổng hợp theo route
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    # Câu SQL chạy lâu hơn ngưỡng được ghi log kèm EXPLAIN; <= 0 để tắt
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0
+    SLOW_QUERY_EXPLAIN: bool = True
+    SLOW_QUERY_MAX_ENTRIES: int = 200
     
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -16,6 +41,33 @@ class Settings(BaseSettings):
     OTP_EXPIRE_MINUTES: int = 10
     OTP_LENGTH: int = 6
 
+    BACKGROUND_WORKERS: int = 4
+    RECALCULATE_CHUNK_SIZE: int = 500
+    RECALC_QUEUE_MAX_DELAY_SECONDS: float = 2.0
+    RECALC_QUEUE_BATCH_SIZE: int = 500
+    RECALC_QUEUE_MAX_ATTEMPTS: int = 5
+    RECALC_QUEUE_RETRY_DELAY_SECONDS: float = 5.0
+    GRADING_POLICY_REFRESH_SECONDS: float = 30.0
+    PREREQUISITE_REFRESH_SECONDS: float = 30.0
+    WHAT_IF_CACHE_TTL_SECONDS: float = 300.0
+    WHAT_IF_CACHE_MAX_STUDENTS: int = 10000
+
+    # Ngưỡng xét cảnh báo học tập
+    STANDING_MIN_GPA: float = 1.0
+    STANDING_MIN_CPA: float = 1.5
+    STANDING_MAX_FAILED_CREDITS: int = 8
+    STANDING_MAX_WARNING_LEVEL: int = 3
+    STANDING_CHUNK_SIZE: int = 1000
+    DEGREE_AUDIT_CHUNK_SIZE: int = 1000
+    # Tổng số dòng (X-Total-Count) của các danh sách phân trang được cache trong khoảng này
+    PAGINATION_COUNT_TTL_SECONDS: float = 60.0
+    # Số dòng mỗi lần lấy từ server-side cursor khi xuất CSV/NDJSON
+    EXPORT_CHUNK_SIZE: int = 1000
+    # Import hàng loạt sinh viên/giảng viên: số process băm mật khẩu (0 = số CPU), số dòng mỗi transaction
+    IMPORT_HASH_WORKERS: int = 0
+    IMPORT_BATCH_SIZE: int = 500
+    IMPORT_MAX_ROWS: int = 20000
+
     class Config:
         env_file = ".env"
 
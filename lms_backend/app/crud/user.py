@@ -1,3 +1,5 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
@@ -6,6 +8,10 @@ from app.auth.security import get_password_hash
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
+async def get_user_by_username_async(db: AsyncSession, username: str, *options):
+    result = await db.execute(select(User).options(*options).where(User.username == username))
+    return result.scalars().first()
+
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
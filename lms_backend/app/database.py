@@ -1,13 +1,74 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from fastapi.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.utils.pool_metrics import (
+    InstrumentedAsyncQueuePool, InstrumentedQueuePool,
+    InstrumentedAsyncReplicaQueuePool, InstrumentedReplicaQueuePool
+)
+from app.utils.replica import ReplicaHealth
 
 DATABASE_URL = settings.DATABASE_URL
+DATABASE_REPLICA_URL = settings.DATABASE_REPLICA_URL
 
-engine = create_engine(DATABASE_URL)
+# Driver async tương ứng với driver sync của DATABASE_URL
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+
+def engine_options(url: str, poolclass=InstrumentedQueuePool, is_async: bool = False) -> dict:
+    """Tham số pool theo settings (kích thước riêng cho engine async); SQLite dùng pool mặc định của dialect"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_ASYNC_POOL_SIZE if is_async else settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_ASYNC_MAX_OVERFLOW if is_async else settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine async cho các endpoint đọc nhiều (đăng nhập, hồ sơ, điểm, lịch học, chat)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, is_async=True)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Replica chỉ đọc (tùy chọn)
+replica_engine = async_replica_engine = None
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None
+if DATABASE_REPLICA_URL:
+    replica_engine = create_engine(
+        DATABASE_REPLICA_URL, **engine_options(DATABASE_REPLICA_URL, poolclass=InstrumentedReplicaQueuePool)
+    )
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    async_replica_url = async_database_url(DATABASE_REPLICA_URL)
+    async_replica_engine = create_async_engine(
+        async_replica_url, **engine_options(async_replica_url, poolclass=InstrumentedAsyncReplicaQueuePool, is_async=True)
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker(
+        async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+replica_health = ReplicaHealth(
+    replica_engine, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_INTERVAL_SECONDS
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -16,3 +77,41 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """
+    Session cho handler chỉ đọc: replica nếu còn theo kịp primary, ngược lại primary
+
+    Không dùng cho các đường đọc có cache (transcript_cache) vì replica trễ có thể
+    nạp lại dữ liệu cũ ngay sau khi cache bị invalidate.
+    """
+    on_replica = replica_health.available()
+    db = ReplicaSessionLocal() if on_replica else SessionLocal()
+    try:
+        yield db
+    except OperationalError:
+        if on_replica:
+            replica_health.mark_failed()
+        raise
+    finally:
+        db.close()
+
+def get_read_engine():
+    """Engine cho các đọc dài tự quản lý kết nối (vd. xuất dữ liệu): replica nếu dùng được"""
+    return replica_engine if replica_health.available() else engine
+
+async def get_async_read_db():
+    on_replica = replica_health.cached()
+    if on_replica is None:
+        on_replica = await run_in_threadpool(replica_health.available)
+    async with (AsyncReplicaSessionLocal() if on_replica else AsyncSessionLocal()) as db:
+        try:
+            yield db
+        except OperationalError:
+            if on_replica:
+                replica_health.mark_failed()
+            raise
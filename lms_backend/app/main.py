@@ -1,10 +1,16 @@
 from fastapi import FastAPI, Request
-from app.database import engine, Base
+from app.core.config import settings
+from app.database import engine, async_engine, replica_engine, async_replica_engine, Base
 from app.models import (
     User, Student, Lecturer, Department, Course,
     Class, Schedule, Enrollment, Grade,
     AcademicYear, Semester, AcademicResult, CumulativeResult, Report, Tuition, Setting,
-    ChatGroup, ChatMessage, ChatGroupMember
+    ChatGroup, ChatMessage, ChatGroupMember, GradingPolicy, GradingPolicyComponent, SemesterRanking,
+    AcademicStanding, ClassGradeStatistic, Program, ProgramRequirement, CoursePrerequisite
+)
+
+from app.utils.sql_instrumentation import (
+    instrument_engine, start_request, finish_request, route_query_stats, route_key
 )
 
 app = FastAPI(title="LMS Backend")
@@ -28,13 +34,26 @@ app.add_middleware(
     expose_headers=["*"],           
 )
 
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine)
+    instrument_engine(async_replica_engine.sync_engine)
+
 @app.middleware("http")
-async def log_requests(request: Request, call_next):
-    # body = await request.body()
-    # print(f"REQUEST: {request.method} {request.url}")
-    # print(f"HEADERS: {request.headers}")
-    # print(f"BODY: {body.decode(errors='ignore')}")
-    response = await call_next(request)
+async def instrument_sql(request: Request, call_next):
+    """Đếm số câu SQL và thời gian DB của từng request, trả qua header và tổng hợp theo route"""
+    if not settings.SQL_INSTRUMENTATION_ENABLED:
+        return await call_next(request)
+
+    stats, token = start_request(request)
+    try:
+        response = await call_next(request)
+    finally:
+        finish_request(token)
+    response.headers["X-DB-Queries"] = str(stats.count)
+    response.headers["Server-Timing"] = stats.server_timing()
+    route_query_stats.record(route_key(request), stats)
     return response
 
 from app.routers import auth, students, lecturers, deans, statistics, reports, tuitions, search, chat
@@ -52,11 +71,17 @@ app.include_router(chat.router)
 from app.services.socket_service import socket_app
 app.mount("/socket.io", socket_app)
 
+from app.services.recalc_queue import recalc_queue
+
 @app.on_event("startup")
 async def startup():
     Base.metadata.create_all(bind=engine)
     print("All tables created/verified")
 
+@app.on_event("shutdown")
+def shutdown():
+    recalc_queue.stop()
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to LMS Backend"}
@@ -9,3 +9,9 @@ from app.models.report import Report
 from app.models.tuition import Tuition
 from app.models.setting import Setting
 from app.models.chat import ChatGroup, ChatMessage, ChatGroupMember
+from app.models.grading_policy import GradingPolicy, GradingPolicyComponent
+from app.models.semester_ranking import SemesterRanking
+from app.models.academic_standing import AcademicStanding
+from app.models.class_statistic import ClassGradeStatistic
+from app.models.program import Program, ProgramRequirement
+from app.models.course_prerequisite import CoursePrerequisite
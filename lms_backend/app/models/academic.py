@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, Time
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, Time, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -58,10 +58,20 @@ class Schedule(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        # 1 sinh viên chỉ đăng ký 1 lần mỗi lớp; cũng phục vụ tra cứu theo student_id
+        Index("uq_enrollments_student_class", "student_id", "class_id", unique=True),
+        Index("ix_enrollments_class_id", "class_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.user_id"))
     class_id = Column(Integer, ForeignKey("classes.id"))
+    # Điểm tổng kết tính từ grades, cập nhật cùng transaction khi Grade thay đổi
+    final_score = Column(Float, nullable=True)  # thang 10
+    grade_4 = Column(Float, nullable=True)
+    letter_grade = Column(String, nullable=True)
+    is_passed = Column(Boolean, nullable=True)  # theo điều kiện qua môn của GradingPolicy
 
     student = relationship("Student", back_populates="enrollments")
     class_ = relationship("Class", back_populates="enrollments")
@@ -69,6 +79,9 @@ class Enrollment(Base):
 
 class Grade(Base):
     __tablename__ = "grades"
+    __table_args__ = (
+        Index("uq_grades_enrollment_type", "enrollment_id", "grade_type", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     enrollment_id = Column(Integer, ForeignKey("enrollments.id"))
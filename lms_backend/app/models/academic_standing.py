@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AcademicStanding(Base):
+    """Kết quả xét cảnh báo học tập của sinh viên sau mỗi học kỳ"""
+    __tablename__ = "academic_standings"
+    __table_args__ = (
+        UniqueConstraint("student_id", "semester_id"),
+        Index("ix_academic_standings_semester_level", "semester_id", "warning_level"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("students.user_id"), nullable=False)
+    semester_id = Column(Integer, ForeignKey("semesters.id"), nullable=False)
+
+    # 0 = bình thường; tăng 1 mỗi học kỳ liên tiếp bị cảnh báo (tối đa STANDING_MAX_WARNING_LEVEL)
+    warning_level = Column(Integer, default=0, nullable=False)
+    reasons = Column(String, nullable=True)  # vd. "LOW_GPA,FAILED_CREDITS"
+
+    gpa = Column(Float, default=0.0)
+    cpa = Column(Float, default=0.0)
+    failed_credits = Column(Integer, default=0)
+
+    evaluated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    student = relationship("Student")
+    semester = relationship("Semester")
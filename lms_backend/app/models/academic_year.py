@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Date, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -33,6 +33,11 @@ class Semester(Base):
 
 class AcademicResult(Base):
     __tablename__ = "academic_results"
+    __table_args__ = (
+        Index("uq_academic_results_student_semester", "student_id", "semester_id", unique=True),
+        # Xét cả học kỳ theo thứ tự student_id (cảnh báo học tập, xếp hạng)
+        Index("ix_academic_results_semester_student", "semester_id", "student_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.user_id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -19,6 +19,9 @@ class ChatGroup(Base):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_group_timestamp", "group_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     group_id = Column(Integer, ForeignKey("chat_groups.id"), nullable=False)
@@ -31,6 +34,10 @@ class ChatMessage(Base):
 
 class ChatGroupMember(Base):
     __tablename__ = "chat_group_members"
+    __table_args__ = (
+        Index("uq_chat_group_members_group_user", "group_id", "user_id", unique=True),
+        Index("ix_chat_group_members_user_id", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     group_id = Column(Integer, ForeignKey("chat_groups.id"), nullable=False)
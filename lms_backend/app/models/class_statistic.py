@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ClassGradeStatistic(Base):
+    """Thống kê điểm của 1 lớp theo từng loại điểm, tính lại theo lô (recalc_queue) sau khi nhập điểm"""
+    __tablename__ = "class_grade_statistics"
+    __table_args__ = (UniqueConstraint("class_id", "component"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    # grade_type (midterm, final, ...) hoặc "overall" cho điểm tổng kết
+    component = Column(String, nullable=False)
+
+    count = Column(Integer, default=0, nullable=False)
+    mean = Column(Float, default=0.0, nullable=False)
+    m2 = Column(Float, default=0.0, nullable=False)  # Σ(x - mean)²
+    min_score = Column(Float, nullable=True)
+    max_score = Column(Float, nullable=True)
+    pass_count = Column(Integer, default=0, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    class_ = relationship("Class")
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from app.database import Base
+
+class CoursePrerequisite(Base):
+    """Môn tiên quyết: phải qua prerequisite_id trước khi đăng ký course_id"""
+    __tablename__ = "course_prerequisites"
+    __table_args__ = (UniqueConstraint("course_id", "prerequisite_id"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False, index=True)
+    prerequisite_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
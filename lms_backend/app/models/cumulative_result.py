@@ -12,6 +12,9 @@ class CumulativeResult(Base):
     
     cpa = Column(Float, default=0.0)  
 
+    # Σ(điểm_thang4 × tín_chỉ), tính lại theo lô (recalc_queue) sau khi điểm thay đổi
+    total_grade_points = Column(Float, default=0.0, nullable=False)
+
     total_registered_credits = Column(Integer, default=0)  
     total_completed_credits = Column(Integer, default=0)   
     total_failed_credits = Column(Integer, default=0)      
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class GradingPolicy(Base):
+    """Cách tính điểm tổng kết của 1 môn học"""
+    __tablename__ = "grading_policies"
+    # id không được dùng lại sau khi xóa (SQLite mặc định dùng lại rowid lớn nhất), cache policy khóa theo id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, unique=True)
+
+    # Số chữ số thập phân của điểm tổng kết (thang 10)
+    rounding = Column(Integer, default=1, nullable=False)
+    # Điểm tổng kết tối thiểu để qua môn (thang 10)
+    pass_score = Column(Float, default=4.0, nullable=False)
+    # Tăng mỗi lần sửa, dùng để làm mới cache
+    version = Column(Integer, default=1, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    course = relationship("Course")
+    components = relationship(
+        "GradingPolicyComponent", back_populates="policy",
+        cascade="all, delete-orphan", order_by="GradingPolicyComponent.id"
+    )
+
+class GradingPolicyComponent(Base):
+    """Trọng số của 1 loại điểm (midterm, final, ...) trong policy"""
+    __tablename__ = "grading_policy_components"
+    __table_args__ = (UniqueConstraint("policy_id", "grade_type"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    policy_id = Column(Integer, ForeignKey("grading_policies.id", ondelete="CASCADE"), nullable=False)
+    grade_type = Column(String, nullable=False)
+    weight = Column(Float, nullable=False)
+    # Điểm thành phần tối thiểu để qua môn (vd. điểm thi cuối kỳ >= 3)
+    min_score = Column(Float, nullable=True)
+
+    policy = relationship("GradingPolicy", back_populates="components")
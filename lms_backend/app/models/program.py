@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Table
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+program_requirement_courses = Table(
+    "program_requirement_courses",
+    Base.metadata,
+    Column("requirement_id", Integer, ForeignKey("program_requirements.id", ondelete="CASCADE"), primary_key=True),
+    Column("course_id", Integer, ForeignKey("courses.id"), primary_key=True),
+)
+
+class Program(Base):
+    """Chương trình đào tạo và điều kiện tốt nghiệp"""
+    __tablename__ = "programs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    code = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    department_id = Column(Integer, ForeignKey("departments.id"), nullable=True)
+
+    min_total_credits = Column(Integer, default=0, nullable=False)  # tín chỉ tích lũy tối thiểu
+    min_cpa = Column(Float, default=2.0, nullable=False)
+
+    department = relationship("Department")
+    requirements = relationship(
+        "ProgramRequirement", back_populates="program",
+        cascade="all, delete-orphan", order_by="ProgramRequirement.id"
+    )
+    students = relationship("Student", back_populates="program")
+
+class ProgramRequirement(Base):
+    """
+    1 khối kiến thức của chương trình
+
+    REQUIRED_COURSES: phải qua tất cả các môn trong danh sách
+    ELECTIVE_CREDITS: phải tích lũy đủ min_credits từ các môn trong danh sách
+    """
+    __tablename__ = "program_requirements"
+
+    id = Column(Integer, primary_key=True, index=True)
+    program_id = Column(Integer, ForeignKey("programs.id", ondelete="CASCADE"), nullable=False)
+    name = Column(String, nullable=False)
+    requirement_type = Column(String, nullable=False, default="REQUIRED_COURSES")
+    min_credits = Column(Integer, nullable=True)
+
+    program = relationship("Program", back_populates="requirements")
+    courses = relationship("Course", secondary=program_requirement_courses)
+
+    @property
+    def course_ids(self):
+        return [course.id for course in self.courses]
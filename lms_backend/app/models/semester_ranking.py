@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.database import Base
+
+class SemesterRanking(Base):
+    """Thứ hạng GPA của sinh viên trong học kỳ, theo khoa hoặc theo khóa"""
+    __tablename__ = "semester_rankings"
+    __table_args__ = (
+        UniqueConstraint("semester_id", "scope", "scope_key", "student_id"),
+        Index("ix_semester_rankings_top", "semester_id", "scope", "scope_key", "rank"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    semester_id = Column(Integer, ForeignKey("semesters.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("students.user_id"), nullable=False, index=True)
+
+    scope = Column(String, nullable=False)  # department, cohort
+    scope_key = Column(String, nullable=False)  # department_id hoặc mã khóa
+
+    gpa = Column(Float, nullable=False)
+    rank = Column(Integer, nullable=False)  # 1 = GPA cao nhất, bằng GPA thì cùng hạng
+    # % sinh viên cùng nhóm có GPA thấp hơn (100 = đứng đầu)
+    percentile = Column(Float, nullable=False)
+    group_size = Column(Integer, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    student = relationship("Student")
+    semester = relationship("Semester")
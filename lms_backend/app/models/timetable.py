@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Timetable(Base):
     __tablename__ = "timetables"
+    __table_args__ = (
+        Index("ix_timetables_class_date", "class_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("classes.id"))
@@ -1,9 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
 class Tuition(Base):
     __tablename__ = "tuitions"
+    __table_args__ = (
+        Index("uq_tuitions_student_semester", "student_id", "semester", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.user_id"), nullable=False)
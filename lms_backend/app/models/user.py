@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -6,6 +6,9 @@ from app.models.enums import UserRole
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_id", "role", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
@@ -30,6 +33,8 @@ class Student(Base):
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     student_code = Column(String, unique=True, index=True, nullable=False)
     department_id = Column(Integer, ForeignKey("departments.id"))
+    cohort = Column(String, index=True, nullable=True)  # Khóa học, vd. "K66"
+    program_id = Column(Integer, ForeignKey("programs.id"), index=True, nullable=True)
     
     user = relationship("User", back_populates="student")
     department = relationship("Department", back_populates="students")
@@ -37,6 +42,7 @@ class Student(Base):
     academic_results = relationship("AcademicResult", back_populates="student")
     cumulative_result = relationship("CumulativeResult", back_populates="student", uselist=False)
     tuitions = relationship("Tuition", back_populates="student")
+    program = relationship("Program", back_populates="students")
 
 class Lecturer(Base):
     __tablename__ = "lecturers"
@@ -2,15 +2,17 @@ from datetime import timedelta
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.auth.security import create_access_token, verify_password, get_password_hash
 from app.auth.dependencies import get_current_active_user
 from app.core.config import settings
-from app.crud.user import create_user, get_user_by_username, get_user_by_email
-from app.database import get_db
+from app.crud.user import create_user, get_user_by_username, get_user_by_email, get_user_by_username_async
+from app.database import get_db, get_async_db
 from app.schemas.user import Token, UserCreate, User, PasswordChange
 from app.models.enums import UserRole
 from app.services.otp_service import generate_otp, store_otp, verify_otp, send_otp_email
@@ -43,10 +45,11 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login")
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = get_user_by_username(db, username=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user_by_username_async(db, form_data.username)
+    # bcrypt tốn CPU, chạy ngoài event loop
+    if not user or not await run_in_threadpool(verify_password, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -60,7 +63,7 @@ async def login_for_access_token(
         email = user.email
         full_name = user.full_name or user.username
         
-        email_sent = send_otp_email(email, otp, full_name)
+        email_sent = await run_in_threadpool(send_otp_email, email, otp, full_name)
         
         if not email_sent:
             raise HTTPException(
@@ -93,7 +96,7 @@ async def login_for_access_token(
 @router.post("/verify-otp", response_model=Token)
 async def verify_otp_login(
     request: OTPVerifyRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify OTP for Dean login"""
     username = request.username
@@ -124,7 +127,7 @@ async def verify_otp_login(
     
     del pending_dean_logins[username]
     
-    user = get_user_by_username(db, username=username)
+    user = await get_user_by_username_async(db, username)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -142,10 +145,10 @@ async def verify_otp_login(
 @router.post("/resend-otp")
 async def resend_otp(
     username: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Resend OTP for Dean login"""
-    user = get_user_by_username(db, username=username)
+    user = await get_user_by_username_async(db, username)
     
     if not user:
         raise HTTPException(
@@ -164,7 +167,7 @@ async def resend_otp(
     
     email = user.email
     full_name = user.full_name or user.username
-    email_sent = send_otp_email(email, otp, full_name)
+    email_sent = await run_in_threadpool(send_otp_email, email, otp, full_name)
     
     if not email_sent:
         raise HTTPException(
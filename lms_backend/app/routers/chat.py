@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.auth.dependencies import get_current_user
+from app.database import get_db, get_async_db
+from app.auth.dependencies import get_current_user, get_current_user_async
 from app.models import ChatGroup, ChatMessage, ChatGroupMember, User, Class, Enrollment
 from app.schemas.chat import (
     ChatGroupCreate, ChatGroupResponse, ChatMessageResponse,
     ChatGroupMemberResponse, AddMembersRequest
 )
 from typing import List
-from sqlalchemy import desc
+from sqlalchemy import desc, select
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -121,15 +122,17 @@ def get_chat_groups(
     return response
 
 @router.get("/groups/{group_id}/messages", response_model=List[ChatMessageResponse])
-def get_group_messages(
+async def get_group_messages(
     group_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    member = db.query(ChatGroupMember).filter(
-        ChatGroupMember.group_id == group_id,
-        ChatGroupMember.user_id == current_user.id
-    ).first()
+    member = (await db.execute(
+        select(ChatGroupMember.id).where(
+            ChatGroupMember.group_id == group_id,
+            ChatGroupMember.user_id == current_user.id
+        )
+    )).first()
     
     if not member:
         raise HTTPException(
@@ -137,25 +140,27 @@ def get_group_messages(
             detail="You are not a member of this group"
         )
     
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.group_id == group_id
-    ).order_by(desc(ChatMessage.timestamp)).limit(100).all()
+    rows = (await db.execute(
+        select(ChatMessage, User.full_name).outerjoin(
+            User, User.id == ChatMessage.sender_id
+        ).where(
+            ChatMessage.group_id == group_id
+        ).order_by(desc(ChatMessage.timestamp)).limit(100)
+    )).all()
     
-    messages.reverse()
+    rows.reverse()
     
-    response = []
-    for msg in messages:
-        sender = db.query(User).filter(User.id == msg.sender_id).first()
-        response.append(ChatMessageResponse(
+    return [
+        ChatMessageResponse(
             id=msg.id,
             group_id=msg.group_id,
             sender_id=msg.sender_id,
-            sender_name=sender.full_name if sender else "Unknown",
+            sender_name=sender_name or "Unknown",
             encrypted_content=msg.encrypted_content,
             timestamp=msg.timestamp
-        ))
-    
-    return response
+        )
+        for msg, sender_name in rows
+    ]
 
 @router.get("/groups/{group_id}/members", response_model=List[ChatGroupMemberResponse])
 def get_group_members(
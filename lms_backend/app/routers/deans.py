@@ -2,11 +2,16 @@ from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, joinedload, selectinload
 
+from app.core.config import settings
 from app.auth.dependencies import get_current_active_user
-from app.database import get_db
+from app.database import (
+    get_db, get_read_engine, engine, async_engine, replica_engine, async_replica_engine, replica_health
+)
 from app.models.user import User, Lecturer, Student
 from app.models.academic import Department, Course, Class, Enrollment, Grade
 from app.models.academic_year import AcademicYear, Semester, AcademicResult
@@ -14,7 +19,9 @@ from app.schemas.academic import (
     CourseCreate, Course as CourseSchema,
     ClassCreate, Class as ClassSchema,
     GradeCreate, Grade as GradeSchema,
-    DepartmentCreate, Department as DepartmentSchema
+    DepartmentCreate, Department as DepartmentSchema,
+    GradingPolicyUpdate, GradingPolicy as GradingPolicySchema,
+    ProgramCreate, Program as ProgramSchema, CoursePrerequisitesUpdate
 )
 from app.schemas.academic_year import (
     AcademicYearCreate, AcademicYear as AcademicYearSchema, AcademicYearUpdate,
@@ -25,14 +32,25 @@ from app.schemas.user import UserCreate, User as UserSchema, UserUpdate
 from app.models.enums import UserRole
 from app.crud.user import create_user
 from app.crud.user import create_user
-from app.utils.academic_calculator import calculate_and_save_semester_result, calculate_all_students_in_semester
+from app.utils.academic_calculator import (
+    calculate_and_save_semester_result, calculate_all_students_in_semester,
+    refresh_enrollment_grade
+)
 from app.services.academic_service import (
     academic_year_service, semester_service, department_service, course_service
 )
 from app.services.class_service import class_service
 from app.services.tuition_service import tuition_service
+from app.services.recalc_queue import recalc_queue
+from app.utils.transcript_cache import transcript_cache
+from app.utils.class_statistics import get_class_statistics
+from app.utils.prerequisite_graph import missing_prerequisites
+from app.utils.pool_metrics import pool_metrics
+from app.utils.sql_instrumentation import route_query_stats
+from app.utils.slow_query_log import slow_query_log
+from app.utils.pagination import cached_total, set_page_headers
 from app.models.timetable import Timetable
-from app.services import dean_service
+from app.services import dean_service, job_service, standing_service, degree_audit_service, export_service, import_service
 
 
 router = APIRouter(prefix="/deans", tags=["deans"])
@@ -52,12 +70,16 @@ class DeanStudentResult(BaseModel):
 
 @router.get("/academic-results", response_model=List[DeanStudentResult])
 def list_academic_results(
+    response: Response,
     semester_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """Phân trang theo cursor: truyền lại header X-Next-Cursor; include_total=true thêm X-Total-Count"""
     check_dean_role(current_user)
     from app.services import dean_service
     
@@ -69,7 +91,13 @@ def list_academic_results(
     if not semester_id:
         return []
     
-    return dean_service.get_academic_results_by_semester(semester_id, db, skip=skip, limit=limit)
+    try:
+        page = dean_service.get_academic_results_by_semester(
+            semester_id, db, skip=skip, limit=limit, cursor=cursor, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_page_headers(response, page)
 
 @router.get("/students/{student_id}/academic-results")
 def get_student_academic_results(
@@ -86,15 +114,290 @@ def get_student_academic_results(
     
     return result
 
-@router.post("/recalculate-all-cpa")
+@router.post("/recalculate-all-cpa", status_code=status.HTTP_202_ACCEPTED)
 def recalculate_all_cpa(
+    current_user: User = Depends(get_current_active_user)
+):
+    check_dean_role(current_user)
+    from app.services import dean_service
+    return dean_service.recalculate_all_cpa()
+
+@router.get("/jobs/{job_id}")
+def get_job_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    check_dean_role(current_user)
+    job = job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/metrics/db-pool")
+def get_db_pool_metrics(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Kết nối đang dùng/rảnh, overflow, thời gian chờ và số lần timeout của pool DB"""
+    check_dean_role(current_user)
+    metrics = {"sync": pool_metrics(engine), "async": pool_metrics(async_engine.sync_engine)}
+    if replica_engine is not None:
+        metrics["replica"] = {
+            "available": replica_health.available(),
+            "sync": pool_metrics(replica_engine),
+            "async": pool_metrics(async_replica_engine.sync_engine)
+        }
+    return metrics
+
+@router.get("/metrics/recalc-queue")
+def get_recalc_queue_status(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Số khóa đang chờ/đang chờ thử lại và các khóa tính lại kết quả học kỳ đã thất bại hẳn"""
+    check_dean_role(current_user)
+    return recalc_queue.snapshot()
+
+@router.get("/metrics/db-queries", response_model=List[dict])
+def get_db_query_metrics(
+    limit: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Số câu SQL và thời gian DB theo route, route phát sinh nhiều câu SQL nhất trước"""
+    check_dean_role(current_user)
+    return route_query_stats.snapshot(limit)
+
+@router.delete("/metrics/db-queries")
+def reset_db_query_metrics(
+    current_user: User = Depends(get_current_active_user)
+):
+    check_dean_role(current_user)
+    route_query_stats.reset()
+    return {"message": "Query metrics reset"}
+
+@router.get("/metrics/slow-queries", response_model=dict)
+def get_slow_queries(
+    limit: int = 20,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Các truy vấn vượt ngưỡng SLOW_QUERY_THRESHOLD_MS, gộp theo SQL chuẩn hóa, kèm route và EXPLAIN"""
+    check_dean_role(current_user)
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "queries": slow_query_log.snapshot(limit)
+    }
+
+@router.delete("/metrics/slow-queries")
+def reset_slow_queries(
+    current_user: User = Depends(get_current_active_user)
+):
+    check_dean_role(current_user)
+    slow_query_log.reset()
+    return {"message": "Slow query log reset"}
+
+
+@router.get("/exports/{entity}")
+def export_entity(
+    entity: str,
+    format: str = "csv",
+    semester: Optional[str] = None,
+    class_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    read_engine: Engine = Depends(get_read_engine)
+):
+    """
+    Xuất students, grades, academic-results hoặc tuitions dạng CSV/NDJSON
+
+    Dữ liệu được stream từ server-side cursor trên kết nối riêng (ưu tiên replica),
+    bộ nhớ không phụ thuộc số dòng.
+    """
+    check_dean_role(current_user)
+    filters = {"semester": semester, "class_id": class_id, "department_id": department_id}
+    try:
+        prepared = export_service.prepare_export(entity, format, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if prepared is None:
+        raise HTTPException(status_code=404, detail="Export not found")
+
+    stmt, media_type = prepared
+    return StreamingResponse(
+        export_service.stream_export(read_engine, stmt, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'}
+    )
+
+@router.post("/imports/{entity}", status_code=status.HTTP_202_ACCEPTED)
+def import_entity(
+    entity: str,
+    response: Response,
+    file: UploadFile = File(...),
+    dry_run: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Import hàng loạt students hoặc lecturers từ file CSV (có tiêu đề) hoặc mảng JSON
+
+    Toàn bộ file được kiểm tra trước, lỗi trả về theo từng dòng; các dòng hợp lệ được băm mật khẩu
+    và ghi trong background job (theo dõi qua /deans/jobs/{job_id}). dry_run=true chỉ kiểm tra.
+    """
     check_dean_role(current_user)
-    from app.services import dean_service
-    return dean_service.recalculate_all_cpa(db)
+    if entity not in import_service.IMPORT_ROLES:
+        raise HTTPException(status_code=404, detail="Import not found")
+    try:
+        rows = import_service.parse_import_file(file.file.read(), file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    report = import_service.start_import(db, entity, rows, dry_run)
+    if report["job"] is None:
+        response.status_code = status.HTTP_200_OK
+    return report
+
+@router.get("/rankings", response_model=List[dict])
+def list_top_rankings(
+    semester_id: int,
+    scope_key: str,
+    scope: str = "department",
+    limit: int = 10,
+    min_percentile: Optional[float] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Top sinh viên theo GPA của học kỳ trong 1 khoa (scope_key = department_id) hoặc 1 khóa"""
+    check_dean_role(current_user)
+    try:
+        return dean_service.get_top_rankings(
+            semester_id, scope, scope_key, db, limit=limit, min_percentile=min_percentile
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/rankings/students/{student_id}", response_model=List[dict])
+def get_student_rankings(
+    student_id: int,
+    semester_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    rankings = dean_service.get_student_rankings(semester_id, student_id, db)
+    if not rankings:
+        raise HTTPException(status_code=404, detail="Ranking not found")
+    return rankings
+
+@router.post("/semesters/{semester_id}/academic-standing", status_code=status.HTTP_202_ACCEPTED)
+def evaluate_academic_standing(
+    semester_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Xét cảnh báo học tập của học kỳ trong background"""
+    check_dean_role(current_user)
+    if not db.query(Semester).filter(Semester.id == semester_id).first():
+        raise HTTPException(status_code=404, detail="Semester not found")
+    return standing_service.start_standing_job(semester_id)
+
+@router.get("/academic-standing", response_model=List[dict])
+def list_academic_standing(
+    semester_id: int,
+    min_level: int = 1,
+    reason: Optional[str] = None,
+    department_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    try:
+        return standing_service.list_academic_standings(
+            semester_id, db, min_level=min_level, reason=reason,
+            department_id=department_id, skip=skip, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# --- Programs & Degree Audit ---
+@router.get("/programs", response_model=List[ProgramSchema])
+def list_programs(
+    department_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    return degree_audit_service.list_programs(db, department_id=department_id)
+
+@router.post("/programs", response_model=ProgramSchema)
+def create_program(
+    program_in: ProgramCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    try:
+        return degree_audit_service.create_program(program_in, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/programs/{program_id}", response_model=ProgramSchema)
+def get_program(
+    program_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    program = degree_audit_service.get_program(program_id, db)
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    return program
+
+@router.put("/programs/{program_id}", response_model=ProgramSchema)
+def update_program(
+    program_id: int,
+    program_in: ProgramCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    try:
+        program = degree_audit_service.update_program(program_id, program_in, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not program:
+        raise HTTPException(status_code=404, detail="Program not found")
+    return program
+
+@router.get("/students/{student_id}/degree-audit", response_model=dict)
+def get_student_degree_audit(
+    student_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    audit = degree_audit_service.get_student_audit(student_id, db)
+    if not audit:
+        raise HTTPException(status_code=404, detail="Student or program not found")
+    return audit
+
+@router.get("/degree-audit", response_model=dict)
+def audit_cohort(
+    cohort: Optional[str] = None,
+    program_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    eligible_only: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Xét tốt nghiệp cho cả khóa và/hoặc chương trình trong 1 lượt"""
+    check_dean_role(current_user)
+    try:
+        return degree_audit_service.audit_cohort(
+            db, cohort=cohort, program_id=program_id,
+            department_id=department_id, eligible_only=eligible_only
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 def check_dean_role(user: User):
 
@@ -212,6 +515,77 @@ def delete_course(
         
     return {"message": "Course deleted"}
 
+@router.get("/courses/{course_id}/grading-policy", response_model=GradingPolicySchema)
+def get_grading_policy(
+    course_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    policy = dean_service.get_grading_policy(course_id, db)
+    if not policy:
+        raise HTTPException(status_code=404, detail="Grading policy not found")
+    return policy
+
+@router.put("/courses/{course_id}/grading-policy", status_code=status.HTTP_202_ACCEPTED)
+def save_grading_policy(
+    course_id: int,
+    policy_in: GradingPolicyUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    try:
+        saved = dean_service.save_grading_policy(course_id, policy_in, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not saved:
+        raise HTTPException(status_code=404, detail="Course not found")
+    
+    policy, job = saved
+    return {"policy": GradingPolicySchema.model_validate(policy), "job": job}
+
+@router.delete("/courses/{course_id}/grading-policy", status_code=status.HTTP_202_ACCEPTED)
+def delete_grading_policy(
+    course_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    job = dean_service.delete_grading_policy(course_id, db)
+    if not job:
+        raise HTTPException(status_code=404, detail="Grading policy not found")
+    return {"message": "Grading policy deleted", "job": job}
+
+@router.get("/courses/{course_id}/prerequisites", response_model=List[CourseSchema])
+def get_course_prerequisites(
+    course_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    prerequisites = dean_service.get_course_prerequisites(course_id, db)
+    if prerequisites is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return prerequisites
+
+@router.put("/courses/{course_id}/prerequisites", response_model=List[CourseSchema])
+def set_course_prerequisites(
+    course_id: int,
+    prerequisites_in: CoursePrerequisitesUpdate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Thay danh sách môn tiên quyết trực tiếp của môn học"""
+    check_dean_role(current_user)
+    try:
+        prerequisites = dean_service.set_course_prerequisites(course_id, prerequisites_in.prerequisite_ids, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if prerequisites is None:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return prerequisites
+
 # --- Lecturer Management ---
 @router.post("/lecturers", response_model=UserSchema)
 def create_lecturer(
@@ -227,13 +601,21 @@ def create_lecturer(
 
 @router.get("/lecturers", response_model=List[UserSchema])
 def list_lecturers(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """Phân trang theo cursor: truyền lại header X-Next-Cursor; include_total=true thêm X-Total-Count"""
     check_dean_role(current_user)
-    return dean_service.list_lecturers(db, skip=skip, limit=limit)
+    try:
+        page = dean_service.list_lecturers(db, skip=skip, limit=limit, cursor=cursor, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_page_headers(response, page)
 
 @router.put("/lecturers/{user_id}", response_model=UserSchema)
 def update_lecturer(
@@ -288,13 +670,21 @@ def create_student(
 
 @router.get("/students", response_model=List[UserSchema])
 def list_students(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """Phân trang theo cursor: truyền lại header X-Next-Cursor; include_total=true thêm X-Total-Count"""
     check_dean_role(current_user)
-    return dean_service.list_students(db, skip=skip, limit=limit)
+    try:
+        page = dean_service.list_students(db, skip=skip, limit=limit, cursor=cursor, include_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_page_headers(response, page)
 
 @router.put("/students/{user_id}", response_model=UserSchema)
 def update_student(
@@ -353,19 +743,23 @@ def create_class(
 
 @router.get("/classes", response_model=List[ClassSchema])
 def list_classes(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """Phân trang theo cursor: truyền lại header X-Next-Cursor; include_total=true thêm X-Total-Count"""
     check_dean_role(current_user)
-    check_dean_role(current_user)
-    classes = class_service.get_multi(db, skip=skip, limit=limit)
-    
-    for c in classes:
-        c.enrolled_count = db.query(Enrollment).filter(Enrollment.class_id == c.id).count()
-        
-    return classes
+    try:
+        page = class_service.get_page_with_counts(db, cursor=cursor, skip=skip, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if include_total:
+        page = page._replace(total=cached_total(("classes",), db.query(Class)))
+    return set_page_headers(response, page)
 
 @router.put("/classes/{class_id}", response_model=ClassSchema)
 def update_class(
@@ -441,16 +835,24 @@ def bulk_enroll_students(
     if current_count + len(student_ids) > db_class.max_students:
         raise HTTPException(status_code=400, detail=f"Class capacity exceeded. Remaining slots: {db_class.max_students - current_count}")
 
-    added_count = 0
-    for student_id in student_ids:
-        student = db.query(Student).filter(Student.user_id == student_id).first()
-        if not student:
-            continue 
-            
-        existing = db.query(Enrollment).filter(Enrollment.class_id == class_id, Enrollment.student_id == student_id).first()
-        if existing:
-            continue
+    known = {sid for (sid,) in db.query(Student.user_id).filter(Student.user_id.in_(student_ids)).all()}
+    enrolled = {sid for (sid,) in db.query(Enrollment.student_id).filter(
+        Enrollment.class_id == class_id, Enrollment.student_id.in_(student_ids)
+    ).all()}
+    candidates = [sid for sid in dict.fromkeys(student_ids) if sid in known and sid not in enrolled]
+
+    # Kiểm tra môn tiên quyết cho cả lô: 1 truy vấn môn đã qua + phép trừ tập với bao đóng tính sẵn
+    missing = missing_prerequisites(db, db_class.course_id, candidates)
+    if missing:
+        codes = dict(db.query(Course.id, Course.code).filter(Course.id.in_(set().union(*missing.values()))).all())
+        details = "; ".join(
+            f"student ID {sid}: {', '.join(sorted(codes.get(cid, str(cid)) for cid in courses))}"
+            for sid, courses in list(missing.items())[:10]
+        )
+        raise HTTPException(status_code=400, detail=f"Missing prerequisites for {len(missing)} students ({details})")
 
+    added_count = 0
+    for student_id in candidates:
         if class_service.check_schedule_conflict(db, student_id, class_id):
 
              raise HTTPException(status_code=400, detail=f"Schedule conflict detected for student ID {student_id}")
@@ -460,6 +862,8 @@ def bulk_enroll_students(
         added_count += 1
         
     db.commit()
+    for student_id in student_ids:
+        transcript_cache.invalidate(student_id)
 
     if db_class.semester:
         for student_id in student_ids:
@@ -477,7 +881,9 @@ def list_class_students(
     db: Session = Depends(get_db)
 ):
     check_dean_role(current_user)
-    results = db.query(User).join(Student).join(Enrollment).filter(Enrollment.class_id == class_id).all()
+    results = db.query(User).join(Student).join(Enrollment).options(
+        joinedload(User.student)
+    ).filter(Enrollment.class_id == class_id).all()
     return results
 
 @router.put("/grades/{grade_id}", response_model=GradeSchema)
@@ -492,10 +898,11 @@ def update_grade(
     db_grade = db.query(Grade).filter(Grade.id == grade_id).first()
     if not db_grade:
         raise HTTPException(status_code=404, detail="Grade not found")
-        
+    
     if 'score' in grade_in:
         db_grade.score = grade_in['score']
     
+    refresh_enrollment_grade(db_grade.enrollment, db)
     db.commit()
     db.refresh(db_grade)
     
@@ -504,7 +911,7 @@ def update_grade(
         class_obj = enrollment.class_
         semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
         if semester:
-            calculate_and_save_semester_result(enrollment.student_id, semester.id, db)
+            recalc_queue.enqueue(enrollment.student_id, semester.id, enrollment.class_id)
     except Exception as e:
         print(f"ERROR calculating academic result: {e}")
     
@@ -532,6 +939,7 @@ def create_grade(
 
     db_grade = Grade(**grade_in.dict())
     db.add(db_grade)
+    refresh_enrollment_grade(enrollment, db)
     db.commit()
     db.refresh(db_grade)
     
@@ -539,12 +947,36 @@ def create_grade(
         class_obj = enrollment.class_
         semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
         if semester:
-            calculate_and_save_semester_result(enrollment.student_id, semester.id, db)
+            recalc_queue.enqueue(enrollment.student_id, semester.id, enrollment.class_id)
     except Exception as e:
         print(f"ERROR calculating academic result: {e}")
     
     return db_grade
 
+@router.delete("/grades/{grade_id}")
+def delete_grade(
+    grade_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    
+    if not dean_service.delete_grade(grade_id, db):
+        raise HTTPException(status_code=404, detail="Grade not found")
+    
+    return {"message": "Grade deleted"}
+
+@router.get("/classes/{class_id}/statistics", response_model=List[dict])
+def view_class_statistics(
+    class_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    check_dean_role(current_user)
+    if not db.query(Class).filter(Class.id == class_id).first():
+        raise HTTPException(status_code=404, detail="Class not found")
+    return get_class_statistics(db, class_id)
+
 # --- Grade Management ---
 @router.get("/classes/{class_id}/grades", response_model=List[dict])
 def view_class_grades(
@@ -558,7 +990,10 @@ def view_class_grades(
     if not class_obj:
         raise HTTPException(status_code=404, detail="Class not found")
 
-    enrollments = db.query(Enrollment).filter(Enrollment.class_id == class_id).all()
+    enrollments = db.query(Enrollment).options(
+        joinedload(Enrollment.student).joinedload(Student.user),
+        selectinload(Enrollment.grades)
+    ).filter(Enrollment.class_id == class_id).all()
     
     results = []
     for enrollment in enrollments:
@@ -567,7 +1002,9 @@ def view_class_grades(
             "student_id": enrollment.student.user.id,
             "student_code": enrollment.student.student_code,
             "full_name": enrollment.student.user.full_name,
-            "full_name": enrollment.student.user.full_name,
+            "final_score": enrollment.final_score,
+            "score_4": enrollment.grade_4,
+            "letter_grade": enrollment.letter_grade,
             "grades": [
                 {
                     "id": g.id, 
@@ -588,10 +1025,10 @@ def get_class(
     db: Session = Depends(get_db)
 ):
     check_dean_role(current_user)
-    db_class = db.query(Class).filter(Class.id == class_id).first()
+    db_class = db.query(Class).options(joinedload(Class.course)).filter(Class.id == class_id).first()
     if not db_class:
         raise HTTPException(status_code=404, detail="Class not found")
-    return db_class
+    return class_service.attach_enrolled_counts(db, [db_class])[0]
 
 # ============= ACADEMIC YEAR MANAGEMENT =============
 
@@ -772,13 +1209,15 @@ def calculate_student_semester_result(
     
     try:
         result = calculate_and_save_semester_result(student_id, semester_id, db)
-        return {
-            "message": "Result calculated successfully",
-            "gpa": result.gpa,
-            "cpa": result.cpa
-        }
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Student has no enrollments in this semester")
+    return {
+        "message": "Result calculated successfully",
+        "gpa": result.gpa,
+        "cpa": result.cpa
+    }
 
 @router.get("/students/{student_id}/results", response_model=List[AcademicResultDetail])
 def get_student_results(
@@ -791,7 +1230,9 @@ def get_student_results(
     if not db.query(Student).filter(Student.user_id == student_id).first():
         raise HTTPException(status_code=404, detail="Student not found")
     
-    results = db.query(AcademicResult).filter(
+    results = db.query(AcademicResult).options(
+        joinedload(AcademicResult.semester)
+    ).filter(
         AcademicResult.student_id == student_id
     ).join(Semester).order_by(Semester.start_date).all()
     
@@ -2,7 +2,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.auth.dependencies import get_current_active_user
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.enums import UserRole
 from app.schemas.academic import Class as ClassSchema
@@ -27,7 +27,7 @@ def get_lecturer_profile(
 @router.get("/my-classes", response_model=List[ClassSchema])
 def get_my_classes(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     check_lecturer_role(current_user)
     lecturer = current_user.lecturer
@@ -40,7 +40,7 @@ def get_my_classes(
 def get_class_students(
     class_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy danh sách sinh viên trong lớp kèm điểm số"""
     check_lecturer_role(current_user)
@@ -55,11 +55,26 @@ def get_class_students(
 def get_class_grades(
     class_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     check_lecturer_role(current_user)
     return lecturer_service.get_class_grades(class_id, db)
 
+@router.get("/classes/{class_id}/statistics")
+def get_class_statistics(
+    class_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Thống kê điểm của lớp theo từng loại điểm (trung bình, độ lệch chuẩn, min/max, tỉ lệ qua)"""
+    check_lecturer_role(current_user)
+    statistics = lecturer_service.get_class_statistics(class_id, current_user.id, db)
+    
+    if statistics is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    
+    return statistics
+
 @router.put("/grades")
 @router.post("/grades")
 def add_or_update_grade(
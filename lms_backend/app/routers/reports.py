@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from app.auth.dependencies import get_current_active_user
 from app.database import get_db
@@ -7,6 +7,7 @@ from app.models.user import User
 from app.models.enums import UserRole
 from app.schemas.report import ReportCreate, ReportUpdate, ReportResponse, ReportStats
 from app.services import report_service
+from app.utils.pagination import set_page_headers
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -49,16 +50,26 @@ def get_my_reports(
 
 @router.get("/all", response_model=List[ReportResponse])
 def get_all_reports(
+    response: Response,
     status: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
+    """Mới nhất trước, phân trang theo cursor (header X-Next-Cursor, X-Total-Count khi include_total=true)"""
     if current_user.role != UserRole.DEAN:
         raise HTTPException(status_code=403, detail="Only deans can view all reports")
     
-    return report_service.get_all_reports(status, db, skip=skip, limit=limit)
+    try:
+        page = report_service.get_all_reports(
+            status, db, skip=skip, limit=limit, cursor=cursor, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return set_page_headers(response, page)
 
 @router.get("/stats", response_model=ReportStats)
 def get_report_stats(
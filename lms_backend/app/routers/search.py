@@ -1,13 +1,14 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, func
 
 from app.auth.dependencies import get_current_active_user
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User, Lecturer
 from app.models.academic import Course, Class
 from app.models.enums import UserRole
+from app.services.class_service import class_service
 
 router = APIRouter(prefix="/students/search", tags=["students"])
 
@@ -21,7 +22,7 @@ def search(
     q: str = Query(..., min_length=1, description="Search query"),
     type: str = Query("all", description="Search type: all, course, lecturer, class"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Tìm kiếm học phần, giảng viên, lớp học
@@ -63,7 +64,9 @@ def search(
     
     # Tìm kiếm giảng viên
     if type in ["all", "lecturer"]:
-        lecturers = db.query(User).join(Lecturer).filter(
+        lecturers = db.query(User).join(Lecturer).options(
+            joinedload(User.lecturer).joinedload(Lecturer.department)
+        ).filter(
             User.role == UserRole.LECTURER,
             or_(
                 User.full_name.ilike(search_term),
@@ -83,13 +86,17 @@ def search(
     
     # Tìm kiếm lớp học
     if type in ["all", "class"]:
-        classes = db.query(Class).join(Course).filter(
+        classes = db.query(Class).join(Course).options(
+            joinedload(Class.course),
+            joinedload(Class.lecturer).joinedload(Lecturer.user)
+        ).filter(
             or_(
                 Class.code.ilike(search_term),
                 Course.name.ilike(search_term),
                 Class.semester.ilike(search_term)
             )
         ).limit(10).all()
+        enrolled_counts = class_service.get_enrolled_counts(db, [cls.id for cls in classes])
         
         results["classes"] = [
             {
@@ -104,7 +111,7 @@ def search(
                 "end_period": cls.end_period,
                 "room": cls.room,
                 "max_students": cls.max_students,
-                "enrolled_count": len(cls.enrollments) if cls.enrollments else 0
+                "enrolled_count": enrolled_counts.get(cls.id, 0)
             }
             for cls in classes
         ]
@@ -1,12 +1,14 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.auth.dependencies import get_current_active_user
-from app.database import get_db
+from app.database import get_read_db
 from app.models.user import User, Student, Lecturer
 from app.models.academic import Course, Class, Department
 from app.models.enums import UserRole
+from app.services import statistics_service
 
 router = APIRouter(prefix="/deans/statistics", tags=["deans"])
 
@@ -17,7 +19,7 @@ def check_dean_role(user: User):
 @router.get("")
 def get_statistics(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     check_dean_role(current_user)
     
@@ -38,7 +40,7 @@ def get_statistics(
 @router.get("/charts")
 def get_chart_statistics(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Lấy dữ liệu thống kê cho biểu đồ dashboard"""
     check_dean_role(current_user)
@@ -87,3 +89,23 @@ def get_chart_statistics(
         "overview_comparison": overview_comparison
     }
 
+@router.get("/grade-distribution")
+def get_grade_distribution(
+    group_by: str = "course",
+    semester_code: Optional[str] = None,
+    course_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    bin_width: float = 1.0,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    """Phân bố điểm chữ và điểm tổng kết theo môn học, lớp, khoa hoặc học kỳ"""
+    check_dean_role(current_user)
+    try:
+        return statistics_service.get_grade_distribution(
+            db, group_by=group_by, semester_code=semester_code, course_id=course_id,
+            class_id=class_id, department_id=department_id, bin_width=bin_width
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
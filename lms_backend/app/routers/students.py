@@ -1,21 +1,21 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.auth.dependencies import get_current_active_user
-from app.database import get_db
+from app.auth.dependencies import get_current_active_user, get_current_active_user_async
+from app.database import get_db, get_read_db, get_async_read_db
 from app.models.user import User
 from app.models.enums import UserRole
-from app.schemas.academic import MobileGradeResponse, MobileClassResponse, MobileTimetableResponse
+from app.schemas.academic import MobileGradeResponse, MobileClassResponse, MobileTimetableResponse, WhatIfRequest
 from app.schemas.academic_year import MobileSemesterDetailResponse
 from app.schemas.user import UserUpdate, User as UserSchema
-from app.services import student_service
+from app.services import student_service, what_if_service, degree_audit_service
 
 router = APIRouter(prefix="/students", tags=["students"])
 
 @router.get("/me", response_model=UserSchema)
-def read_student_profile(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def read_student_profile(
+    current_user: User = Depends(get_current_active_user_async)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -57,9 +57,9 @@ def update_student_profile(
     return current_user
 
 @router.get("/my-grades", response_model=List[MobileGradeResponse])
-def read_student_grades(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def read_student_grades(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -68,12 +68,12 @@ def read_student_grades(
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
 
-    return student_service.get_student_grades(student.user_id, db)
+    return await student_service.get_student_grades_async(student.user_id, db)
 
 @router.get("/my-classes", response_model=List[MobileClassResponse])
 def read_student_classes(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -87,7 +87,7 @@ def read_student_classes(
 @router.get("/my-projects", response_model=List[MobileClassResponse])
 def read_student_projects(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -101,7 +101,7 @@ def read_student_projects(
 @router.get("/academic-summary")
 def get_academic_summary(
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -116,7 +116,7 @@ def get_academic_summary(
 def read_student_semester_detail(
     semester_code: str,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -131,10 +131,48 @@ def read_student_semester_detail(
     
     return result
 
-@router.get("/my-timetable", response_model=List[MobileTimetableResponse])
-def read_student_timetable(
+@router.post("/what-if")
+def simulate_what_if(
+    request: WhatIfRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """GPA/CPA dự kiến với các điểm giả định cho các môn của học kỳ"""
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    student = current_user.student
+    if not student:
+        raise HTTPException(status_code=404, detail="Student profile not found")
+    
+    try:
+        result = what_if_service.simulate(student.user_id, request, db)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result:
+        raise HTTPException(status_code=404, detail="Semester not found")
+    
+    return result
+
+@router.get("/degree-audit")
+def read_degree_audit(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
+):
+    """Tiến độ hoàn thành chương trình đào tạo và điều kiện tốt nghiệp"""
+    if current_user.role != UserRole.STUDENT:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    
+    audit = degree_audit_service.get_student_audit(current_user.id, db)
+    if not audit:
+        raise HTTPException(status_code=404, detail="Student is not assigned to a program")
+    
+    return audit
+
+@router.get("/my-timetable", response_model=List[MobileTimetableResponse])
+async def read_student_timetable(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     if current_user.role != UserRole.STUDENT:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -143,4 +181,4 @@ def read_student_timetable(
     if not student:
         raise HTTPException(status_code=404, detail="Student profile not found")
 
-    return student_service.get_student_timetable(student.user_id, db)
+    return await student_service.get_student_timetable_async(student.user_id, db)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.database import get_db
 from app.models.user import User, UserRole
 from app.auth.dependencies import get_current_user, get_current_active_user
 from app.services.tuition_service import tuition_service
+from app.utils.pagination import set_page_headers
 from app.schemas.tuition import TuitionResponse, TuitionUpdate, TuitionSettings
 
 router = APIRouter(
@@ -24,17 +25,25 @@ def get_my_tuitions(
 
 @router.get("/deans/tuitions", response_model=List[TuitionResponse])
 def get_all_tuitions(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     if current_user.role != UserRole.DEAN:
         raise HTTPException(status_code=403, detail="Not authorized")
         
-    tuitions = tuition_service.get_all_tuitions(db, skip=skip, limit=limit)
+    try:
+        page = tuition_service.get_all_tuitions(
+            db, skip=skip, limit=limit, cursor=cursor, include_total=include_total
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return tuitions
+    return set_page_headers(response, page)
 
 @router.put("/deans/tuitions/{tuition_id}", response_model=TuitionResponse)
 def update_tuition_payment(
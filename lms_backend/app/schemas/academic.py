@@ -29,6 +29,9 @@ class Course(CourseBase):
     class Config:
         from_attributes = True
 
+class CoursePrerequisitesUpdate(BaseModel):
+    prerequisite_ids: List[int] = []
+
 # Class
 class ClassBase(BaseModel):
     code: str
@@ -67,6 +70,74 @@ class Grade(GradeBase):
     class Config:
         from_attributes = True
 
+# Grading Policy
+class GradingPolicyComponentBase(BaseModel):
+    grade_type: str
+    weight: float
+    min_score: Optional[float] = None
+
+class GradingPolicyComponent(GradingPolicyComponentBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+class GradingPolicyBase(BaseModel):
+    rounding: int = 1
+    pass_score: float = 4.0
+
+class GradingPolicyUpdate(GradingPolicyBase):
+    components: List[GradingPolicyComponentBase]
+
+class GradingPolicy(GradingPolicyBase):
+    id: int
+    course_id: int
+    version: int
+    components: List[GradingPolicyComponent] = []
+    class Config:
+        from_attributes = True
+
+# Program / degree audit
+class ProgramRequirementBase(BaseModel):
+    name: str
+    requirement_type: str = "REQUIRED_COURSES"  # REQUIRED_COURSES | ELECTIVE_CREDITS
+    min_credits: Optional[int] = None
+    course_ids: List[int] = []
+
+class ProgramRequirement(ProgramRequirementBase):
+    id: int
+    class Config:
+        from_attributes = True
+
+class ProgramBase(BaseModel):
+    code: str
+    name: str
+    department_id: Optional[int] = None
+    min_total_credits: int = 0
+    min_cpa: float = 2.0
+
+class ProgramCreate(ProgramBase):
+    requirements: List[ProgramRequirementBase] = []
+
+class Program(ProgramBase):
+    id: int
+    requirements: List[ProgramRequirement] = []
+    class Config:
+        from_attributes = True
+
+# What-if GPA
+class WhatIfScore(BaseModel):
+    course_code: str
+    grade_type: str = "final"
+    score: float
+
+class WhatIfScenario(BaseModel):
+    name: Optional[str] = None
+    scores: List[WhatIfScore] = []
+
+class WhatIfRequest(BaseModel):
+    semester_code: Optional[str] = None  # mặc định: học kỳ đang hoạt động
+    scenarios: List[WhatIfScenario] = []
+
 class EnrollmentBase(BaseModel):
     class_id: int
     student_id: int
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from app.models.enums import UserRole
 
@@ -22,6 +22,35 @@ class UserCreate(UserBase):
     password: str
     student_code: Optional[str] = None
     department_id: Optional[int] = None
+    cohort: Optional[str] = None
+    program_id: Optional[int] = None
+
+class UserImportRow(BaseModel):
+    """Một dòng của file import sinh viên/giảng viên; role lấy theo endpoint"""
+    username: str
+    email: str
+    password: str
+    full_name: Optional[str] = None
+    phone_number: Optional[str] = None
+    student_code: Optional[str] = None
+    department_id: Optional[int] = None
+    cohort: Optional[str] = None
+    program_id: Optional[int] = None
+
+    @field_validator("username", "email", "password")
+    @classmethod
+    def not_blank(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError("must not be empty")
+        return value
+
+    @field_validator("password")
+    @classmethod
+    def fits_bcrypt(cls, value: str) -> str:
+        # bcrypt chỉ nhận tối đa 72 byte, báo lỗi từ lúc kiểm tra thay vì khi đang băm
+        if len(value.encode("utf-8")) > 72:
+            raise ValueError("must be at most 72 bytes")
+        return value
 
 class UserUpdate(BaseModel):
     full_name: Optional[str] = None
@@ -29,6 +58,8 @@ class UserUpdate(BaseModel):
     phone_number: Optional[str] = None
     student_code: Optional[str] = None
     department_id: Optional[int] = None
+    cohort: Optional[str] = None
+    program_id: Optional[int] = None
 
 class User(UserBase):
     id: int
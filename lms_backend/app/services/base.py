@@ -1,6 +1,7 @@
 from typing import TypeVar, Generic, Type, Optional, List, Any
 from sqlalchemy.orm import Session
 from app.database import Base
+from app.utils.pagination import Page, keyset_paginate
 from fastapi.encoders import jsonable_encoder
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -13,7 +14,10 @@ class BaseService(Generic[ModelType]):
         return db.query(self.model).filter(self.model.id == id).first()
 
     def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self.get_page(db, skip=skip, limit=limit).items
+
+    def get_page(self, db: Session, *, cursor: Optional[str] = None, skip: int = 0, limit: int = 100) -> Page:
+        return keyset_paginate(db.query(self.model), [self.model.id], limit, cursor, skip)
 
     def create(self, db: Session, *, obj_in: Any) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -1,9 +1,12 @@
 from datetime import timedelta, date
-from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
 from app.models.academic import Class, Enrollment, Schedule
 from app.models.timetable import Timetable
 from app.models.academic_year import Semester
 from app.services.base import BaseService
+from app.utils.pagination import Page, keyset_paginate
 
 from app.models.user import Lecturer, User
 from app.models.enums import UserRole
@@ -29,6 +32,29 @@ class ClassService(BaseService[Class]):
         self.generate_timetable(db, db_class.id)
         return db_class
 
+    def get_enrolled_counts(self, db: Session, class_ids: Iterable[int]) -> Dict[int, int]:
+        """class_id -> sĩ số, 1 truy vấn GROUP BY cho cả danh sách lớp"""
+        class_ids = list(class_ids)
+        if not class_ids:
+            return {}
+        rows = db.query(Enrollment.class_id, func.count(Enrollment.id)).filter(
+            Enrollment.class_id.in_(class_ids)
+        ).group_by(Enrollment.class_id).all()
+        return dict(rows)
+
+    def attach_enrolled_counts(self, db: Session, classes: List[Class]) -> List[Class]:
+        counts = self.get_enrolled_counts(db, [c.id for c in classes])
+        for c in classes:
+            c.enrolled_count = counts.get(c.id, 0)
+        return classes
+
+    def get_page_with_counts(
+        self, db: Session, *, cursor: Optional[str] = None, skip: int = 0, limit: int = 100
+    ) -> Page:
+        page = keyset_paginate(db.query(Class).options(joinedload(Class.course)), [Class.id], limit, cursor, skip)
+        self.attach_enrolled_counts(db, page.items)
+        return page
+
     def update_class(self, db: Session, class_id: int, class_in: ClassCreate):
         db_class = self.get(db, class_id)
         if not db_class:
@@ -1,23 +1,52 @@
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, or_
 from app.models.user import Student, User, Lecturer
 from app.models.academic import Department, Course, Class, Enrollment, Grade
 from app.models.academic_year import AcademicYear, Semester, AcademicResult
 from app.models.cumulative_result import CumulativeResult
-from app.utils.academic_calculator import calculate_and_save_semester_result, update_cumulative_result
+from app.models.grading_policy import GradingPolicy, GradingPolicyComponent
+from app.models.semester_ranking import SemesterRanking
+from app.models.course_prerequisite import CoursePrerequisite
+from app.core.config import settings
+from app.database import SessionLocal
+from app.utils.academic_calculator import (
+    rebuild_cumulative_results, refresh_enrollment_grade,
+    rebuild_enrollment_grades, calculate_all_students_in_semester
+)
+from app.utils.grading_policy import grading_policies
+from app.utils.semester_ranking import RANKING_SCOPES
+from app.utils.class_statistics import rebuild_class_statistics
+from app.utils.transcript_cache import transcript_cache, invalidate_on_commit
+from app.utils.prerequisite_graph import prerequisite_graph, transitive_closure
+from app.utils.pagination import Page, cached_total, keyset_paginate
+from app.services import job_service
+from app.services.recalc_queue import recalc_queue
 from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.academic import GradingPolicyUpdate
 from app.models.enums import UserRole
 from app.crud.user import create_user
 
 
-def get_academic_results_by_semester(semester_id: int, db: Session, skip: int = 0, limit: int = 100):
-    results = db.query(AcademicResult).filter(
-        AcademicResult.semester_id == semester_id
-    ).offset(skip).limit(limit).all()
+def get_academic_results_by_semester(
+    semester_id: int,
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
+    query = db.query(AcademicResult).filter(AcademicResult.semester_id == semester_id)
+    # (semester_id, student_id) là duy nhất và có index: mỗi trang là một lần tìm trên index
+    page = keyset_paginate(query.options(
+        joinedload(AcademicResult.student).joinedload(Student.user),
+        joinedload(AcademicResult.semester)
+    ), [AcademicResult.student_id], limit, cursor, skip)
     
-    return [
+    items = [
         {
             "student_id": r.student_id,
             "student_code": r.student.student_code,
@@ -31,15 +60,21 @@ def get_academic_results_by_semester(semester_id: int, db: Session, skip: int =
             "semester_code": r.semester.code,
             "semester_name": r.semester.name
         }
-        for r in results
+        for r in page.items
     ]
+    return page._replace(
+        items=items,
+        total=cached_total(("academic_results", semester_id), query) if include_total else None
+    )
 
 def get_student_all_results(student_id: int, db: Session):
-    student = db.query(Student).join(User).filter(Student.user_id == student_id).first()
+    student = db.query(Student).options(joinedload(Student.user)).filter(Student.user_id == student_id).first()
     if not student:
         return None
     
-    semester_results = db.query(AcademicResult).filter(
+    semester_results = db.query(AcademicResult).options(
+        joinedload(AcademicResult.semester)
+    ).filter(
         AcademicResult.student_id == student_id
     ).join(Semester).order_by(Semester.start_date).all()
     
@@ -53,9 +88,11 @@ def get_student_all_results(student_id: int, db: Session):
             "semester_code": r.semester.code,
             "semester_name": r.semester.name,
             "gpa": r.gpa,
+            "cpa": r.cpa,
             "total_credits": r.total_credits,
             "completed_credits": r.completed_credits,
-            "failed_credits": r.failed_credits
+            "failed_credits": r.failed_credits,
+            "cumulative_credits": r.cumulative_credits
         }
         for r in semester_results
     ]
@@ -71,28 +108,56 @@ def get_student_all_results(student_id: int, db: Session):
         "total_failed_credits": cumulative.total_failed_credits if cumulative else 0
     }
 
-def recalculate_all_cpa(db: Session):
-    students = db.query(Student).all()
-    count_success = 0
-    count_error = 0
-    errors = []
+def recalculate_all_cpa():
+    job = job_service.create_job("recalculate_all_cpa")
+    job_service.run_job(job["job_id"], _recalculate_all_cpa_job)
+    return job_service.get_job(job["job_id"])
+
+def _recalculate_all_cpa_job(job_id: str):
+    db = SessionLocal()
+    try:
+        student_ids = [student_id for (student_id,) in db.query(Student.user_id).order_by(Student.user_id).all()]
+    finally:
+        db.close()
     
-    for student in students:
-        try:
-            update_cumulative_result(student.user_id, db)
-            count_success += 1
-        except Exception as e:
-            count_error += 1
-            errors.append(f"Student {student.student_code}: {str(e)}")
+    job_service.set_total(job_id, len(student_ids))
+    chunks = job_service.chunked(student_ids, settings.RECALCULATE_CHUNK_SIZE)
+    
+    with ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS) as pool:
+        updated = sum(pool.map(partial(_recalculate_cpa_chunk, job_id), chunks))
     
     return {
         "message": "CPA recalculation completed",
-        "total_students": len(students),
-        "success": count_success,
-        "errors": count_error,
-        "error_details": errors[:10]
+        "total_students": len(student_ids),
+        "updated": updated
     }
 
+def _recalculate_cpa_chunk(job_id: str, student_ids: List[int]) -> int:
+    """Đối soát tổng tích lũy của một nhóm sinh viên, trả về số sinh viên có tổng bị sửa"""
+    db = SessionLocal()
+    try:
+        try:
+            report = rebuild_cumulative_results(db, student_ids=student_ids)
+            job_service.report_progress(job_id, success=len(student_ids))
+            return report["mismatched"]
+        except Exception as e:
+            db.rollback()
+            print(f"CPA chunk failed, retrying per student: {e}")
+        
+        # Tính lại từng sinh viên để tách riêng sinh viên bị lỗi, vẫn đếm theo số tổng bị sửa
+        updated, success, errors = 0, 0, []
+        for student_id in student_ids:
+            try:
+                updated += rebuild_cumulative_results(db, student_ids=[student_id])["mismatched"]
+                success += 1
+            except Exception as e:
+                db.rollback()
+                errors.append(f"Student {student_id}: {str(e)}")
+        job_service.report_progress(job_id, success=success, errors=errors)
+        return updated
+    finally:
+        db.close()
+
 def create_lecturer(db: Session, user_in: UserCreate):
     if user_in.role != UserRole.LECTURER:
          raise ValueError("Role must be lecturer")
@@ -110,11 +175,16 @@ def create_lecturer(db: Session, user_in: UserCreate):
     db.commit()
     return user
 
-def list_lecturers(db: Session, skip: int = 0, limit: int = 100):
-    lecturers = db.query(User).filter(User.role == UserRole.LECTURER).offset(skip).limit(limit).all()
+def list_lecturers(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = False
+) -> Page:
+    query = db.query(User).filter(User.role == UserRole.LECTURER)
+    page = keyset_paginate(query.options(
+        joinedload(User.lecturer).joinedload(Lecturer.department)
+    ), [User.id], limit, cursor, skip)
     
     result = []
-    for lec in lecturers:
+    for lec in page.items:
         lec_dict = {
             "id": lec.id,
             "username": lec.username,
@@ -127,7 +197,7 @@ def list_lecturers(db: Session, skip: int = 0, limit: int = 100):
             "is_active": True
         }
         result.append(lec_dict)
-    return result
+    return page._replace(items=result, total=cached_total(("lecturers",), query) if include_total else None)
 
 def update_lecturer(db: Session, user_id: int, user_in: UserUpdate):
     db_user = db.query(User).filter(User.id == user_id, User.role == UserRole.LECTURER).first()
@@ -148,10 +218,15 @@ def update_lecturer(db: Session, user_id: int, user_in: UserUpdate):
     db.refresh(db_user)
     return db_user
 
-def list_students(db: Session, skip: int = 0, limit: int = 100):
-    students = db.query(User).filter(User.role == UserRole.STUDENT).offset(skip).limit(limit).all()
+def list_students(
+    db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = False
+) -> Page:
+    query = db.query(User).filter(User.role == UserRole.STUDENT)
+    page = keyset_paginate(query.options(
+        joinedload(User.student).joinedload(Student.department)
+    ), [User.id], limit, cursor, skip)
     result = []
-    for stu in students:
+    for stu in page.items:
         stu_dict = {
             "id": stu.id,
             "username": stu.username,
@@ -164,7 +239,7 @@ def list_students(db: Session, skip: int = 0, limit: int = 100):
             "is_active": stu.is_active
         }
         result.append(stu_dict)
-    return result
+    return page._replace(items=result, total=cached_total(("students",), query) if include_total else None)
 
 def create_student(db: Session, user_in: UserCreate):
     if user_in.role != UserRole.STUDENT:
@@ -182,7 +257,9 @@ def create_student(db: Session, user_in: UserCreate):
     student_profile = Student(
         user_id=user.id, 
         student_code=code,
-        department_id=user_in.department_id
+        department_id=user_in.department_id,
+        cohort=user_in.cohort,
+        program_id=user_in.program_id
     )
     db.add(student_profile)
     db.commit()
@@ -223,12 +300,21 @@ def update_student(db: Session, user_id: int, user_in: UserUpdate):
     if user_in.department_id is not None and db_user.student:
         db_user.student.department_id = user_in.department_id
     
+    if user_in.cohort is not None and db_user.student:
+        db_user.student.cohort = user_in.cohort
+    
+    if user_in.program_id is not None and db_user.student:
+        db_user.student.program_id = user_in.program_id
+        invalidate_on_commit(db, user_id)
+    
     db.commit()
     db.refresh(db_user)
     return db_user
 
 def get_all_students(db: Session):
-    students = db.query(User).filter(User.role == "STUDENT").all()
+    students = db.query(User).options(
+        joinedload(User.student).joinedload(Student.department)
+    ).filter(User.role == "STUDENT").all()
     result = []
     for stu in students:
         result.append({
@@ -265,15 +351,16 @@ def update_grade(grade_id: int, score: float, db: Session):
     if not grade:
         return None
     
+    enrollment = grade.enrollment
     grade.score = score
+    refresh_enrollment_grade(enrollment, db)
     db.commit()
     
-    enrollment = grade.enrollment
     class_obj = enrollment.class_
     if class_obj and class_obj.semester:
         semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
         if semester:
-            calculate_and_save_semester_result(enrollment.student_id, semester.id, db)
+            recalc_queue.enqueue(enrollment.student_id, semester.id, enrollment.class_id)
     
     return grade
 
@@ -289,12 +376,199 @@ def create_grade(enrollment_id: int, grade_type: str, score: float, weight: floa
         weight=weight
     )
     db.add(grade)
+    refresh_enrollment_grade(enrollment, db)
     db.commit()
     
     class_obj = enrollment.class_
     if class_obj and class_obj.semester:
         semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
         if semester:
-            calculate_and_save_semester_result(enrollment.student_id, semester.id, db)
+            recalc_queue.enqueue(enrollment.student_id, semester.id, enrollment.class_id)
     
     return grade
+
+def delete_grade(grade_id: int, db: Session):
+    grade = db.query(Grade).filter(Grade.id == grade_id).first()
+    if not grade:
+        return None
+    
+    enrollment = grade.enrollment
+    db.delete(grade)
+    refresh_enrollment_grade(enrollment, db)
+    db.commit()
+    
+    class_obj = enrollment.class_
+    if class_obj and class_obj.semester:
+        semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
+        if semester:
+            recalc_queue.enqueue(enrollment.student_id, semester.id, enrollment.class_id)
+    
+    return grade
+
+def get_grading_policy(course_id: int, db: Session) -> Optional[GradingPolicy]:
+    return db.query(GradingPolicy).filter(GradingPolicy.course_id == course_id).first()
+
+def _validate_grading_policy(policy_in: GradingPolicyUpdate):
+    if not 0 <= policy_in.rounding <= 3:
+        raise ValueError("Rounding must be between 0 and 3 decimal places")
+    if not 0 <= policy_in.pass_score <= 10:
+        raise ValueError("Pass score must be between 0 and 10")
+    
+    grade_types = [c.grade_type for c in policy_in.components]
+    if len(set(grade_types)) != len(grade_types):
+        raise ValueError("Each grade type can only appear once")
+    if any(c.weight < 0 for c in policy_in.components):
+        raise ValueError("Component weights must not be negative")
+    if sum(c.weight for c in policy_in.components) <= 0:
+        raise ValueError("At least one component must have a positive weight")
+    if any(c.min_score is not None and not 0 <= c.min_score <= 10 for c in policy_in.components):
+        raise ValueError("Component minimum scores must be between 0 and 10")
+
+def save_grading_policy(course_id: int, policy_in: GradingPolicyUpdate, db: Session):
+    """Tạo/sửa policy của môn học và tính lại điểm các lớp của môn trong background"""
+    if not db.query(Course).filter(Course.id == course_id).first():
+        return None
+    _validate_grading_policy(policy_in)
+    
+    policy = get_grading_policy(course_id, db)
+    if policy:
+        policy.version += 1
+        policy.components.clear()
+        db.flush()
+    else:
+        policy = GradingPolicy(course_id=course_id, version=1)
+        db.add(policy)
+    
+    policy.rounding = policy_in.rounding
+    policy.pass_score = policy_in.pass_score
+    policy.components = [
+        GradingPolicyComponent(grade_type=c.grade_type, weight=c.weight, min_score=c.min_score)
+        for c in policy_in.components
+    ]
+    db.commit()
+    db.refresh(policy)
+    
+    grading_policies.invalidate()
+    transcript_cache.clear()
+    return policy, apply_grading_policy(course_id)
+
+def delete_grading_policy(course_id: int, db: Session):
+    """Xóa policy, môn học quay về cách tính mặc định theo Grade.weight"""
+    policy = get_grading_policy(course_id, db)
+    if not policy:
+        return None
+    
+    db.delete(policy)
+    db.commit()
+    grading_policies.invalidate()
+    transcript_cache.clear()
+    return apply_grading_policy(course_id)
+
+def apply_grading_policy(course_id: int):
+    job = job_service.create_job("apply_grading_policy")
+    job_service.run_job(job["job_id"], _apply_grading_policy_job, course_id)
+    return job_service.get_job(job["job_id"])
+
+def _apply_grading_policy_job(job_id: str, course_id: int):
+    db = SessionLocal()
+    try:
+        updated = rebuild_enrollment_grades(db, Class.course_id == course_id)
+        
+        rows = db.query(Enrollment.student_id, Class.semester).join(
+            Class, Enrollment.class_id == Class.id
+        ).filter(Class.course_id == course_id).distinct().all()
+        student_ids = sorted({student_id for student_id, _ in rows})
+        job_service.set_total(job_id, len(student_ids))
+        
+        rebuild_cumulative_results(db, student_ids=student_ids)
+        class_ids = [class_id for (class_id,) in db.query(Class.id).filter(Class.course_id == course_id).all()]
+        rebuild_class_statistics(db, class_ids=class_ids)
+        semesters = db.query(Semester).filter(Semester.code.in_({code for _, code in rows})).all()
+        for semester in semesters:
+            semester_students = [student_id for student_id, code in rows if code == semester.code]
+            calculate_all_students_in_semester(semester.id, db, student_ids=semester_students)
+        
+        job_service.report_progress(job_id, success=len(student_ids))
+        return {
+            "course_id": course_id,
+            "updated_enrollments": updated,
+            "total_students": len(student_ids)
+        }
+    finally:
+        db.close()
+
+def get_course_prerequisites(course_id: int, db: Session) -> Optional[List[Course]]:
+    if not db.query(Course.id).filter(Course.id == course_id).first():
+        return None
+    return db.query(Course).join(
+        CoursePrerequisite, CoursePrerequisite.prerequisite_id == Course.id
+    ).filter(CoursePrerequisite.course_id == course_id).order_by(Course.code).all()
+
+def set_course_prerequisites(course_id: int, prerequisite_ids: List[int], db: Session) -> Optional[List[Course]]:
+    """Thay các môn tiên quyết trực tiếp; từ chối nếu tạo thành chu trình"""
+    if not db.query(Course.id).filter(Course.id == course_id).first():
+        return None
+    prerequisite_ids = list(dict.fromkeys(prerequisite_ids))
+    if course_id in prerequisite_ids:
+        raise ValueError("A course cannot be its own prerequisite")
+    found = {cid for (cid,) in db.query(Course.id).filter(Course.id.in_(prerequisite_ids)).all()}
+    if len(found) != len(prerequisite_ids):
+        raise ValueError(f"Courses not found: {sorted(set(prerequisite_ids) - found)}")
+    
+    edges = db.query(CoursePrerequisite.course_id, CoursePrerequisite.prerequisite_id).filter(
+        CoursePrerequisite.course_id != course_id
+    ).all()
+    transitive_closure(list(edges) + [(course_id, pid) for pid in prerequisite_ids])
+    
+    db.query(CoursePrerequisite).filter(CoursePrerequisite.course_id == course_id).delete(synchronize_session=False)
+    db.add_all(CoursePrerequisite(course_id=course_id, prerequisite_id=pid) for pid in prerequisite_ids)
+    db.commit()
+    
+    prerequisite_graph.invalidate()
+    return get_course_prerequisites(course_id, db)
+
+def _ranking_row(r: SemesterRanking):
+    return {
+        "student_id": r.student_id,
+        "student_code": r.student.student_code,
+        "full_name": r.student.user.full_name,
+        "scope": r.scope,
+        "scope_key": r.scope_key,
+        "gpa": r.gpa,
+        "rank": r.rank,
+        "percentile": r.percentile,
+        "group_size": r.group_size
+    }
+
+def get_top_rankings(
+    semester_id: int,
+    scope: str,
+    scope_key: str,
+    db: Session,
+    limit: int = 10,
+    min_percentile: Optional[float] = None
+):
+    if scope not in RANKING_SCOPES:
+        raise ValueError(f"Scope must be one of: {', '.join(RANKING_SCOPES)}")
+    
+    query = db.query(SemesterRanking).options(
+        joinedload(SemesterRanking.student).joinedload(Student.user)
+    ).filter(
+        SemesterRanking.semester_id == semester_id,
+        SemesterRanking.scope == scope,
+        SemesterRanking.scope_key == scope_key
+    )
+    if min_percentile is not None:
+        query = query.filter(SemesterRanking.percentile >= min_percentile)
+    
+    rankings = query.order_by(SemesterRanking.rank, SemesterRanking.student_id).limit(limit).all()
+    return [_ranking_row(r) for r in rankings]
+
+def get_student_rankings(semester_id: int, student_id: int, db: Session):
+    rankings = db.query(SemesterRanking).options(
+        joinedload(SemesterRanking.student).joinedload(Student.user)
+    ).filter(
+        SemesterRanking.semester_id == semester_id,
+        SemesterRanking.student_id == student_id
+    ).order_by(SemesterRanking.scope).all()
+    return [_ranking_row(r) for r in rankings]
@@ -0,0 +1,332 @@
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.academic import Class, Course, Enrollment
+from app.models.cumulative_result import CumulativeResult
+from app.models.program import Program, ProgramRequirement, program_requirement_courses
+from app.models.user import Student, User
+from app.schemas.academic import ProgramCreate
+from app.utils.transcript_cache import transcript_cache
+
+REQUIREMENT_TYPES = ("REQUIRED_COURSES", "ELECTIVE_CREDITS")
+
+# Khóa cache kết quả xét tốt nghiệp trong transcript_cache (cùng bị invalidate khi điểm/đăng ký thay đổi)
+AUDIT_CACHE_KEY = "degree_audit"
+
+class CompiledRequirement(NamedTuple):
+    name: str
+    requirement_type: str
+    min_credits: Optional[int]
+    courses: Dict[int, Tuple[str, int]]  # course_id -> (code, credits)
+
+class CompiledProgram(NamedTuple):
+    id: int
+    code: str
+    name: str
+    min_total_credits: int
+    min_cpa: float
+    requirements: Tuple[CompiledRequirement, ...]
+
+# --- Programs ---
+def list_programs(db: Session, department_id: Optional[int] = None) -> List[Program]:
+    query = db.query(Program)
+    if department_id is not None:
+        query = query.filter(Program.department_id == department_id)
+    return query.order_by(Program.code).all()
+
+def get_program(program_id: int, db: Session) -> Optional[Program]:
+    return db.query(Program).filter(Program.id == program_id).first()
+
+def _validate_program(program_in: ProgramCreate, db: Session, program_id: Optional[int] = None):
+    duplicate = db.query(Program.id).filter(Program.code == program_in.code)
+    if program_id is not None:
+        duplicate = duplicate.filter(Program.id != program_id)
+    if duplicate.first():
+        raise ValueError(f"Program code {program_in.code} already exists")
+    if program_in.min_total_credits < 0:
+        raise ValueError("Minimum total credits must not be negative")
+    if not 0 <= program_in.min_cpa <= 4:
+        raise ValueError("Minimum CPA must be between 0 and 4")
+
+    course_ids = set()
+    for requirement in program_in.requirements:
+        if requirement.requirement_type not in REQUIREMENT_TYPES:
+            raise ValueError(f"Requirement type must be one of: {', '.join(REQUIREMENT_TYPES)}")
+        if not requirement.course_ids:
+            raise ValueError(f"Requirement {requirement.name} must list at least one course")
+        if requirement.requirement_type == "ELECTIVE_CREDITS" and not (requirement.min_credits or 0) > 0:
+            raise ValueError(f"Requirement {requirement.name} must set a positive min_credits")
+        course_ids.update(requirement.course_ids)
+
+    found = {course_id for (course_id,) in db.query(Course.id).filter(Course.id.in_(course_ids)).all()}
+    missing = sorted(course_ids - found)
+    if missing:
+        raise ValueError(f"Courses not found: {missing}")
+
+def _build_requirements(program_in: ProgramCreate, db: Session) -> List[ProgramRequirement]:
+    course_ids = {course_id for requirement in program_in.requirements for course_id in requirement.course_ids}
+    courses = {course.id: course for course in db.query(Course).filter(Course.id.in_(course_ids)).all()}
+    return [
+        ProgramRequirement(
+            name=requirement.name,
+            requirement_type=requirement.requirement_type,
+            min_credits=requirement.min_credits,
+            courses=[courses[course_id] for course_id in dict.fromkeys(requirement.course_ids)]
+        )
+        for requirement in program_in.requirements
+    ]
+
+def create_program(program_in: ProgramCreate, db: Session) -> Program:
+    _validate_program(program_in, db)
+    program = Program(**program_in.model_dump(exclude={"requirements"}))
+    program.requirements = _build_requirements(program_in, db)
+    db.add(program)
+    db.commit()
+    db.refresh(program)
+    return program
+
+def update_program(program_id: int, program_in: ProgramCreate, db: Session) -> Optional[Program]:
+    """Sửa chương trình, thay toàn bộ danh sách khối kiến thức"""
+    program = get_program(program_id, db)
+    if not program:
+        return None
+    _validate_program(program_in, db, program_id=program_id)
+
+    for field, value in program_in.model_dump(exclude={"requirements"}).items():
+        setattr(program, field, value)
+    program.requirements.clear()
+    db.flush()
+    program.requirements = _build_requirements(program_in, db)
+    db.commit()
+    db.refresh(program)
+
+    # Điều kiện thay đổi: kết quả xét của mọi sinh viên trong chương trình không còn đúng
+    transcript_cache.clear()
+    return program
+
+# --- Audit engine ---
+def load_programs(db: Session, program_ids) -> Dict[int, CompiledProgram]:
+    """Đọc chương trình, khối kiến thức và môn của khối bằng 3 truy vấn"""
+    program_ids = list(program_ids)
+    if not program_ids:
+        return {}
+
+    requirement_rows = db.query(
+        ProgramRequirement.id, ProgramRequirement.program_id, ProgramRequirement.name,
+        ProgramRequirement.requirement_type, ProgramRequirement.min_credits
+    ).filter(ProgramRequirement.program_id.in_(program_ids)).order_by(ProgramRequirement.id).all()
+
+    courses = defaultdict(dict)
+    if requirement_rows:
+        course_rows = db.query(
+            program_requirement_courses.c.requirement_id, Course.id, Course.code, Course.credits
+        ).join(
+            Course, Course.id == program_requirement_courses.c.course_id
+        ).filter(
+            program_requirement_courses.c.requirement_id.in_([row[0] for row in requirement_rows])
+        ).all()
+        for requirement_id, course_id, code, credits in course_rows:
+            courses[requirement_id][course_id] = (code, credits)
+
+    requirements = defaultdict(list)
+    for requirement_id, program_id, name, requirement_type, min_credits in requirement_rows:
+        requirements[program_id].append(
+            CompiledRequirement(name, requirement_type, min_credits, courses[requirement_id])
+        )
+
+    programs = db.query(
+        Program.id, Program.code, Program.name, Program.min_total_credits, Program.min_cpa
+    ).filter(Program.id.in_(program_ids)).all()
+    return {
+        program_id: CompiledProgram(
+            program_id, code, name, min_total_credits or 0, min_cpa or 0.0,
+            tuple(requirements[program_id])
+        )
+        for program_id, code, name, min_total_credits, min_cpa in programs
+    }
+
+def _passed_courses(db: Session, student_ids: List[int]) -> Dict[int, Dict[int, int]]:
+    """student_id -> {course_id: tín chỉ} của các môn đã qua; học lại nhiều lần chỉ tính 1"""
+    rows = db.execute(
+        select(Enrollment.student_id, Class.course_id, Course.credits).join(
+            Class, Enrollment.class_id == Class.id
+        ).join(
+            Course, Class.course_id == Course.id
+        ).where(
+            Enrollment.student_id.in_(student_ids),
+            Enrollment.is_passed.is_(True)
+        ).distinct()
+    ).all()
+    passed = defaultdict(dict)
+    for student_id, course_id, credits in rows:
+        passed[student_id][course_id] = credits
+    return passed
+
+def evaluate_program(program: CompiledProgram, passed: Dict[int, int], cpa: float) -> dict:
+    """
+    Xét 1 sinh viên theo điều kiện của chương trình, không truy vấn DB
+
+    Args:
+        program: Chương trình đã compile
+        passed: {course_id: tín chỉ} của các môn đã qua
+        cpa: CPA hiện tại
+
+    Returns:
+        Dict tiến độ từng khối kiến thức và kết luận đủ điều kiện tốt nghiệp
+    """
+    requirements = []
+    for requirement in program.requirements:
+        done = [course_id for course_id in requirement.courses if course_id in passed]
+        completed_credits = sum(passed[course_id] for course_id in done)
+        missing = sorted(
+            code for course_id, (code, _) in requirement.courses.items() if course_id not in passed
+        )
+        if requirement.requirement_type == "REQUIRED_COURSES":
+            required_credits = sum(credits for _, credits in requirement.courses.values())
+            satisfied = not missing
+        else:
+            required_credits = requirement.min_credits or 0
+            satisfied = completed_credits >= required_credits
+        requirements.append({
+            "name": requirement.name,
+            "requirement_type": requirement.requirement_type,
+            "satisfied": satisfied,
+            "completed_credits": completed_credits,
+            "required_credits": required_credits,
+            "completed_courses": len(done),
+            "remaining_courses": missing
+        })
+
+    total_credits = sum(passed.values())
+    cpa = round(cpa or 0.0, 2)
+    return {
+        "program_id": program.id,
+        "program_code": program.code,
+        "program_name": program.name,
+        "eligible": (
+            all(item["satisfied"] for item in requirements)
+            and total_credits >= program.min_total_credits
+            and cpa >= program.min_cpa
+        ),
+        "completed_credits": total_credits,
+        "required_credits": program.min_total_credits,
+        "cpa": cpa,
+        "min_cpa": program.min_cpa,
+        "requirements": requirements
+    }
+
+def audit_students(
+    db: Session,
+    student_ids: List[int],
+    programs: Optional[Dict[int, CompiledProgram]] = None
+) -> Dict[int, Optional[dict]]:
+    """
+    Xét tốt nghiệp cho 1 lô sinh viên với số truy vấn cố định
+
+    Returns:
+        student_id -> kết quả xét; None nếu sinh viên chưa được gán chương trình
+    """
+    if not student_ids:
+        return {}
+    student_programs = dict(db.execute(
+        select(Student.user_id, Student.program_id).where(Student.user_id.in_(student_ids))
+    ).all())
+    cpas = dict(db.execute(
+        select(CumulativeResult.student_id, CumulativeResult.cpa).where(
+            CumulativeResult.student_id.in_(student_ids)
+        )
+    ).all())
+    passed = _passed_courses(db, student_ids)
+
+    if programs is None:
+        programs = load_programs(db, {pid for pid in student_programs.values() if pid is not None})
+    else:
+        missing = {pid for pid in student_programs.values() if pid is not None and pid not in programs}
+        programs.update(load_programs(db, missing))
+
+    return {
+        student_id: (
+            evaluate_program(programs[program_id], passed.get(student_id, {}), cpas.get(student_id, 0.0))
+            if program_id in programs else None
+        )
+        for student_id, program_id in student_programs.items()
+    }
+
+def get_student_audit(student_id: int, db: Session) -> Optional[dict]:
+    """Kết quả xét tốt nghiệp của 1 sinh viên, cache theo sinh viên"""
+    return transcript_cache.get_or_load(
+        student_id, AUDIT_CACHE_KEY, lambda: audit_students(db, [student_id]).get(student_id)
+    )
+
+def audit_cohort(
+    db: Session,
+    cohort: Optional[str] = None,
+    program_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    eligible_only: bool = False,
+    chunk_size: Optional[int] = None
+) -> dict:
+    """
+    Xét tốt nghiệp cho cả khóa/chương trình trong 1 lượt
+
+    Đọc sinh viên theo từng lô student_id tăng dần; mỗi lô dùng số truy vấn cố định
+    và các chương trình chỉ được compile 1 lần cho cả lượt.
+
+    Returns:
+        Dict tổng hợp và danh sách kết quả xét của từng sinh viên
+    """
+    if cohort is None and program_id is None:
+        raise ValueError("Either cohort or program_id is required")
+
+    chunk_size = chunk_size or settings.DEGREE_AUDIT_CHUNK_SIZE
+    criteria = [Student.program_id.isnot(None)]
+    if cohort is not None:
+        criteria.append(Student.cohort == cohort)
+    if program_id is not None:
+        criteria.append(Student.program_id == program_id)
+    if department_id is not None:
+        criteria.append(Student.department_id == department_id)
+
+    programs: Dict[int, CompiledProgram] = {}
+    unmet = Counter()
+    evaluated = eligible = 0
+    students = []
+    last_student_id = None
+    while True:
+        query = select(Student.user_id, Student.student_code, User.full_name).join(
+            User, User.id == Student.user_id
+        ).where(*criteria)
+        if last_student_id is not None:
+            query = query.where(Student.user_id > last_student_id)
+        rows = db.execute(query.order_by(Student.user_id).limit(chunk_size)).all()
+        if not rows:
+            break
+
+        audits = audit_students(db, [row.user_id for row in rows], programs)
+        for row in rows:
+            audit = audits.get(row.user_id)
+            if audit is None:
+                continue
+            evaluated += 1
+            eligible += int(audit["eligible"])
+            unmet.update(item["name"] for item in audit["requirements"] if not item["satisfied"])
+            if eligible_only and not audit["eligible"]:
+                continue
+            students.append({
+                "student_id": row.user_id,
+                "student_code": row.student_code,
+                "full_name": row.full_name,
+                **audit
+            })
+        last_student_id = rows[-1].user_id
+
+    return {
+        "cohort": cohort,
+        "program_id": program_id,
+        "evaluated": evaluated,
+        "eligible": eligible,
+        "unmet_requirements": dict(unmet.most_common()),
+        "students": students
+    }
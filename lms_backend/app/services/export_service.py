@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.models.user import User, Student
+from app.models.academic import Department, Course, Class, Enrollment, Grade
+from app.models.academic_year import AcademicResult, Semester
+from app.models.tuition import Tuition
+from app.models.program import Program
+
+EXPORT_FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+def _students_query(filters: dict):
+    stmt = select(
+        User.id.label("student_id"),
+        Student.student_code,
+        User.full_name,
+        User.email,
+        User.phone_number,
+        Student.cohort,
+        Department.name.label("department"),
+        Program.code.label("program"),
+        User.is_active
+    ).join(Student, Student.user_id == User.id).outerjoin(
+        Department, Department.id == Student.department_id
+    ).outerjoin(Program, Program.id == Student.program_id).order_by(User.id)
+    if filters.get("department_id"):
+        stmt = stmt.where(Student.department_id == filters["department_id"])
+    return stmt
+
+def _grades_query(filters: dict):
+    stmt = select(
+        Enrollment.id.label("enrollment_id"),
+        Student.student_code,
+        User.full_name,
+        Class.code.label("class_code"),
+        Course.code.label("course_code"),
+        Course.name.label("course_name"),
+        Class.semester,
+        Grade.grade_type,
+        Grade.score,
+        Grade.weight,
+        Enrollment.final_score,
+        Enrollment.grade_4,
+        Enrollment.letter_grade
+    ).select_from(Grade).join(
+        Enrollment, Enrollment.id == Grade.enrollment_id
+    ).join(Student, Student.user_id == Enrollment.student_id).join(
+        User, User.id == Student.user_id
+    ).join(Class, Class.id == Enrollment.class_id).join(
+        Course, Course.id == Class.course_id
+    ).order_by(Grade.enrollment_id, Grade.grade_type)
+    if filters.get("semester"):
+        stmt = stmt.where(Class.semester == filters["semester"])
+    if filters.get("class_id"):
+        stmt = stmt.where(Enrollment.class_id == filters["class_id"])
+    return stmt
+
+def _academic_results_query(filters: dict):
+    stmt = select(
+        Student.student_code,
+        User.full_name,
+        Semester.code.label("semester"),
+        AcademicResult.gpa,
+        AcademicResult.cpa,
+        AcademicResult.total_credits,
+        AcademicResult.completed_credits,
+        AcademicResult.failed_credits,
+        AcademicResult.cumulative_credits
+    ).select_from(AcademicResult).join(
+        Student, Student.user_id == AcademicResult.student_id
+    ).join(User, User.id == Student.user_id).join(
+        Semester, Semester.id == AcademicResult.semester_id
+    ).order_by(AcademicResult.semester_id, AcademicResult.student_id)
+    if filters.get("semester"):
+        stmt = stmt.where(Semester.code == filters["semester"])
+    return stmt
+
+def _tuitions_query(filters: dict):
+    stmt = select(
+        Tuition.id.label("tuition_id"),
+        Student.student_code,
+        User.full_name,
+        Tuition.semester,
+        Tuition.total_amount,
+        Tuition.paid_amount,
+        (Tuition.total_amount - Tuition.paid_amount).label("balance"),
+        Tuition.status
+    ).select_from(Tuition).join(
+        Student, Student.user_id == Tuition.student_id
+    ).join(User, User.id == Student.user_id).order_by(Tuition.id)
+    if filters.get("semester"):
+        stmt = stmt.where(Tuition.semester == filters["semester"])
+    return stmt
+
+# entity -> hàm dựng câu SELECT (projection đã join sẵn, thứ tự ổn định) từ bộ lọc
+EXPORTS: Dict[str, Callable[[dict], object]] = {
+    "students": _students_query,
+    "grades": _grades_query,
+    "academic-results": _academic_results_query,
+    "tuitions": _tuitions_query,
+}
+
+def _csv_chunks(columns, partitions) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_chunks(columns, partitions) -> Iterator[str]:
+    for rows in partitions:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in rows
+        )
+
+def prepare_export(entity: str, export_format: str, filters: Optional[dict] = None) -> Optional[Tuple[object, str]]:
+    """
+    Kiểm tra yêu cầu xuất và dựng câu truy vấn trước khi bắt đầu stream
+
+    Returns:
+        (câu SELECT, media type), hoặc None nếu entity không tồn tại
+
+    Raises:
+        ValueError: định dạng không hỗ trợ
+    """
+    if entity not in EXPORTS:
+        return None
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of: {', '.join(EXPORT_FORMATS)}")
+    return EXPORTS[entity](filters or {}), EXPORT_FORMATS[export_format]
+
+def stream_export(engine: Engine, stmt, export_format: str, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """
+    Sinh nội dung CSV/NDJSON theo từng lô dòng từ server-side cursor
+
+    Dùng kết nối riêng (không phải session của request) với stream_results, nên chỉ
+    chunk_size dòng nằm trong bộ nhớ tại một thời điểm và không tạo đối tượng ORM nào.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        columns = list(result.keys())
+        partitions = result.partitions()
+        if export_format == "csv":
+            yield from _csv_chunks(columns, partitions)
+        else:
+            yield from _ndjson_chunks(columns, partitions)
@@ -0,0 +1,293 @@
+import csv
+import io
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.auth.security import get_password_hash
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.user import User, Student, Lecturer
+from app.models.academic import Department
+from app.models.academic_year import AcademicResult, Semester
+from app.models.program import Program
+from app.models.enums import UserRole
+from app.schemas.user import UserImportRow
+from app.services import job_service
+
+IMPORT_ROLES = {"students": UserRole.STUDENT, "lecturers": UserRole.LECTURER}
+
+# Số giá trị mỗi câu IN (...) khi đối chiếu username/email/mã với DB
+LOOKUP_CHUNK_SIZE = 500
+
+def parse_import_file(content: bytes, filename: Optional[str] = None) -> List[dict]:
+    """
+    Đọc file import: mảng JSON các object, hoặc CSV có dòng tiêu đề (tên cột = tên trường)
+
+    Raises:
+        ValueError: File không đọc được, rỗng hoặc vượt IMPORT_MAX_ROWS
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+
+    if (filename or "").lower().endswith(".json") or text.lstrip().startswith("["):
+        try:
+            rows = json.loads(text)
+        except ValueError:
+            raise ValueError("Invalid JSON file")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("JSON file must be an array of objects")
+    else:
+        rows = [
+            {key.strip(): (value.strip() or None) if isinstance(value, str) else value
+             for key, value in row.items() if key}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+
+    if not rows:
+        raise ValueError("File has no rows")
+    if len(rows) > settings.IMPORT_MAX_ROWS:
+        raise ValueError(f"File has {len(rows)} rows, maximum is {settings.IMPORT_MAX_ROWS}")
+    return rows
+
+def _row_error(row_number: int, username: Optional[str], errors: List[str]) -> dict:
+    return {"row": row_number, "username": username, "errors": errors}
+
+def _existing(db: Session, column, values: Iterable[str]) -> set:
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        chunk = values[start:start + LOOKUP_CHUNK_SIZE]
+        found.update(value for (value,) in db.query(column).filter(column.in_(chunk)).all())
+    return found
+
+def validate_import(db: Session, role: UserRole, raw_rows: List[dict]) -> Tuple[List[Tuple[int, UserImportRow]], List[dict]]:
+    """
+    Kiểm tra toàn bộ file trước khi ghi bất kỳ dòng nào
+
+    Mỗi dòng được kiểm tra kiểu dữ liệu, trùng lặp trong file, trùng với DB (username, email,
+    mã sinh viên) và khoa/chương trình tồn tại. Các truy vấn DB gom theo lô IN (...) cho cả file.
+
+    Returns:
+        (danh sách (số thứ tự dòng, dữ liệu) hợp lệ, báo cáo lỗi theo dòng);
+        số thứ tự dòng bắt đầu từ 1, không tính dòng tiêu đề CSV
+    """
+    parsed: List[Tuple[int, UserImportRow]] = []
+    errors: Dict[int, List[str]] = {}
+    usernames: Dict[int, Optional[str]] = {}
+
+    for row_number, raw in enumerate(raw_rows, start=1):
+        username = raw.get("username")
+        usernames[row_number] = username if isinstance(username, str) else None
+        try:
+            parsed.append((row_number, UserImportRow(**raw)))
+        except ValidationError as e:
+            errors[row_number] = [
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            ]
+
+    unique_fields = [("username", User.username), ("email", User.email)]
+    if role == UserRole.STUDENT:
+        unique_fields.append(("student_code", Student.student_code))
+
+    for field, column in unique_fields:
+        seen: Dict[str, int] = {}
+        for row_number, row in parsed:
+            value = getattr(row, field)
+            if value is None:
+                continue
+            if value in seen:
+                errors.setdefault(row_number, []).append(f"{field}: duplicate of row {seen[value]}")
+            else:
+                seen[value] = row_number
+        taken = _existing(db, column, seen)
+        for value in taken:
+            errors.setdefault(seen[value], []).append(f"{field}: already exists")
+
+    references = [("department_id", Department.id)]
+    if role == UserRole.STUDENT:
+        references.append(("program_id", Program.id))
+    for field, column in references:
+        wanted = {getattr(row, field) for _, row in parsed} - {None}
+        missing = wanted - _existing(db, column, wanted)
+        for row_number, row in parsed:
+            if getattr(row, field) in missing:
+                errors.setdefault(row_number, []).append(f"{field}: not found")
+
+    valid = [(row_number, row) for row_number, row in parsed if row_number not in errors]
+    report = [_row_error(row_number, usernames[row_number], messages) for row_number, messages in sorted(errors.items())]
+    return valid, report
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Băm bcrypt các mật khẩu trên nhiều process, trả về theo đúng thứ tự đầu vào
+
+    Mỗi lần băm tốn hàng trăm ms CPU nên đây là phần chậm nhất của import; kết quả được
+    trả dần (lazy) để bên gọi ghi các lô đầu trong khi các process vẫn đang băm lô sau.
+    Với 1 worker (hoặc 1 mật khẩu) băm ngay trong process hiện tại.
+    """
+    workers = workers or settings.IMPORT_HASH_WORKERS or os.cpu_count() or 1
+    workers = min(workers, len(passwords))
+    if workers <= 1:
+        yield from map(get_password_hash, passwords)
+        return
+    # spawn thay vì fork: process cha là server nhiều luồng, fork có thể sao chép lock đang bị giữ
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(get_password_hash, passwords, chunksize=max(1, min(32, len(passwords) // (workers * 4))))
+
+def _insert_batch(
+    db: Session,
+    role: UserRole,
+    batch: List[Tuple[int, UserImportRow]],
+    hashes: List[str],
+    semester_id: Optional[int]
+) -> None:
+    user_ids = db.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [
+            {
+                "username": row.username,
+                "email": row.email,
+                "hashed_password": hashed,
+                "role": role,
+                "full_name": row.full_name,
+                "phone_number": row.phone_number
+            }
+            for (_, row), hashed in zip(batch, hashes)
+        ]
+    ).all()
+
+    if role == UserRole.STUDENT:
+        db.bulk_insert_mappings(Student, [
+            {
+                "user_id": user_id,
+                "student_code": row.student_code or f"STU{user_id}",
+                "department_id": row.department_id,
+                "cohort": row.cohort,
+                "program_id": row.program_id
+            }
+            for user_id, (_, row) in zip(user_ids, batch)
+        ])
+        if semester_id:
+            now = datetime.now()
+            db.bulk_insert_mappings(AcademicResult, [
+                {
+                    "student_id": user_id,
+                    "semester_id": semester_id,
+                    "gpa": 0.0,
+                    "cpa": 0.0,
+                    "total_credits": 0,
+                    "completed_credits": 0,
+                    "failed_credits": 0,
+                    "cumulative_credits": 0,
+                    "calculated_at": now
+                }
+                for user_id in user_ids
+            ])
+    else:
+        db.bulk_insert_mappings(Lecturer, [
+            {"user_id": user_id, "lecturer_code": f"LEC{user_id}", "department_id": row.department_id}
+            for user_id, (_, row) in zip(user_ids, batch)
+        ])
+    db.commit()
+
+def import_users(
+    db: Session,
+    role: UserRole,
+    rows: List[Tuple[int, UserImportRow]],
+    job_id: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None
+) -> dict:
+    """
+    Tạo tài khoản và hồ sơ (Student/Lecturer, kết quả học kỳ hiện tại cho sinh viên) cho các dòng đã kiểm tra
+
+    Mỗi lô batch_size dòng là một transaction: INSERT users nhiều dòng (RETURNING id) rồi
+    bulk insert hồ sơ, thay vì 3-4 commit cho mỗi người như create_student/create_lecturer.
+    Lô lỗi (vd. trùng do import song song) được ghi lại từng dòng để tách riêng dòng hỏng.
+
+    Returns:
+        {"created": số tài khoản đã tạo, "failed": số dòng lỗi, "errors": báo cáo lỗi theo dòng}
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    semester_id = None
+    if role == UserRole.STUDENT:
+        active = db.query(Semester.id).filter(Semester.is_active == True).first()
+        semester_id = active[0] if active else None
+
+    hashes = hash_passwords([row.password for _, row in rows], workers)
+    created, errors = 0, []
+    for batch in job_service.chunked(rows, batch_size):
+        batch_hashes = list(islice(hashes, len(batch)))
+        try:
+            _insert_batch(db, role, batch, batch_hashes, semester_id)
+            created += len(batch)
+            if job_id:
+                job_service.report_progress(job_id, success=len(batch))
+            continue
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"Import batch failed, retrying per row: {e}")
+
+        success, failed = 0, []
+        for item, hashed in zip(batch, batch_hashes):
+            try:
+                _insert_batch(db, role, [item], [hashed], semester_id)
+                success += 1
+            except SQLAlchemyError as e:
+                db.rollback()
+                error = getattr(e, "orig", None) or e
+                failed.append(_row_error(item[0], item[1].username, [str(error)]))
+        created += success
+        errors += failed
+        if job_id:
+            job_service.report_progress(
+                job_id, success=success, errors=[f"Row {e['row']} ({e['username']}): {e['errors'][0]}" for e in failed]
+            )
+
+    return {"created": created, "failed": len(errors), "errors": errors}
+
+def _import_job(job_id: str, role: UserRole, rows: List[Tuple[int, UserImportRow]]) -> dict:
+    db = SessionLocal()
+    try:
+        return import_users(db, role, rows, job_id)
+    finally:
+        db.close()
+
+def start_import(db: Session, entity: str, raw_rows: List[dict], dry_run: bool = False) -> Optional[dict]:
+    """
+    Kiểm tra file import và chạy phần băm mật khẩu + ghi DB trong background job
+
+    Returns:
+        Báo cáo kiểm tra (total, valid, invalid, errors) kèm job (None nếu dry_run hoặc
+        không có dòng hợp lệ), hoặc None nếu entity không hỗ trợ
+    """
+    role = IMPORT_ROLES.get(entity)
+    if role is None:
+        return None
+
+    valid, errors = validate_import(db, role, raw_rows)
+    job = None
+    if valid and not dry_run:
+        job = job_service.create_job(f"import_{entity}")
+        job_service.set_total(job["job_id"], len(valid))
+        job_service.run_job(job["job_id"], _import_job, role, valid)
+        job = job_service.get_job(job["job_id"])
+
+    return {
+        "total": len(raw_rows),
+        "valid": len(valid),
+        "invalid": len(errors),
+        "errors": errors,
+        "dry_run": dry_run,
+        "job": job
+    }
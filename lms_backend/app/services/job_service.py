@@ -0,0 +1,94 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from app.core.config import settings
+from app.utils.sql_instrumentation import query_source
+
+MAX_ERROR_DETAILS = 50
+MAX_FINISHED_JOBS = 100
+
+# In-memory job storage (for production, use Redis or database)
+jobs: Dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+
+executor = ThreadPoolExecutor(max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="lms-job")
+
+def create_job(job_type: str) -> dict:
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "job_type": job_type,
+        "status": "pending",
+        "total": 0,
+        "processed": 0,
+        "success": 0,
+        "errors": 0,
+        "error_details": [],
+        "result": None,
+        "created_at": datetime.utcnow(),
+        "started_at": None,
+        "finished_at": None
+    }
+    with _jobs_lock:
+        _prune_finished_jobs()
+        jobs[job["job_id"]] = job
+    return job
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _jobs_lock:
+        job = jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, "error_details": list(job["error_details"])}
+
+def set_total(job_id: str, total: int) -> None:
+    with _jobs_lock:
+        jobs[job_id]["total"] = total
+
+def report_progress(job_id: str, success: int = 0, errors: Optional[List[str]] = None) -> None:
+    """Add a finished chunk to the job's counters; safe to call from worker threads."""
+    errors = errors or []
+    with _jobs_lock:
+        job = jobs[job_id]
+        job["success"] += success
+        job["errors"] += len(errors)
+        job["processed"] += success + len(errors)
+        room = MAX_ERROR_DETAILS - len(job["error_details"])
+        if room > 0:
+            job["error_details"].extend(errors[:room])
+
+def run_job(job_id: str, func: Callable, *args) -> None:
+    """Run func(job_id, *args) on the background executor and record its outcome."""
+    def runner():
+        with _jobs_lock:
+            jobs[job_id]["status"] = "running"
+            jobs[job_id]["started_at"] = datetime.utcnow()
+            job_type = jobs[job_id]["job_type"]
+        try:
+            with query_source(f"job:{job_type}"):
+                result = func(job_id, *args)
+        except Exception as e:
+            print(f"Background job {job_id} failed: {e}")
+            with _jobs_lock:
+                jobs[job_id]["status"] = "failed"
+                jobs[job_id]["error_details"].append(str(e))
+                jobs[job_id]["finished_at"] = datetime.utcnow()
+            return
+        with _jobs_lock:
+            jobs[job_id]["status"] = "completed"
+            jobs[job_id]["result"] = result
+            jobs[job_id]["finished_at"] = datetime.utcnow()
+
+    executor.submit(runner)
+
+def chunked(items: List, size: int) -> List[List]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def _prune_finished_jobs() -> None:
+    finished = sorted(
+        (job for job in jobs.values() if job["finished_at"] is not None),
+        key=lambda job: job["finished_at"]
+    )
+    for job in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del jobs[job["job_id"]]
@@ -1,22 +1,33 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.models.user import Lecturer, User
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.models.user import Lecturer, User, Student
 from app.models.academic import Class, Grade, Enrollment, Course
 from app.models.academic_year import AcademicResult, Semester
-from app.utils.academic_calculator import calculate_and_save_semester_result
+from app.utils.academic_calculator import refresh_enrollment_grade
+from app.utils.grading_policy import grading_policies
+from app.utils.class_statistics import get_class_statistics as _get_class_statistics
+from app.services.recalc_queue import recalc_queue
+from app.services.class_service import class_service
+
+# Danh sách lớp cần sinh viên -> user và điểm thành phần của từng đăng ký
+ROSTER_OPTIONS = (
+    joinedload(Enrollment.student).joinedload(Student.user),
+    selectinload(Enrollment.grades),
+)
 
 def get_lecturer_classes(lecturer_id: int, db: Session):
-    classes = db.query(Class).filter(Class.lecturer_id == lecturer_id).all()
-    for c in classes:
-        c.enrolled_count = len(c.enrollments)
-    return classes
+    classes = db.query(Class).options(joinedload(Class.course)).filter(Class.lecturer_id == lecturer_id).all()
+    return class_service.attach_enrolled_counts(db, classes)
 
 def get_class_students(class_id: int, db: Session):
     class_obj = db.query(Class).filter(Class.id == class_id).first()
     if not class_obj:
         return None
     
-    enrollments = db.query(Enrollment).filter(Enrollment.class_id == class_id).all()
+    enrollments = db.query(Enrollment).options(
+        joinedload(Enrollment.student).joinedload(Student.user),
+        joinedload(Enrollment.student).joinedload(Student.department)
+    ).filter(Enrollment.class_id == class_id).all()
     students = []
     for e in enrollments:
         user = e.student.user
@@ -31,7 +42,7 @@ def get_class_students_with_grades(class_id: int, db: Session):
     if not class_obj:
         return None
     
-    enrollments = db.query(Enrollment).filter(Enrollment.class_id == class_id).all()
+    enrollments = db.query(Enrollment).options(*ROSTER_OPTIONS).filter(Enrollment.class_id == class_id).all()
     students = []
     
     for enrollment in enrollments:
@@ -48,13 +59,16 @@ def get_class_students_with_grades(class_id: int, db: Session):
             "midterm_grade": grades.get('midterm'),
             "final_grade": grades.get('final'),
             "lab_grade": grades.get('lab'),
-            "assignment_grade": grades.get('assignment')
+            "assignment_grade": grades.get('assignment'),
+            "final_score": enrollment.final_score,
+            "score_4": enrollment.grade_4,
+            "letter_grade": enrollment.letter_grade
         })
-        
+    
     return students
 
 def get_class_grades(class_id: int, db: Session):
-    enrollments = db.query(Enrollment).filter(Enrollment.class_id == class_id).all()
+    enrollments = db.query(Enrollment).options(*ROSTER_OPTIONS).filter(Enrollment.class_id == class_id).all()
     results = []
     
     for enrollment in enrollments:
@@ -68,11 +82,20 @@ def get_class_grades(class_id: int, db: Session):
             "midterm": grades.get('midterm'),
             "final": grades.get('final'),
             "lab": grades.get('lab'),
-            "assignment": grades.get('assignment')
+            "assignment": grades.get('assignment'),
+            "final_score": enrollment.final_score,
+            "score_4": enrollment.grade_4,
+            "letter_grade": enrollment.letter_grade
         })
     
     return results
 
+def get_class_statistics(class_id: int, lecturer_id: int, db: Session):
+    class_obj = db.query(Class).filter(Class.id == class_id, Class.lecturer_id == lecturer_id).first()
+    if not class_obj:
+        return None
+    return _get_class_statistics(db, class_id)
+
 def add_or_update_grade(class_id: int, student_id: int, grade_data: dict, db: Session):
     enrollment = db.query(Enrollment).filter(
         Enrollment.class_id == class_id,
@@ -86,6 +109,8 @@ def add_or_update_grade(class_id: int, student_id: int, grade_data: dict, db: Se
     if not class_obj or not class_obj.semester:
         return None
     
+    policy = grading_policies.get(db, class_obj.course_id)
+    
     for grade_type, score in grade_data.items():
         if score is None:
             continue
@@ -98,20 +123,20 @@ def add_or_update_grade(class_id: int, student_id: int, grade_data: dict, db: Se
         if existing_grade:
             existing_grade.score = score
         else:
-            weight = {'midterm': 0.3, 'final': 0.5, 'lab': 0.1, 'assignment': 0.1}.get(grade_type, 0.0)
             new_grade = Grade(
                 enrollment_id=enrollment.id,
                 grade_type=grade_type,
                 score=score,
-                weight=weight
+                weight=policy.weight_for(grade_type)
             )
             db.add(new_grade)
     
+    refresh_enrollment_grade(enrollment, db)
     db.commit()
     
     semester = db.query(Semester).filter(Semester.code == class_obj.semester).first()
     if semester:
-        calculate_and_save_semester_result(student_id, semester.id, db)
+        recalc_queue.enqueue(student_id, semester.id, class_id)
     
     return {"success": True}
 
@@ -0,0 +1,209 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.database import SessionLocal
+from app.utils.academic_calculator import calculate_all_students_in_semester
+from app.utils.class_statistics import refresh_class_statistics
+
+MAX_FAILED_KEYS = 1000
+
+class RecalculationQueue:
+    """
+    Deduplicating queue of (student_id, semester_id) semester-result recalculations.
+
+    Grade writes only enqueue a key, tagged with the class whose grades
+    changed; a background worker waits up to max_delay seconds after the
+    first pending key (or until batch_size keys are pending), recomputes the
+    statistics of every tagged class once and recalculates each semester's
+    affected students (results, cumulative totals, rankings) in one bulk pass.
+
+    Keys whose recalculation fails are retried after retry_delay seconds,
+    doubling on each attempt; after max_attempts (or when the queue stops
+    with retries outstanding) they are kept in failed() for inspection.
+    """
+
+    def __init__(self, max_delay: float, batch_size: int, max_attempts: int = 5, retry_delay: float = 5.0):
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._pending: Set[Tuple[int, int]] = set()
+        # key -> classes whose statistics must be recomputed with it; kept across retries
+        self._class_ids: Dict[Tuple[int, int], Set[int]] = defaultdict(set)
+        self._first_pending_at: Optional[float] = None
+        # key -> (failed attempts, last error) / monotonic time of the next attempt
+        self._attempts: Dict[Tuple[int, int], Tuple[int, str]] = {}
+        self._retry_at: Dict[Tuple[int, int], float] = {}
+        self._failed: "OrderedDict[Tuple[int, int], dict]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def enqueue(self, student_id: int, semester_id: int, class_id: Optional[int] = None) -> None:
+        with self._cond:
+            key = (student_id, semester_id)
+            if class_id is not None:
+                self._class_ids[key].add(class_id)
+            self._retry_at.pop(key, None)
+            self._add_pending(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._stopping = False
+                self._start_worker()
+            self._cond.notify()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def failed(self) -> List[dict]:
+        """Keys that ran out of attempts, oldest first."""
+        with self._cond:
+            return [dict(record) for record in self._failed.values()]
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {"pending": len(self._pending), "retrying": len(self._retry_at), "failed": self.failed()}
+
+    def flush(self) -> None:
+        """Process every pending key synchronously in the calling thread."""
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch:
+                return
+            self._process(batch)
+
+    def stop(self) -> None:
+        """Stop the worker, process pending keys and record outstanding retries as failed."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            worker = self._worker
+        if worker is not None:
+            worker.join()
+        self.flush()
+        with self._cond:
+            for key in list(self._retry_at):
+                del self._retry_at[key]
+                self._class_ids.pop(key, None)
+                attempts, error = self._attempts.pop(key)
+                self._record_failed(key, attempts, f"{error} (retry pending at shutdown)")
+
+    def _start_worker(self) -> None:
+        self._worker = threading.Thread(target=self._run, name="recalc-queue", daemon=True)
+        self._worker.start()
+
+    def _add_pending(self, key: Tuple[int, int]) -> None:
+        if not self._pending:
+            self._first_pending_at = time.monotonic()
+        self._pending.add(key)
+
+    def _promote_retries(self) -> Optional[float]:
+        """Move keys whose backoff has elapsed into pending; seconds until the next retry, or None."""
+        now = time.monotonic()
+        for key, ready_at in list(self._retry_at.items()):
+            if ready_at <= now:
+                del self._retry_at[key]
+                self._add_pending(key)
+        return min(self._retry_at.values()) - now if self._retry_at else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    next_retry = self._promote_retries()
+                    if self._pending or self._stopping:
+                        break
+                    self._cond.wait(next_retry)
+                if self._stopping:
+                    return
+                deadline = self._first_pending_at + self.max_delay
+                while len(self._pending) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+            self._process(batch)
+
+    def _take_batch(self) -> Set[Tuple[int, int]]:
+        batch = set()
+        while self._pending and len(batch) < self.batch_size:
+            batch.add(self._pending.pop())
+        if not self._pending:
+            self._first_pending_at = None
+        return batch
+
+    def _process(self, batch: Set[Tuple[int, int]]) -> None:
+        students_by_semester = defaultdict(list)
+        for student_id, semester_id in batch:
+            students_by_semester[semester_id].append(student_id)
+
+        with self._cond:
+            class_ids = {key: self._class_ids.pop(key) for key in batch if key in self._class_ids}
+
+        db = SessionLocal()
+        try:
+            for semester_id, student_ids in students_by_semester.items():
+                keys = [(student_id, semester_id) for student_id in student_ids]
+                try:
+                    # Recomputing is idempotent, so a retry after a partial failure is harmless
+                    refresh_class_statistics(db, set().union(*(class_ids.get(key, ()) for key in keys)))
+                    db.commit()
+                    calculate_all_students_in_semester(semester_id, db, student_ids=student_ids)
+                except Exception as e:
+                    db.rollback()
+                    print(f"ERROR recalculating semester {semester_id} for {len(student_ids)} students: {e}")
+                    self._retry_later(keys, str(e), class_ids)
+                else:
+                    self._succeeded(keys)
+        finally:
+            db.close()
+
+    def _retry_later(
+        self, keys: List[Tuple[int, int]], error: str, class_ids: Dict[Tuple[int, int], Set[int]]
+    ) -> None:
+        with self._cond:
+            now = time.monotonic()
+            for key in keys:
+                attempts = self._attempts.get(key, (0, None))[0] + 1
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(key, None)
+                    self._record_failed(key, attempts, error)
+                else:
+                    if key in class_ids:
+                        self._class_ids[key] |= class_ids[key]
+                    self._attempts[key] = (attempts, error)
+                    self._retry_at[key] = now + self.retry_delay * 2 ** (attempts - 1)
+            # flush() runs without a worker; retries need one unless we are stopping
+            if self._retry_at and not self._stopping and (self._worker is None or not self._worker.is_alive()):
+                self._start_worker()
+            self._cond.notify()
+
+    def _succeeded(self, keys: List[Tuple[int, int]]) -> None:
+        with self._cond:
+            for key in keys:
+                self._attempts.pop(key, None)
+                self._failed.pop(key, None)
+
+    def _record_failed(self, key: Tuple[int, int], attempts: int, error: str) -> None:
+        self._failed.pop(key, None)
+        self._failed[key] = {
+            "student_id": key[0],
+            "semester_id": key[1],
+            "attempts": attempts,
+            "error": error,
+            "failed_at": datetime.utcnow()
+        }
+        while len(self._failed) > MAX_FAILED_KEYS:
+            self._failed.popitem(last=False)
+
+recalc_queue = RecalculationQueue(
+    max_delay=settings.RECALC_QUEUE_MAX_DELAY_SECONDS,
+    batch_size=settings.RECALC_QUEUE_BATCH_SIZE,
+    max_attempts=settings.RECALC_QUEUE_MAX_ATTEMPTS,
+    retry_delay=settings.RECALC_QUEUE_RETRY_DELAY_SECONDS
+)
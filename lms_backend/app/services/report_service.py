@@ -1,8 +1,9 @@
 from typing import List, Optional
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.models.report import Report, ReportStatus, ReportType
 from app.models.user import Student
+from app.utils.pagination import Page, cached_total, keyset_paginate
 
 def create_report(student_id: int, title: str, description: str, report_type: str, db: Session):
     report = Report(
@@ -17,75 +18,63 @@ def create_report(student_id: int, title: str, description: str, report_type: st
     db.refresh(report)
     return report
 
+# Các quan hệ mà dòng báo cáo cần: nạp sẵn để không phát sinh truy vấn theo từng dòng
+REPORT_LOAD_OPTIONS = (
+    joinedload(Report.student).joinedload(Student.user),
+    joinedload(Report.resolved_by_user),
+)
+
+def _report_row(r: Report) -> dict:
+    return {
+        "id": r.id,
+        "student_id": r.student_id,
+        "student_code": r.student.student_code if r.student else None,
+        "student_name": r.student.user.full_name if r.student and r.student.user else "Unknown",
+        "title": r.title,
+        "description": r.description,
+        "report_type": r.report_type.value,
+        "status": r.status.value,
+        "dean_response": r.dean_response,
+        "created_at": r.created_at,
+        "updated_at": r.updated_at,
+        "resolved_at": r.resolved_at,
+        "resolved_by_name": r.resolved_by_user.full_name if r.resolved_by_user else None
+    }
+
 def get_student_reports(student_id: int, db: Session):
-    reports = db.query(Report).filter(Report.student_id == student_id).order_by(Report.created_at.desc()).all()
+    reports = db.query(Report).options(*REPORT_LOAD_OPTIONS).filter(
+        Report.student_id == student_id
+    ).order_by(Report.created_at.desc()).all()
     
-    return [
-        {
-            "id": r.id,
-            "student_id": r.student_id,
-            "student_code": r.student.student_code if r.student else None,
-            "student_name": r.student.user.full_name if r.student and r.student.user else "Unknown",
-            "title": r.title,
-            "description": r.description,
-            "report_type": r.report_type.value,
-            "status": r.status.value,
-            "dean_response": r.dean_response,
-            "created_at": r.created_at,
-            "updated_at": r.updated_at,
-            "resolved_at": r.resolved_at,
-            "resolved_by_name": r.resolved_by_user.full_name if r.resolved_by_user else None
-        }
-        for r in reports
-    ]
+    return [_report_row(r) for r in reports]
 
-def get_all_reports(status_filter: Optional[str], db: Session, skip: int = 0, limit: int = 100):
+def get_all_reports(
+    status_filter: Optional[str],
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     query = db.query(Report)
     
     if status_filter:
         query = query.filter(Report.status == status_filter)
     
-    reports = query.order_by(Report.created_at.desc()).offset(skip).limit(limit).all()
+    # Mới nhất trước theo id (tăng cùng created_at), dùng được index (status, id)
+    page = keyset_paginate(query.options(*REPORT_LOAD_OPTIONS), [Report.id], limit, cursor, skip, descending=True)
     
-    return [
-        {
-            "id": r.id,
-            "student_id": r.student_id,
-            "student_code": r.student.student_code if r.student else None,
-            "student_name": r.student.user.full_name if r.student and r.student.user else "Unknown",
-            "title": r.title,
-            "description": r.description,
-            "report_type": r.report_type.value,
-            "status": r.status.value,
-            "dean_response": r.dean_response,
-            "created_at": r.created_at,
-            "updated_at": r.updated_at,
-            "resolved_at": r.resolved_at,
-            "resolved_by_name": r.resolved_by_user.full_name if r.resolved_by_user else None
-        }
-        for r in reports
-    ]
+    return page._replace(
+        items=[_report_row(r) for r in page.items],
+        total=cached_total(("reports", status_filter), query) if include_total else None
+    )
 
 def get_report_by_id(report_id: int, db: Session):
-    report = db.query(Report).filter(Report.id == report_id).first()
+    report = db.query(Report).options(*REPORT_LOAD_OPTIONS).filter(Report.id == report_id).first()
     if not report:
         return None
     
-    return {
-        "id": report.id,
-        "student_id": report.student_id,
-        "student_code": report.student.student_code if report.student else None,
-        "student_name": report.student.user.full_name if report.student and report.student.user else "Unknown",
-        "title": report.title,
-        "description": report.description,
-        "report_type": report.report_type.value,
-        "status": report.status.value,
-        "dean_response": report.dean_response,
-        "created_at": report.created_at,
-        "updated_at": report.updated_at,
-        "resolved_at": report.resolved_at,
-        "resolved_by_name": report.resolved_by_user.full_name if report.resolved_by_user else None
-    }
+    return _report_row(report)
 
 def update_report(report_id: int, status: Optional[str], dean_response: Optional[str], dean_id: int, db: Session):
     report = db.query(Report).filter(Report.id == report_id).first()
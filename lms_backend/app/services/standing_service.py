@@ -0,0 +1,204 @@
+from collections import Counter
+from typing import List, Optional, Tuple
+from sqlalchemy import select, and_, or_, exists
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.academic_standing import AcademicStanding
+from app.models.academic_year import AcademicResult, Semester
+from app.models.user import Student, User
+from app.services import job_service
+
+STANDING_REASONS = ("LOW_GPA", "LOW_CPA", "FAILED_CREDITS")
+
+def evaluate_standing(
+    gpa: float,
+    cpa: float,
+    failed_credits: int,
+    previous_level: int = 0
+) -> Tuple[int, List[str]]:
+    """
+    Xét cảnh báo học tập của 1 sinh viên theo các ngưỡng trong settings
+
+    Returns:
+        Tuple (mức cảnh báo, danh sách lý do); mức tăng dần nếu bị cảnh báo liên tiếp
+    """
+    reasons = []
+    if (gpa or 0.0) < settings.STANDING_MIN_GPA:
+        reasons.append("LOW_GPA")
+    if (cpa or 0.0) < settings.STANDING_MIN_CPA:
+        reasons.append("LOW_CPA")
+    if (failed_credits or 0) > settings.STANDING_MAX_FAILED_CREDITS:
+        reasons.append("FAILED_CREDITS")
+
+    if not reasons:
+        return 0, reasons
+    return min(previous_level + 1, settings.STANDING_MAX_WARNING_LEVEL), reasons
+
+def _previous_semester_id(semester: Semester, db: Session) -> Optional[int]:
+    row = db.query(Semester.id).filter(
+        or_(
+            Semester.start_date < semester.start_date,
+            and_(Semester.start_date == semester.start_date, Semester.id < semester.id)
+        )
+    ).order_by(Semester.start_date.desc(), Semester.id.desc()).first()
+    return row[0] if row else None
+
+def evaluate_semester_standing(
+    semester_id: int,
+    db: Session,
+    job_id: Optional[str] = None,
+    chunk_size: Optional[int] = None
+) -> dict:
+    """
+    Xét cảnh báo học tập cho toàn bộ sinh viên có kết quả trong học kỳ
+
+    Đọc AcademicResult (GPA, CPA tính đến học kỳ, tín chỉ trượt) theo từng lô
+    student_id tăng dần bằng Core select, không nạp ORM object, ghi và commit theo lô
+    nên bộ nhớ chỉ phụ thuộc chunk_size.
+
+    Returns:
+        Dict thống kê số sinh viên theo mức cảnh báo
+    """
+    semester = db.query(Semester).filter(Semester.id == semester_id).first()
+    if not semester:
+        raise ValueError(f"Semester {semester_id} not found")
+
+    chunk_size = chunk_size or settings.STANDING_CHUNK_SIZE
+    previous_id = _previous_semester_id(semester, db)
+    evaluated_results = and_(AcademicResult.semester_id == semester_id, AcademicResult.total_credits > 0)
+
+    if job_id:
+        total = db.query(AcademicResult.id).filter(evaluated_results).count()
+        job_service.set_total(job_id, total)
+
+    levels = Counter()
+    reason_counts = Counter()
+    last_student_id = None
+    while True:
+        query = select(
+            AcademicResult.student_id, AcademicResult.gpa, AcademicResult.cpa, AcademicResult.failed_credits
+        ).where(evaluated_results)
+        if last_student_id is not None:
+            query = query.where(AcademicResult.student_id > last_student_id)
+        rows = db.execute(query.order_by(AcademicResult.student_id).limit(chunk_size)).all()
+        if not rows:
+            break
+
+        student_ids = [row.student_id for row in rows]
+        previous_levels = {}
+        if previous_id is not None:
+            previous_levels = dict(db.execute(
+                select(AcademicStanding.student_id, AcademicStanding.warning_level).where(
+                    AcademicStanding.semester_id == previous_id,
+                    AcademicStanding.student_id.in_(student_ids)
+                )
+            ).all())
+        existing = dict(db.execute(
+            select(AcademicStanding.student_id, AcademicStanding.id).where(
+                AcademicStanding.semester_id == semester_id,
+                AcademicStanding.student_id.in_(student_ids)
+            )
+        ).all())
+
+        updates, inserts = [], []
+        for row in rows:
+            level, reasons = evaluate_standing(
+                row.gpa, row.cpa, row.failed_credits, previous_levels.get(row.student_id, 0)
+            )
+            levels[level] += 1
+            reason_counts.update(reasons)
+            values = {
+                "warning_level": level,
+                "reasons": ",".join(reasons) or None,
+                "gpa": row.gpa,
+                "cpa": row.cpa,
+                "failed_credits": row.failed_credits
+            }
+            if row.student_id in existing:
+                updates.append({"id": existing[row.student_id], **values})
+            else:
+                inserts.append({"student_id": row.student_id, "semester_id": semester_id, **values})
+
+        db.bulk_update_mappings(AcademicStanding, updates)
+        db.bulk_insert_mappings(AcademicStanding, inserts)
+        db.commit()
+
+        if job_id:
+            job_service.report_progress(job_id, success=len(rows))
+        last_student_id = student_ids[-1]
+
+    # Sinh viên không còn kết quả được tính trong học kỳ
+    db.query(AcademicStanding).filter(
+        AcademicStanding.semester_id == semester_id,
+        ~exists().where(and_(
+            AcademicResult.student_id == AcademicStanding.student_id,
+            evaluated_results
+        ))
+    ).delete(synchronize_session=False)
+    db.commit()
+
+    return {
+        "semester_id": semester_id,
+        "semester_code": semester.code,
+        "evaluated": sum(levels.values()),
+        "warnings": sum(count for level, count in levels.items() if level > 0),
+        "by_level": {str(level): count for level, count in sorted(levels.items())},
+        "by_reason": dict(reason_counts)
+    }
+
+def start_standing_job(semester_id: int):
+    job = job_service.create_job("academic_standing")
+    job_service.run_job(job["job_id"], _standing_job, semester_id)
+    return job_service.get_job(job["job_id"])
+
+def _standing_job(job_id: str, semester_id: int):
+    db = SessionLocal()
+    try:
+        return evaluate_semester_standing(semester_id, db, job_id=job_id)
+    finally:
+        db.close()
+
+def list_academic_standings(
+    semester_id: int,
+    db: Session,
+    min_level: int = 1,
+    reason: Optional[str] = None,
+    department_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100
+):
+    if reason is not None and reason not in STANDING_REASONS:
+        raise ValueError(f"Reason must be one of: {', '.join(STANDING_REASONS)}")
+
+    query = db.query(AcademicStanding, Student.student_code, User.full_name).join(
+        Student, Student.user_id == AcademicStanding.student_id
+    ).join(
+        User, User.id == Student.user_id
+    ).filter(
+        AcademicStanding.semester_id == semester_id,
+        AcademicStanding.warning_level >= min_level
+    )
+    if reason is not None:
+        query = query.filter(AcademicStanding.reasons.contains(reason))
+    if department_id is not None:
+        query = query.filter(Student.department_id == department_id)
+
+    rows = query.order_by(
+        AcademicStanding.warning_level.desc(), AcademicStanding.student_id
+    ).offset(skip).limit(limit).all()
+
+    return [
+        {
+            "student_id": standing.student_id,
+            "student_code": student_code,
+            "full_name": full_name,
+            "warning_level": standing.warning_level,
+            "reasons": standing.reasons.split(",") if standing.reasons else [],
+            "gpa": standing.gpa,
+            "cpa": standing.cpa,
+            "failed_credits": standing.failed_credits,
+            "evaluated_at": standing.evaluated_at
+        }
+        for standing, student_code, full_name in rows
+    ]
@@ -0,0 +1,117 @@
+from typing import Optional
+from sqlalchemy import Integer, case, cast, func
+from sqlalchemy.orm import Session
+from app.models.academic import Class, Course, Department, Enrollment
+from app.models.user import Student
+from app.utils.academic_calculator import GRADE_CONVERSION
+
+DISTRIBUTION_GROUPS = ("course", "class", "department", "semester")
+MAX_SCORE = 10.0
+
+def _group_column(group_by: str):
+    return {
+        "course": Class.course_id,
+        "class": Enrollment.class_id,
+        "department": Student.department_id,
+        "semester": Class.semester,
+    }[group_by]
+
+def _group_labels(db: Session, group_by: str, keys) -> dict:
+    if group_by == "course":
+        rows = db.query(Course.id, Course.code, Course.name).filter(Course.id.in_(keys)).all()
+        return {key: {"code": code, "name": name} for key, code, name in rows}
+    if group_by == "class":
+        rows = db.query(Class.id, Class.code, Course.name).join(
+            Course, Class.course_id == Course.id
+        ).filter(Class.id.in_(keys)).all()
+        return {key: {"code": code, "name": name} for key, code, name in rows}
+    if group_by == "department":
+        rows = db.query(Department.id, Department.name).filter(Department.id.in_(keys)).all()
+        return {key: {"code": None, "name": name} for key, name in rows}
+    return {key: {"code": key, "name": key} for key in keys}
+
+def get_grade_distribution(
+    db: Session,
+    group_by: str = "course",
+    semester_code: Optional[str] = None,
+    course_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    department_id: Optional[int] = None,
+    bin_width: float = 1.0
+):
+    """
+    Phân bố điểm chữ và điểm tổng kết (thang 10) theo môn/lớp/khoa/học kỳ
+
+    Đếm trực tiếp trong DB bằng GROUP BY trên Enrollment.letter_grade và
+    số thứ tự khoảng điểm của Enrollment.final_score, 2 truy vấn cho mọi nhóm.
+    """
+    if group_by not in DISTRIBUTION_GROUPS:
+        raise ValueError(f"group_by must be one of: {', '.join(DISTRIBUTION_GROUPS)}")
+    bin_count = int(round(MAX_SCORE / bin_width)) if bin_width > 0 else 0
+    if not bin_count or abs(bin_count * bin_width - MAX_SCORE) > 1e-9:
+        raise ValueError("bin_width must divide 10 evenly (e.g. 0.5, 1, 2)")
+
+    key = _group_column(group_by)
+    criteria = [Enrollment.final_score.isnot(None)]
+    if semester_code is not None:
+        criteria.append(Class.semester == semester_code)
+    if course_id is not None:
+        criteria.append(Class.course_id == course_id)
+    if class_id is not None:
+        criteria.append(Enrollment.class_id == class_id)
+    if department_id is not None:
+        criteria.append(Student.department_id == department_id)
+
+    def grouped(*columns):
+        query = db.query(key, *columns).join(Class, Enrollment.class_id == Class.id)
+        if group_by == "department" or department_id is not None:
+            query = query.join(Student, Student.user_id == Enrollment.student_id)
+        return query.filter(*criteria)
+
+    # Điểm tối đa thuộc khoảng cuối cùng thay vì tạo thêm 1 khoảng
+    score_bin = case(
+        (Enrollment.final_score >= MAX_SCORE, bin_count - 1),
+        else_=cast(func.floor((Enrollment.final_score + 1e-9) / bin_width), Integer)
+    )
+
+    letter_rows = grouped(Enrollment.letter_grade, func.count()).group_by(key, Enrollment.letter_grade).all()
+    bin_rows = grouped(score_bin, func.count()).group_by(key, score_bin).all()
+
+    letters = [letter for _, _, _, letter in GRADE_CONVERSION]
+    histograms = {}
+
+    def histogram(group_key):
+        if group_key not in histograms:
+            histograms[group_key] = {
+                "total": 0,
+                "letters": dict.fromkeys(letters, 0),
+                "bins": [0] * bin_count
+            }
+        return histograms[group_key]
+
+    for group_key, letter, count in letter_rows:
+        entry = histogram(group_key)
+        entry["letters"][letter] = entry["letters"].get(letter, 0) + count
+        entry["total"] += count
+    for group_key, index, count in bin_rows:
+        histogram(group_key)["bins"][min(max(int(index), 0), bin_count - 1)] += count
+
+    labels = _group_labels(db, group_by, list(histograms))
+    return [
+        {
+            "group_by": group_by,
+            "key": group_key,
+            **labels.get(group_key, {"code": None, "name": None}),
+            "total": entry["total"],
+            "letters": entry["letters"],
+            "scores": [
+                {
+                    "min": round(i * bin_width, 2),
+                    "max": MAX_SCORE if i == bin_count - 1 else round((i + 1) * bin_width, 2),
+                    "count": count
+                }
+                for i, count in enumerate(entry["bins"])
+            ]
+        }
+        for group_key, entry in sorted(histograms.items(), key=lambda item: str(item[0]))
+    ]
@@ -1,16 +1,28 @@
 from typing import List, Optional, Tuple
-from sqlalchemy.orm import Session
-from app.models.user import Student, User
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.models.user import Student, User, Lecturer
 from app.models.academic import Enrollment, Grade, Class, Course
 from app.models.academic_year import AcademicResult, Semester
 from app.models.cumulative_result import CumulativeResult
-from app.utils.academic_calculator import convert_score_to_grade_4, calculate_final_score
+from app.models.timetable import Timetable
 
-def get_student_enrollments(student_id: int, db: Session) -> List[Enrollment]:
-    return db.query(Enrollment).filter(Enrollment.student_id == student_id).all()
+# Nạp sẵn lớp -> môn và lớp -> giảng viên -> user cho các dòng hiển thị theo lớp
+CLASS_DETAIL_OPTIONS = (
+    joinedload(Enrollment.class_).joinedload(Class.course),
+    joinedload(Enrollment.class_).joinedload(Class.lecturer).joinedload(Lecturer.user),
+)
+GRADE_OPTIONS = (
+    joinedload(Enrollment.class_).joinedload(Class.course),
+    selectinload(Enrollment.grades),
+)
+
+def get_student_enrollments(student_id: int, db: Session, *options) -> List[Enrollment]:
+    return db.query(Enrollment).options(*options).filter(Enrollment.student_id == student_id).all()
 
 def get_student_classes(student_id: int, db: Session):
-    enrollments = get_student_enrollments(student_id, db)
+    enrollments = get_student_enrollments(student_id, db, *CLASS_DETAIL_OPTIONS)
     return [
         {
             "id": e.class_.id,
@@ -26,37 +38,30 @@ def get_student_classes(student_id: int, db: Session):
         for e in enrollments
     ]
 
-def get_student_grades(student_id: int, db: Session):
-    enrollments = get_student_enrollments(student_id, db)
-    results = []
-    
-    for enrollment in enrollments:
-        class_info = enrollment.class_
-        course_info = class_info.course
-        
-        display_grade = None
-        for g in enrollment.grades:
-            if g.grade_type == 'final':
-                display_grade = g.score
-                break
-        if display_grade is None and enrollment.grades:
-            display_grade = enrollment.grades[0].score
-
-        grade_details = [
+def _grade_row(enrollment: Enrollment) -> dict:
+    course_info = enrollment.class_.course
+    return {
+        "course_name": course_info.name,
+        "credits": course_info.credits,
+        "grade": enrollment.final_score,
+        "details": [
             {'grade_type': g.grade_type, 'score': g.score, 'weight': g.weight}
             for g in enrollment.grades
         ]
+    }
 
-        results.append({
-            "course_name": course_info.name,
-            "credits": course_info.credits,
-            "grade": display_grade,
-            "details": grade_details
-        })
-    return results
+def get_student_grades(student_id: int, db: Session):
+    enrollments = get_student_enrollments(student_id, db, *GRADE_OPTIONS)
+    return [_grade_row(enrollment) for enrollment in enrollments]
+
+async def get_student_grades_async(student_id: int, db: AsyncSession):
+    result = await db.execute(
+        select(Enrollment).options(*GRADE_OPTIONS).where(Enrollment.student_id == student_id)
+    )
+    return [_grade_row(enrollment) for enrollment in result.unique().scalars()]
 
 def get_student_projects(student_id: int, db: Session):
-    enrollments = db.query(Enrollment).join(Class).join(Course).filter(
+    enrollments = db.query(Enrollment).join(Class).join(Course).options(*CLASS_DETAIL_OPTIONS).filter(
         Enrollment.student_id == student_id,
         Course.name.ilike("%đồ án%")
     ).all()
@@ -77,7 +82,9 @@ def get_student_projects(student_id: int, db: Session):
     ]
 
 def get_academic_summary(student_id: int, db: Session):
-    semester_results = db.query(AcademicResult).filter(
+    semester_results = db.query(AcademicResult).options(
+        joinedload(AcademicResult.semester)
+    ).filter(
         AcademicResult.student_id == student_id
     ).join(Semester).order_by(Semester.start_date).all()
     
@@ -90,9 +97,11 @@ def get_academic_summary(student_id: int, db: Session):
             "semester_code": r.semester.code,
             "semester_name": r.semester.name,
             "gpa": r.gpa,
+            "cpa": r.cpa,
             "total_credits": r.total_credits,
             "completed_credits": r.completed_credits,
-            "failed_credits": r.failed_credits
+            "failed_credits": r.failed_credits,
+            "cumulative_credits": r.cumulative_credits
         }
         for r in semester_results
     ]
@@ -118,31 +127,30 @@ def get_semester_detail(student_id: int, semester_code: str, db: Session):
     if not result:
         return None
     
-    enrollments = db.query(Enrollment).join(Class).filter(
+    rows = db.query(
+        Course.code, Course.name, Course.credits,
+        Enrollment.final_score, Enrollment.grade_4, Enrollment.letter_grade
+    ).join(
+        Class, Enrollment.class_id == Class.id
+    ).join(
+        Course, Class.course_id == Course.id
+    ).filter(
         Enrollment.student_id == student_id,
         Class.semester == semester_code
-    ).all()
+    ).order_by(Enrollment.id).all()
     
-    courses = []
-    for enrollment in enrollments:
-        course = enrollment.class_.course
-        final_score_10 = calculate_final_score(enrollment.grades)
-        
-        if final_score_10 is not None:
-            score_4, letter_grade = convert_score_to_grade_4(final_score_10)
-        else:
-            score_4 = None
-            letter_grade = None
-        
-        courses.append({
-            "course_code": course.code,
-            "course_name": course.name,
-            "credits": course.credits,
-            "score_10": final_score_10,
-            "score_4": score_4,
+    courses = [
+        {
+            "course_code": code,
+            "course_name": name,
+            "credits": credits,
+            "score_10": final_score,
+            "score_4": grade_4,
             "letter_grade": letter_grade,
             "grade_type": "final"
-        })
+        }
+        for code, name, credits, final_score, grade_4, letter_grade in rows
+    ]
     
     return {
         "semester_code": semester.code,
@@ -155,24 +163,39 @@ def get_semester_detail(student_id: int, semester_code: str, db: Session):
         "courses": courses
     }
 
+TIMETABLE_OPTIONS = (
+    joinedload(Timetable.class_).joinedload(Class.course),
+    joinedload(Timetable.class_).joinedload(Class.lecturer).joinedload(Lecturer.user),
+)
+
+def _timetable_row(t) -> dict:
+    return {
+        "id": t.id,
+        "date": t.date,
+        "start_period": t.start_period,
+        "end_period": t.end_period,
+        "room": t.room,
+        "course_name": t.class_.course.name if t.class_ and t.class_.course else "Unknown",
+        "class_code": t.class_.code if t.class_ else "Unknown",
+        "lecturer_name": t.class_.lecturer.user.full_name if t.class_ and t.class_.lecturer and t.class_.lecturer.user else "Unknown"
+    }
+
 def get_student_timetable(student_id: int, db: Session):
-    from app.models.timetable import Timetable
-    
-    timetables = db.query(Timetable).join(Class).join(Enrollment).filter(
+    timetables = db.query(Timetable).join(Class).join(Enrollment).options(
+        *TIMETABLE_OPTIONS
+    ).filter(
         Enrollment.student_id == student_id,
         Enrollment.class_id == Class.id
     ).order_by(Timetable.date, Timetable.start_period).all()
     
-    return [
-        {
-            "id": t.id,
-            "date": t.date,
-            "start_period": t.start_period,
-            "end_period": t.end_period,
-            "room": t.room,
-            "course_name": t.class_.course.name if t.class_ and t.class_.course else "Unknown",
-            "class_code": t.class_.code if t.class_ else "Unknown",
-            "lecturer_name": t.class_.lecturer.user.full_name if t.class_ and t.class_.lecturer and t.class_.lecturer.user else "Unknown"
-        }
-        for t in timetables
-    ]
+    return [_timetable_row(t) for t in timetables]
+
+async def get_student_timetable_async(student_id: int, db: AsyncSession):
+    result = await db.execute(
+        select(Timetable).join(Class).join(Enrollment).options(
+            *TIMETABLE_OPTIONS
+        ).where(
+            Enrollment.student_id == student_id
+        ).order_by(Timetable.date, Timetable.start_period)
+    )
+    return [_timetable_row(t) for t in result.unique().scalars()]
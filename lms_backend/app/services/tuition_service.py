@@ -1,7 +1,9 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.tuition import Tuition
 from app.models.academic import Enrollment, Class, Course
 from app.models.setting import Setting
+from app.utils.pagination import Page, cached_total, keyset_paginate
 
 DEFAULT_PRICE_PER_CREDIT = 500000
 
@@ -114,7 +116,11 @@ class TuitionService:
     def get_student_tuitions(self, db: Session, student_id: int):
         return db.query(Tuition).filter(Tuition.student_id == student_id).all()
 
-    def get_all_tuitions(self, db: Session, skip: int = 0, limit: int = 100):
-        return db.query(Tuition).offset(skip).limit(limit).all()
+    def get_all_tuitions(
+        self, db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, include_total: bool = False
+    ) -> Page:
+        query = db.query(Tuition)
+        page = keyset_paginate(query, [Tuition.id], limit, cursor, skip)
+        return page._replace(total=cached_total(("tuitions",), query) if include_total else None)
 
 tuition_service = TuitionService()
@@ -0,0 +1,140 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.academic import Enrollment, Grade, Class, Course
+from app.models.academic_year import Semester
+from app.schemas.academic import WhatIfRequest
+from app.utils.academic_calculator import aggregate_credit_totals, convert_score_to_grade_4, weighted_average
+from app.utils.grading_policy import CompiledPolicy, grading_policies
+from app.utils.transcript_cache import transcript_cache
+
+MAX_SCENARIOS = 20
+
+class TranscriptCourse(NamedTuple):
+    course_code: str
+    course_name: str
+    credits: int
+    policy: CompiledPolicy
+    components: Tuple[Tuple[str, float, Optional[float]], ...]  # (grade_type, score, weight)
+
+class Transcript(NamedTuple):
+    semester_code: str
+    semester_name: str
+    prior_points: float  # Σ điểm_thang4 × tín_chỉ của các học kỳ khác
+    prior_credits: int
+    courses: Tuple[TranscriptCourse, ...]
+
+def load_transcript(student_id: int, semester: Semester, db: Session) -> Transcript:
+    """Đọc 1 lần các môn của học kỳ (kèm điểm thành phần, policy) và tổng điểm các học kỳ khác"""
+    prior_points, prior_credits, _, _ = aggregate_credit_totals(
+        db, Enrollment.student_id == student_id, Class.semester != semester.code
+    ).get(student_id, (0.0, 0, 0, 0))
+
+    rows = db.query(Enrollment.id, Class.course_id, Course.code, Course.name, Course.credits).join(
+        Class, Enrollment.class_id == Class.id
+    ).join(
+        Course, Class.course_id == Course.id
+    ).filter(
+        Enrollment.student_id == student_id,
+        Class.semester == semester.code
+    ).order_by(Enrollment.id).all()
+
+    components: Dict[int, List[Tuple[str, float, Optional[float]]]] = {row[0]: [] for row in rows}
+    if rows:
+        grade_rows = db.query(Grade.enrollment_id, Grade.grade_type, Grade.score, Grade.weight).filter(
+            Grade.enrollment_id.in_(list(components))
+        ).order_by(Grade.enrollment_id, Grade.id).all()
+        for enrollment_id, grade_type, score, weight in grade_rows:
+            components[enrollment_id].append((grade_type, score, weight))
+
+    courses = tuple(
+        TranscriptCourse(
+            course_code=code,
+            course_name=name,
+            credits=credits,
+            policy=grading_policies.get(db, course_id),
+            components=tuple(components[enrollment_id])
+        )
+        for enrollment_id, course_id, code, name, credits in rows
+    )
+    return Transcript(semester.code, semester.name, prior_points, prior_credits, courses)
+
+def _project(transcript: Transcript, overrides: Dict[Tuple[str, str], float]) -> dict:
+    """Tính GPA/CPA dự kiến với các điểm giả định, không truy vấn DB"""
+    points, credits = 0.0, 0
+    courses = []
+    for course in transcript.courses:
+        components = [
+            (grade_type, overrides.get((course.course_code, grade_type), score), weight)
+            for grade_type, score, weight in course.components
+        ]
+        present = {grade_type for grade_type, _, _ in components}
+        for (course_code, grade_type), score in overrides.items():
+            if course_code == course.course_code and grade_type not in present:
+                components.append((grade_type, score, course.policy.weight_for(grade_type)))
+
+        result = course.policy.evaluate(components)
+        score_10 = score_4 = letter = passed = None
+        if result is not None:
+            score_10, passed = result
+            score_4, letter = convert_score_to_grade_4(score_10)
+            points += score_4 * course.credits
+            credits += course.credits
+
+        courses.append({
+            "course_code": course.course_code,
+            "course_name": course.course_name,
+            "credits": course.credits,
+            "score_10": score_10,
+            "score_4": score_4,
+            "letter_grade": letter,
+            "passed": passed
+        })
+
+    return {
+        "gpa": weighted_average(points, credits),
+        "cpa": weighted_average(transcript.prior_points + points, transcript.prior_credits + credits),
+        "total_credits": credits,
+        "courses": courses
+    }
+
+def simulate(student_id: int, request: WhatIfRequest, db: Session) -> Optional[dict]:
+    """
+    Tính GPA học kỳ và CPA dự kiến cho các kịch bản điểm giả định
+
+    Bảng điểm được cache theo sinh viên, mỗi kịch bản chỉ tính trong bộ nhớ.
+
+    Returns:
+        Kết quả hiện tại và của từng kịch bản, None nếu không tìm thấy học kỳ
+    """
+    if len(request.scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"At most {MAX_SCENARIOS} scenarios per request")
+
+    if request.semester_code:
+        semester = db.query(Semester).filter(Semester.code == request.semester_code).first()
+    else:
+        semester = db.query(Semester).filter(Semester.is_active == True).first()
+    if not semester:
+        return None
+
+    transcript = transcript_cache.get_or_load(
+        student_id, semester.code, lambda: load_transcript(student_id, semester, db)
+    )
+    course_codes = {course.course_code for course in transcript.courses}
+
+    scenarios = []
+    for scenario in request.scenarios:
+        overrides = {}
+        for item in scenario.scores:
+            if item.course_code not in course_codes:
+                raise ValueError(f"Course {item.course_code} is not in semester {semester.code}")
+            if not 0 <= item.score <= 10:
+                raise ValueError("Scores must be between 0 and 10")
+            overrides[(item.course_code, item.grade_type)] = item.score
+        scenarios.append({"name": scenario.name, **_project(transcript, overrides)})
+
+    return {
+        "semester_code": transcript.semester_code,
+        "semester_name": transcript.semester_name,
+        "current": _project(transcript, {}),
+        "scenarios": scenarios
+    }
@@ -1,11 +1,18 @@
-from typing import List, Tuple, Optional
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple, Optional
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
-from app.models.academic import Enrollment, Grade, Class
+from app.models.academic import Enrollment, Grade, Class, Course
 from app.models.academic_year import AcademicResult, Semester
 from app.models.user import Student
 from app.models.cumulative_result import CumulativeResult
+from app.utils.grading_policy import CompiledPolicy, DEFAULT_POLICY, grading_policies
+from app.utils.semester_ranking import refresh_semester_rankings
+from app.utils.transcript_cache import transcript_cache, invalidate_on_commit
 
 # Bảng quy đổi điểm thang 10 sang thang 4 và chữ
+# Mỗi mức áp dụng từ min_score đến trước min_score của mức kế tiếp (vd. 8.45 -> B+)
 GRADE_CONVERSION = [
     (8.5, 10.0, 4.0, "A"),
     (8.0, 8.4, 3.5, "B+"),
@@ -17,6 +24,26 @@ GRADE_CONVERSION = [
     (0.0, 3.9, 0.0, "F"),
 ]
 
+# Cận dưới tăng dần và kết quả tương ứng, dùng cho tra cứu nhị phân
+_GRADE_LOWER_BOUNDS = [min_score for min_score, _, _, _ in reversed(GRADE_CONVERSION)]
+_GRADE_VALUES = [(grade_4, letter) for _, _, grade_4, letter in reversed(GRADE_CONVERSION)]
+
+def convert_scores_to_grade_4(scores: Iterable[Optional[float]]) -> List[Optional[Tuple[float, str]]]:
+    """
+    Quy đổi hàng loạt điểm thang 10 sang thang 4 và chữ trong 1 lần gọi
+    
+    Args:
+        scores: Danh sách điểm thang 10 (None nếu chưa có điểm)
+    
+    Returns:
+        Danh sách (điểm thang 4, điểm chữ) theo đúng thứ tự, None ở vị trí chưa có điểm
+    """
+    bounds, values = _GRADE_LOWER_BOUNDS, _GRADE_VALUES
+    return [
+        None if score is None else values[max(bisect_right(bounds, score) - 1, 0)]
+        for score in scores
+    ]
+
 def convert_score_to_grade_4(score_10: float) -> Tuple[float, str]:
     """
     Quy đổi điểm thang 10 sang thang 4 và chữ
@@ -28,30 +55,22 @@ def convert_score_to_grade_4(score_10: float) -> Tuple[float, str]:
         Tuple (điểm thang 4, điểm chữ)
     
     """
-    for min_score, max_score, grade_4, letter in GRADE_CONVERSION:
-        if min_score <= score_10 <= max_score:
-            return grade_4, letter
-    return 0.0, "F"
+    return _GRADE_VALUES[max(bisect_right(_GRADE_LOWER_BOUNDS, score_10) - 1, 0)]
 
-def calculate_final_score(grades: List[Grade]) -> Optional[float]:
+def calculate_final_score(grades: List[Grade], policy: Optional[CompiledPolicy] = None) -> Optional[float]:
     """
-    Tính điểm cuối cùng từ các loại điểm (midterm, final, assignment, ...)
-    Ưu tiên lấy điểm 'final' nếu có, nếu không lấy điểm đầu tiên
+    Tính điểm tổng kết từ các loại điểm (midterm, final, assignment, ...)
+    theo trọng số của GradingPolicy (mặc định: trọng số Grade.weight)
     
     Args:
         grades: Danh sách các Grade objects
+        policy: Policy đã biên dịch của môn học (grading_policies.get())
     
     Returns:
-        Điểm cuối cùng (thang 10) hoặc None nếu không có điểm
+        Điểm tổng kết (thang 10) hoặc None nếu chưa đủ điểm
     """
-    if not grades:
-        return None
-    
-    for grade in grades:
-        if grade.grade_type == 'final':
-            return grade.score
-    
-    return grades[0].score
+    policy = policy or DEFAULT_POLICY
+    return policy.final_score([(g.grade_type, g.score, g.weight) for g in grades])
 
 def calculate_semester_gpa(student_id: int, semester_code: str, db: Session) -> Tuple[float, int, int, int]:
     """
@@ -75,41 +94,10 @@ def calculate_semester_gpa(student_id: int, semester_code: str, db: Session) ->
         
         GPA = (3.0×3 + 1.5×3 + 1.0×4) / (3+3+4) = 17.5 / 10 = 1.75
     """
-    enrollments = db.query(Enrollment).join(Class).filter(
-        Enrollment.student_id == student_id,
-        Class.semester == semester_code
-    ).all()
-    
-    if not enrollments:
-        return 0.0, 0, 0, 0
-    
-    total_weighted_score = 0.0
-    total_credits = 0
-    completed_credits = 0
-    failed_credits = 0
-    
-    for enrollment in enrollments:
-        final_score_10 = calculate_final_score(enrollment.grades)
-        
-        if final_score_10 is None:
-            continue  
-        score_4, letter_grade = convert_score_to_grade_4(final_score_10)
-        
-        credits = enrollment.class_.course.credits
-        total_credits += credits
-        
-        total_weighted_score += score_4 * credits
-        
-        if score_4 >= 1.0:  
-            completed_credits += credits
-        else:
-            failed_credits += credits
-    
-    if total_credits == 0:
-        return 0.0, 0, 0, 0
-    
-    gpa = total_weighted_score / total_credits
-    return round(gpa, 2), total_credits, completed_credits, failed_credits
+    results = aggregate_student_results(
+        db, Enrollment.student_id == student_id, Class.semester == semester_code
+    )
+    return results.get(student_id, (0.0, 0, 0, 0))
 
 def calculate_cumulative_cpa_from_courses(student_id: int, db: Session) -> Tuple[float, int, int, int]:
     """
@@ -124,41 +112,15 @@ def calculate_cumulative_cpa_from_courses(student_id: int, db: Session) -> Tuple
     Returns:
         Tuple (cpa, total_registered, total_completed, total_failed)
     """
-    enrollments = db.query(Enrollment).filter(
-        Enrollment.student_id == student_id
-    ).all()
-    
-    total_weighted_score = 0.0
-    total_registered = 0
-    total_completed = 0
-    total_failed = 0
-    
-    for enrollment in enrollments:
-        final_score_10 = calculate_final_score(enrollment.grades)
-        
-        if final_score_10 is None:
-            continue 
-        score_4, _ = convert_score_to_grade_4(final_score_10)
-        
-        credits = enrollment.class_.course.credits
-        total_registered += credits
-        
-        total_weighted_score += score_4 * credits
-        
-        if score_4 >= 1.0:  
-            total_completed += credits
-        else:
-            total_failed += credits
-    
-    if total_registered == 0:
-        return 0.0, 0, 0, 0
-    
-    cpa = total_weighted_score / total_registered
-    return round(cpa, 2), total_registered, total_completed, total_failed
+    results = aggregate_student_results(db, Enrollment.student_id == student_id)
+    return results.get(student_id, (0.0, 0, 0, 0))
 
 def update_cumulative_result(student_id: int, db: Session) -> CumulativeResult:
     """
-    Cập nhật CPA tích lũy cho sinh viên vào bảng cumulative_results
+    Tính lại toàn bộ CPA tích lũy cho sinh viên vào bảng cumulative_results
+    
+    Quét lại mọi enrollment của sinh viên; khi nhập điểm, recalc_queue tính lại
+    theo lô cho các sinh viên bị sửa điểm.
     
     Args:
         student_id: ID của sinh viên
@@ -167,35 +129,63 @@ def update_cumulative_result(student_id: int, db: Session) -> CumulativeResult:
     Returns:
         CumulativeResult object đã được lưu
     """
-    cpa, registered, completed, failed = calculate_cumulative_cpa_from_courses(student_id, db)
+    totals = aggregate_credit_totals(db, Enrollment.student_id == student_id)
+    _save_cumulative_totals(db, {student_id: totals.get(student_id, (0.0, 0, 0, 0))})
+    db.commit()
     
-    cumulative = db.query(CumulativeResult).filter(
+    return db.query(CumulativeResult).filter(
         CumulativeResult.student_id == student_id
     ).first()
+
+def compute_enrollment_grade(
+    grades: List[Grade],
+    policy: Optional[CompiledPolicy] = None
+) -> Tuple[Optional[float], Optional[float], Optional[str], Optional[bool]]:
+    """
+    Điểm tổng kết của 1 enrollment từ danh sách điểm thành phần
+    
+    Returns:
+        Tuple (điểm thang 10, điểm thang 4, điểm chữ, qua môn),
+        (None, None, None, None) nếu chưa đủ điểm
+    """
+    policy = policy or DEFAULT_POLICY
+    result = policy.evaluate([(g.grade_type, g.score, g.weight) for g in grades])
+    if result is None:
+        return None, None, None, None
+    final_score_10, passed = result
+    score_4, letter = convert_score_to_grade_4(final_score_10)
+    return final_score_10, score_4, letter, passed
+
+def refresh_enrollment_grade(enrollment: Enrollment, db: Session) -> None:
+    """
+    Cập nhật điểm tổng kết lưu trên Enrollment sau khi thêm/sửa/xóa Grade
     
-    if cumulative:
-        cumulative.cpa = cpa
-        cumulative.total_registered_credits = registered
-        cumulative.total_completed_credits = completed
-        cumulative.total_failed_credits = failed
-    else:
-        cumulative = CumulativeResult(
-            student_id=student_id,
-            cpa=cpa,
-            total_registered_credits=registered,
-            total_completed_credits=completed,
-            total_failed_credits=failed
-        )
-        db.add(cumulative)
+    Tính theo GradingPolicy của môn học (lấy từ cache) và ghi lại final_score,
+    grade_4, letter_grade, is_passed. Không commit, caller commit cùng với điểm rồi
+    đưa (student_id, semester_id, class_id) vào recalc_queue: thống kê lớp, CPA
+    tích lũy và kết quả học kỳ được tính lại theo lô ở đó.
     
-    db.commit()
-    db.refresh(cumulative)
-    return cumulative
+    Args:
+        enrollment: Enrollment vừa thay đổi điểm (Grade chưa được flush)
+        db: Database session
+    """
+    policy = grading_policies.get(db, enrollment.class_.course_id)
+    db.flush()
+    db.expire(enrollment, ['grades'])
+    final_score_10, score_4, letter, passed = compute_enrollment_grade(enrollment.grades, policy)
+    
+    enrollment.final_score = final_score_10
+    enrollment.grade_4 = score_4
+    enrollment.letter_grade = letter
+    enrollment.is_passed = passed
+    invalidate_on_commit(db, enrollment.student_id)
 
-def calculate_and_save_semester_result(student_id: int, semester_id: int, db: Session) -> AcademicResult:
+def calculate_and_save_semester_result(student_id: int, semester_id: int, db: Session) -> Optional[AcademicResult]:
     """
-    Tính toán và lưu kết quả học tập của sinh viên cho 1 học kỳ (chỉ GPA)
-    CPA sẽ được tính riêng qua update_cumulative_result()
+    Tính toán và lưu kết quả học tập của 1 sinh viên cho 1 học kỳ
+    
+    Chạy calculate_all_students_in_semester() cho riêng sinh viên này nên GPA, CPA tại
+    học kỳ, tổng tích lũy (CumulativeResult) và xếp hạng học kỳ giống hệt khi tính cả học kỳ.
     
     Args:
         student_id: ID của sinh viên
@@ -203,54 +193,240 @@ def calculate_and_save_semester_result(student_id: int, semester_id: int, db: Se
         db: Database session
     
     Returns:
-        AcademicResult object đã được lưu
-    """
-    semester = db.query(Semester).filter(Semester.id == semester_id).first()
-    if not semester:
-        raise ValueError(f"Semester {semester_id} not found")
-    
-    gpa, total_credits, completed_credits, failed_credits = calculate_semester_gpa(
-        student_id, semester.code, db
-    )
+        AcademicResult đã được lưu, None nếu sinh viên không học môn nào trong học kỳ
     
-    existing_result = db.query(AcademicResult).filter(
+    Raises:
+        ValueError: Không tìm thấy học kỳ
+    """
+    if not calculate_all_students_in_semester(semester_id, db, student_ids=[student_id]):
+        return None
+    return db.query(AcademicResult).filter(
         AcademicResult.student_id == student_id,
         AcademicResult.semester_id == semester_id
     ).first()
+
+def weighted_average(weighted: float, total: int) -> float:
+    """Trung bình có trọng số (Σ điểm × tín chỉ / Σ tín chỉ), làm tròn 2 chữ số; 0.0 nếu chưa có tín chỉ"""
+    if not total:
+        return 0.0
+    return round(weighted / total, 2)
+
+def aggregate_credit_totals(db: Session, *criteria, by_semester: bool = False) -> Dict:
+    """
+    Tổng hợp điểm theo tín chỉ cho nhiều sinh viên trong 1 lượt truy vấn
     
-    if existing_result:
-        existing_result.gpa = gpa
-        existing_result.total_credits = total_credits
-        existing_result.completed_credits = completed_credits
-        existing_result.failed_credits = failed_credits
-        db.commit()
-        db.refresh(existing_result)
-        result = existing_result
-    else:
-        new_result = AcademicResult(
-            student_id=student_id,
-            semester_id=semester_id,
-            gpa=gpa,
-            total_credits=total_credits,
-            completed_credits=completed_credits,
-            failed_credits=failed_credits
-        )
-        db.add(new_result)
+    Args:
+        db: Database session
+        *criteria: Điều kiện lọc trên Enrollment/Class/Course
+        by_semester: Tách riêng theo từng học kỳ thay vì cộng dồn theo sinh viên
+    
+    Returns:
+        Dict student_id (hoặc (student_id, mã học kỳ) nếu by_semester) ->
+        (Σ điểm_thang4 × tín_chỉ, total_credits, completed_credits, failed_credits)
+        Sinh viên có enrollment nhưng chưa có điểm vẫn có mặt với giá trị 0
+    
+    Cộng trực tiếp cột Enrollment.grade_4 trong DB, không tải Grade lên.
+    """
+    graded_credits = case((Enrollment.grade_4.isnot(None), Course.credits), else_=0)
+    columns = [
+        func.coalesce(func.sum(Enrollment.grade_4 * Course.credits), 0.0),
+        func.coalesce(func.sum(graded_credits), 0),
+        func.coalesce(func.sum(case((Enrollment.is_passed.is_(True), Course.credits), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            (Enrollment.grade_4.isnot(None) & Enrollment.is_passed.isnot(True), Course.credits), else_=0
+        )), 0),
+    ]
+    group_by = [Enrollment.student_id, Class.semester] if by_semester else [Enrollment.student_id]
+    
+    rows = db.query(*group_by, *columns).join(
+        Class, Enrollment.class_id == Class.id
+    ).join(
+        Course, Class.course_id == Course.id
+    ).filter(*criteria).group_by(*group_by).all()
+    
+    key_size = len(group_by)
+    totals: Dict = {}
+    for row in rows:
+        key = tuple(row[:key_size]) if by_semester else row[0]
+        points, total, completed, failed = row[key_size:]
+        totals[key] = (float(points), int(total), int(completed), int(failed))
+    return totals
+
+def _sum_by_student(semester_totals: Dict) -> Dict[int, Tuple[float, int, int, int]]:
+    totals: Dict[int, List[float]] = {}
+    for (student_id, _), values in semester_totals.items():
+        acc = totals.setdefault(student_id, [0.0, 0, 0, 0])
+        for i, value in enumerate(values):
+            acc[i] += value
+    return {student_id: tuple(acc) for student_id, acc in totals.items()}
+
+def aggregate_student_results(db: Session, *criteria) -> Dict[int, Tuple[float, int, int, int]]:
+    """
+    Tính điểm trung bình theo tín chỉ cho nhiều sinh viên trong 1 lượt truy vấn
+    
+    Dùng chung cho GPA (lọc theo học kỳ) và CPA (toàn bộ enrollment của sinh viên).
+    
+    Returns:
+        Dict student_id -> (điểm trung bình, total_credits, completed_credits, failed_credits)
+    """
+    return {
+        student_id: (weighted_average(weighted, total), total, completed, failed)
+        for student_id, (weighted, total, completed, failed) in aggregate_credit_totals(db, *criteria).items()
+    }
+
+def _save_cumulative_totals(db: Session, totals: Dict[int, Tuple[float, int, int, int]]) -> None:
+    """Ghi đè các tổng tích lũy (bulk update/insert), không commit"""
+    if not totals:
+        return
+    
+    existing = dict(db.query(CumulativeResult.student_id, CumulativeResult.id).filter(
+        CumulativeResult.student_id.in_(list(totals))
+    ).all())
+    
+    updates, inserts = [], []
+    for student_id, (points, registered, completed, failed) in totals.items():
+        values = {
+            "cpa": weighted_average(points, registered),
+            "total_grade_points": points,
+            "total_registered_credits": registered,
+            "total_completed_credits": completed,
+            "total_failed_credits": failed
+        }
+        if student_id in existing:
+            updates.append({"id": existing[student_id], **values})
+        else:
+            inserts.append({"student_id": student_id, **values})
+    
+    db.bulk_update_mappings(CumulativeResult, updates)
+    db.bulk_insert_mappings(CumulativeResult, inserts)
+
+def rebuild_cumulative_results(
+    db: Session,
+    student_ids: Optional[List[int]] = None,
+    check_only: bool = False
+) -> dict:
+    """
+    Tính lại toàn bộ tổng tích lũy từ enrollment và so sánh với giá trị đang lưu
+    
+    Dùng để kiểm tra các tổng đang lưu, vd. sau khi recalc_queue bỏ cuộc với 1 khóa lỗi.
+    
+    Args:
+        db: Database session
+        student_ids: Chỉ tính lại cho các sinh viên này (mặc định: tất cả)
+        check_only: Chỉ báo cáo sai lệch, không ghi vào DB
+    
+    Returns:
+        Dict gồm số sinh viên đã kiểm tra và danh sách sinh viên bị sai lệch
+    """
+    criteria = [Enrollment.student_id.in_(student_ids)] if student_ids is not None else []
+    totals = aggregate_credit_totals(db, *criteria)
+    
+    stored_query = db.query(
+        CumulativeResult.student_id,
+        CumulativeResult.total_grade_points,
+        CumulativeResult.total_registered_credits,
+        CumulativeResult.total_completed_credits,
+        CumulativeResult.total_failed_credits
+    )
+    if student_ids is not None:
+        stored_query = stored_query.filter(CumulativeResult.student_id.in_(student_ids))
+    stored = {row[0]: tuple(row[1:]) for row in stored_query.all()}
+    
+    mismatched = {}
+    for student_id in set(totals) | set(stored):
+        expected = totals.get(student_id, (0.0, 0, 0, 0))
+        current = stored.get(student_id)
+        if (
+            current is None
+            or abs((current[0] or 0.0) - expected[0]) > 1e-6
+            or tuple(v or 0 for v in current[1:]) != expected[1:]
+        ):
+            mismatched[student_id] = expected
+    
+    if mismatched and not check_only:
+        _save_cumulative_totals(db, mismatched)
         db.commit()
-        db.refresh(new_result)
-        result = new_result
     
-    update_cumulative_result(student_id, db)
+    return {
+        "total_students": len(set(totals) | set(stored)),
+        "mismatched": len(mismatched),
+        "mismatched_student_ids": sorted(mismatched)[:20]
+    }
+
+def rebuild_enrollment_grades(db: Session, *criteria) -> int:
+    """
+    Tính lại điểm tổng kết lưu trên Enrollment (final_score, grade_4, letter_grade, is_passed)
+    từ bảng grades, dùng để điền dữ liệu ban đầu, sửa sai lệch hoặc áp dụng policy mới
+    
+    Mỗi môn học dùng policy đã biên dịch của môn đó cho cả ma trận điểm của môn.
+    Không đụng tới CumulativeResult, chạy rebuild_cumulative_results() sau đó.
     
-    return result
+    Args:
+        db: Database session
+        *criteria: Điều kiện lọc trên Enrollment/Class (mặc định: tất cả)
+    
+    Returns:
+        Số enrollment đã được cập nhật
+    """
+    enrollment_rows = db.query(
+        Enrollment.id, Class.course_id,
+        Enrollment.final_score, Enrollment.grade_4, Enrollment.letter_grade, Enrollment.is_passed
+    ).join(Class, Enrollment.class_id == Class.id).filter(*criteria).all()
+    
+    grade_rows = db.query(Grade.enrollment_id, Grade.grade_type, Grade.score, Grade.weight).join(
+        Enrollment, Grade.enrollment_id == Enrollment.id
+    ).join(
+        Class, Enrollment.class_id == Class.id
+    ).filter(*criteria).order_by(Grade.enrollment_id, Grade.id).all()
+    
+    course_by_enrollment = {row[0]: row[1] for row in enrollment_rows}
+    rows_by_course = defaultdict(list)
+    for row in grade_rows:
+        rows_by_course[course_by_enrollment[row[0]]].append(row)
+    
+    results = {}
+    for course_id, rows in rows_by_course.items():
+        results.update(grading_policies.get(db, course_id).evaluate_matrix(rows))
+    
+    scored_ids = list(results)
+    converted = dict(zip(scored_ids, convert_scores_to_grade_4(results[i][0] for i in scored_ids)))
+    
+    updates = []
+    for enrollment_id, _, *stored in enrollment_rows:
+        final_score, passed = results.get(enrollment_id, (None, None))
+        score_4, letter = converted.get(enrollment_id) or (None, None)
+        expected = [final_score, score_4, letter, passed]
+        if stored != expected:
+            updates.append({
+                "id": enrollment_id,
+                "final_score": final_score,
+                "grade_4": score_4,
+                "letter_grade": letter,
+                "is_passed": passed
+            })
+    
+    db.bulk_update_mappings(Enrollment, updates)
+    db.commit()
+    # Policy đổi thì dự đoán what-if thay đổi kể cả khi không điểm lưu nào đổi
+    transcript_cache.clear()
+    return len(updates)
 
-def calculate_all_students_in_semester(semester_id: int, db: Session) -> int:
+def calculate_all_students_in_semester(
+    semester_id: int,
+    db: Session,
+    student_ids: Optional[List[int]] = None
+) -> int:
     """
     Tính toán kết quả học tập cho tất cả sinh viên trong 1 học kỳ
     
+    GPA của học kỳ và CPA tích lũy được tổng hợp theo lô cho toàn bộ sinh viên
+    (không tính lại từng sinh viên một) và ghi vào DB cùng bảng xếp hạng học kỳ
+    trong 1 transaction.
+    
     Args:
         semester_id: ID của học kỳ
         db: Database session
+        student_ids: Chỉ tính cho các sinh viên này (mặc định: mọi sinh viên của học kỳ)
     
     Returns:
         Số lượng sinh viên đã được tính toán
@@ -259,13 +435,111 @@ def calculate_all_students_in_semester(semester_id: int, db: Session) -> int:
     if not semester:
         raise ValueError(f"Semester {semester_id} not found")
     
-    student_ids = db.query(Enrollment.student_id).join(Class).filter(
-        Class.semester == semester.code
-    ).distinct().all()
+    criteria = [Class.semester == semester.code]
+    if student_ids is not None:
+        criteria.append(Enrollment.student_id.in_(student_ids))
+    
+    semester_results = aggregate_student_results(db, *criteria)
+    if not semester_results:
+        return 0
+    
+    semester_students = db.query(Enrollment.student_id).join(
+        Class, Enrollment.class_id == Class.id
+    ).filter(*criteria).distinct().subquery().select()
+    semester_totals = aggregate_credit_totals(
+        db, Enrollment.student_id.in_(semester_students), by_semester=True
+    )
+    cumulative_totals = _sum_by_student(semester_totals)
+    
+    existing_results = dict(db.query(AcademicResult.student_id, AcademicResult.id).filter(
+        AcademicResult.semester_id == semester_id,
+        AcademicResult.student_id.in_(list(semester_results))
+    ).all())
+    
+    result_updates, result_inserts = [], []
+    for student_id, (gpa, total_credits, completed_credits, failed_credits) in semester_results.items():
+        values = {
+            "gpa": gpa,
+            "total_credits": total_credits,
+            "completed_credits": completed_credits,
+            "failed_credits": failed_credits
+        }
+        if student_id in existing_results:
+            result_updates.append({"id": existing_results[student_id], **values})
+        else:
+            result_inserts.append({"student_id": student_id, "semester_id": semester_id, **values})
+    
+    db.bulk_update_mappings(AcademicResult, result_updates)
+    db.bulk_insert_mappings(AcademicResult, result_inserts)
+    _save_cumulative_totals(db, cumulative_totals)
+    _save_cpa_snapshots(db, semester_totals, list(cumulative_totals))
+    refresh_semester_rankings(db, semester_id, list(semester_results) if student_ids is not None else None)
+    db.commit()
+    
+    return len(semester_results)
+
+def _save_cpa_snapshots(db: Session, semester_totals: Dict, student_ids: Optional[List[int]]) -> None:
+    """
+    Ghi CPA và số tín chỉ tích lũy tính đến từng học kỳ vào AcademicResult, không commit
+    
+    Duyệt 1 lượt các học kỳ của mỗi sinh viên theo Semester.start_date và cộng dồn
+    tổng điểm của từng học kỳ, thay vì tính lại CPA cho từng học kỳ.
+    
+    Args:
+        db: Database session
+        semester_totals: Kết quả aggregate_credit_totals(..., by_semester=True)
+        student_ids: Sinh viên cần cập nhật (None: mọi sinh viên có AcademicResult)
+    """
+    semester_order = db.query(Semester.id, Semester.code).order_by(Semester.start_date, Semester.id).all()
+    rank_by_code = {code: rank for rank, (_, code) in enumerate(semester_order)}
+    rank_by_id = {semester_id: rank for rank, (semester_id, _) in enumerate(semester_order)}
+    
+    contributions = defaultdict(list)
+    for (student_id, semester_code), values in semester_totals.items():
+        if semester_code in rank_by_code:
+            contributions[student_id].append((rank_by_code[semester_code], values))
+    
+    result_query = db.query(AcademicResult.id, AcademicResult.student_id, AcademicResult.semester_id)
+    if student_ids is not None:
+        result_query = result_query.filter(AcademicResult.student_id.in_(student_ids))
+    results_by_student = defaultdict(list)
+    for result_id, student_id, semester_id in result_query.all():
+        if semester_id in rank_by_id:
+            results_by_student[student_id].append((rank_by_id[semester_id], result_id))
+    
+    updates = []
+    for student_id, results in results_by_student.items():
+        semesters = sorted(contributions.get(student_id, []), key=lambda item: item[0])
+        points, registered, completed = 0.0, 0, 0
+        i = 0
+        for rank, result_id in sorted(results):
+            while i < len(semesters) and semesters[i][0] <= rank:
+                semester_points, semester_registered, semester_completed, _ = semesters[i][1]
+                points += semester_points
+                registered += semester_registered
+                completed += semester_completed
+                i += 1
+            updates.append({
+                "id": result_id,
+                "cpa": weighted_average(points, registered),
+                "cumulative_credits": completed
+            })
+    
+    db.bulk_update_mappings(AcademicResult, updates)
+
+def refresh_cpa_snapshots(db: Session, student_ids: Optional[List[int]] = None) -> int:
+    """
+    Tính lại CPA theo từng học kỳ (AcademicResult.cpa, cumulative_credits)
     
-    count = 0
-    for (student_id,) in student_ids:
-        calculate_and_save_semester_result(student_id, semester_id, db)
-        count += 1
+    Args:
+        db: Database session
+        student_ids: Chỉ tính cho các sinh viên này (mặc định: tất cả)
     
-    return count
+    Returns:
+        Số sinh viên đã được cập nhật
+    """
+    criteria = [Enrollment.student_id.in_(student_ids)] if student_ids is not None else []
+    semester_totals = aggregate_credit_totals(db, *criteria, by_semester=True)
+    _save_cpa_snapshots(db, semester_totals, student_ids)
+    db.commit()
+    return len({student_id for student_id, _ in semester_totals})
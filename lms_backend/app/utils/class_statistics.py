@@ -0,0 +1,174 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.academic import Class, Enrollment, Grade
+from app.models.class_statistic import ClassGradeStatistic
+from app.models.grading_policy import GradingPolicy
+from app.utils.grading_policy import DEFAULT_PASS_SCORE
+
+# Thành phần thống kê cho điểm tổng kết của enrollment
+OVERALL_COMPONENT = "overall"
+
+# (count, mean, m2, min, max, pass_count) của thành phần chưa có điểm nào
+EMPTY_STATISTIC = (0, 0.0, 0.0, None, None, 0)
+
+# INSERT ... ON CONFLICT DO NOTHING (SQLite: INSERT OR IGNORE) theo từng dialect
+_INSERT_IGNORING_CONFLICTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def _create_missing_statistics(db: Session, keys) -> bool:
+    """
+    Tạo dòng thống kê rỗng cho các (class_id, component) còn thiếu; dòng do transaction khác
+    vừa tạo thì bỏ qua thay vì lỗi UniqueConstraint. Trả về False nếu dialect không hỗ trợ.
+    """
+    insert = _INSERT_IGNORING_CONFLICTS.get(db.get_bind().dialect.name)
+    if insert is None:
+        return False
+    db.execute(insert(ClassGradeStatistic).values([
+        {"class_id": class_id, "component": component, "count": 0, "mean": 0.0, "m2": 0.0, "pass_count": 0}
+        for class_id, component in sorted(keys)
+    ]).on_conflict_do_nothing(index_elements=["class_id", "component"]))
+    return True
+
+def _stored_statistics(db: Session, class_ids: Optional[List[int]]) -> Dict[Tuple[int, str], ClassGradeStatistic]:
+    query = db.query(ClassGradeStatistic)
+    if class_ids is not None:
+        query = query.filter(ClassGradeStatistic.class_id.in_(class_ids))
+    return {(stat.class_id, stat.component): stat for stat in query.all()}
+
+def _assign(stat: ClassGradeStatistic, values: tuple):
+    stat.count, stat.mean, stat.m2, stat.min_score, stat.max_score, stat.pass_count = values
+
+def refresh_class_statistics(db: Session, class_ids: Iterable[int]) -> None:
+    """
+    Tính lại thống kê của các lớp vừa có điểm thay đổi, không commit
+
+    recalc_queue gọi 1 lần cho mọi lớp bị sửa điểm trong 1 lô, nên đường nhập điểm
+    không phải khóa dòng thống kê. Các lớp được khóa trước khi đọc điểm để 2 lô
+    đồng thời của cùng lớp không ghi đè kết quả mới bằng kết quả cũ.
+    """
+    class_ids = sorted(set(class_ids))
+    if not class_ids:
+        return
+    db.query(Class.id).filter(Class.id.in_(class_ids)).order_by(Class.id).with_for_update().all()
+
+    computed = _computed_statistics(db, class_ids)
+    stored = _stored_statistics(db, class_ids)
+    missing = set(computed) - set(stored)
+    if missing and _create_missing_statistics(db, missing):
+        stored = _stored_statistics(db, class_ids)
+
+    for key in set(computed) | set(stored):
+        stat = stored.get(key)
+        if stat is None:
+            stat = ClassGradeStatistic(class_id=key[0], component=key[1])
+            db.add(stat)
+        _assign(stat, computed.get(key, EMPTY_STATISTIC))
+
+def describe(stat: ClassGradeStatistic) -> dict:
+    return {
+        "component": stat.component,
+        "count": stat.count,
+        "mean": round(stat.mean, 2) if stat.count else None,
+        "std_dev": round(math.sqrt(stat.m2 / stat.count), 2) if stat.count else None,
+        "min": stat.min_score,
+        "max": stat.max_score,
+        "pass_rate": round(stat.pass_count / stat.count, 4) if stat.count else None
+    }
+
+def get_class_statistics(db: Session, class_id: int) -> List[dict]:
+    stats = db.query(ClassGradeStatistic).filter(
+        ClassGradeStatistic.class_id == class_id,
+        ClassGradeStatistic.count > 0
+    ).order_by(ClassGradeStatistic.component).all()
+    return [describe(stat) for stat in stats]
+
+def _computed_statistics(db: Session, class_ids: Optional[List[int]]) -> Dict[Tuple[int, str], tuple]:
+    """Thống kê tính lại từ đầu bằng SQL: (count, mean, m2, min, max, pass_count)"""
+    pass_score = func.coalesce(GradingPolicy.pass_score, DEFAULT_PASS_SCORE)
+    component_query = db.query(
+        Enrollment.class_id, Grade.grade_type,
+        func.count(Grade.score), func.sum(Grade.score), func.sum(Grade.score * Grade.score),
+        func.min(Grade.score), func.max(Grade.score),
+        func.sum(case((Grade.score >= pass_score, 1), else_=0))
+    ).join(
+        Enrollment, Grade.enrollment_id == Enrollment.id
+    ).join(
+        Class, Enrollment.class_id == Class.id
+    ).outerjoin(
+        GradingPolicy, GradingPolicy.course_id == Class.course_id
+    ).filter(Grade.score.isnot(None)).group_by(Enrollment.class_id, Grade.grade_type)
+
+    overall_query = db.query(
+        Enrollment.class_id, func.count(Enrollment.final_score), func.sum(Enrollment.final_score),
+        func.sum(Enrollment.final_score * Enrollment.final_score),
+        func.min(Enrollment.final_score), func.max(Enrollment.final_score),
+        func.sum(case((Enrollment.is_passed.is_(True), 1), else_=0))
+    ).filter(Enrollment.final_score.isnot(None)).group_by(Enrollment.class_id)
+
+    if class_ids is not None:
+        component_query = component_query.filter(Enrollment.class_id.in_(class_ids))
+        overall_query = overall_query.filter(Enrollment.class_id.in_(class_ids))
+
+    rows = [tuple(row) for row in component_query.all()]
+    rows += [(row[0], OVERALL_COMPONENT, *row[1:]) for row in overall_query.all()]
+
+    computed = {}
+    for class_id, component, count, total, total_squares, min_score, max_score, pass_count in rows:
+        mean = total / count
+        m2 = max(total_squares - count * mean * mean, 0.0)
+        computed[(class_id, component)] = (count, mean, m2, min_score, max_score, int(pass_count or 0))
+    return computed
+
+def rebuild_class_statistics(
+    db: Session,
+    class_ids: Optional[List[int]] = None,
+    check_only: bool = False
+) -> dict:
+    """
+    Tính lại toàn bộ thống kê lớp từ điểm và so sánh với giá trị đang lưu
+
+    Args:
+        db: Database session
+        class_ids: Chỉ tính lại các lớp này (mặc định: tất cả)
+        check_only: Chỉ báo cáo sai lệch, không ghi vào DB
+
+    Returns:
+        Dict gồm số thống kê đã kiểm tra và các lớp bị sai lệch
+    """
+    computed = _computed_statistics(db, class_ids)
+    stored = _stored_statistics(db, class_ids)
+
+    mismatched = defaultdict(list)
+    for key in set(computed) | set(stored):
+        expected = computed.get(key, EMPTY_STATISTIC)
+        stat = stored.get(key)
+        current = (
+            (stat.count, stat.mean, stat.m2, stat.min_score, stat.max_score, stat.pass_count)
+            if stat else EMPTY_STATISTIC
+        )
+        if (
+            current[0] != expected[0]
+            or current[5] != expected[5]
+            or current[3:5] != expected[3:5]
+            or abs(current[1] - expected[1]) > 1e-6
+            or abs(current[2] - expected[2]) > 1e-6 * max(1.0, expected[2])
+        ):
+            mismatched[key[0]].append(key[1])
+            if check_only:
+                continue
+            if stat is None:
+                stat = ClassGradeStatistic(class_id=key[0], component=key[1])
+                db.add(stat)
+            _assign(stat, expected)
+
+    if mismatched and not check_only:
+        db.commit()
+
+    return {
+        "total_statistics": len(set(computed) | set(stored)),
+        "mismatched": sum(len(components) for components in mismatched.values()),
+        "mismatched_class_ids": sorted(mismatched)[:20]
+    }
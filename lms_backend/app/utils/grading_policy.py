@@ -0,0 +1,196 @@
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, selectinload
+from app.core.config import settings
+from app.models.grading_policy import GradingPolicy
+
+# Trọng số gán cho điểm mới khi môn học chưa có GradingPolicy
+DEFAULT_COMPONENT_WEIGHTS = {'midterm': 0.3, 'final': 0.5, 'lab': 0.1, 'assignment': 0.1}
+DEFAULT_PASS_SCORE = 4.0
+DEFAULT_ROUNDING = 1
+
+class CompiledPolicy:
+    """
+    GradingPolicy đã biên dịch thành các giá trị thuần Python để tính điểm nhanh
+
+    weights = None nghĩa là dùng Grade.weight của từng điểm (policy mặc định),
+    khi đó điểm tổng kết là trung bình có trọng số của các điểm đã có.
+    Với policy của môn học, điểm tổng kết chỉ có khi đủ mọi thành phần có trọng số.
+    """
+    __slots__ = ("course_id", "policy_id", "version", "weights", "min_scores", "pass_score", "rounding", "_scale", "_total_weight")
+
+    def __init__(
+        self,
+        course_id: Optional[int] = None,
+        version: int = 0,
+        policy_id: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+        min_scores: Optional[Dict[str, float]] = None,
+        pass_score: float = DEFAULT_PASS_SCORE,
+        rounding: int = DEFAULT_ROUNDING
+    ):
+        self.course_id = course_id
+        self.policy_id = policy_id
+        self.version = version
+        self.weights = {t: w for t, w in weights.items() if w > 0} if weights is not None else None
+        self.min_scores = min_scores or {}
+        self.pass_score = pass_score
+        self.rounding = rounding
+        self._scale = 10 ** rounding
+        self._total_weight = sum(self.weights.values()) if self.weights else 0.0
+
+    def weight_for(self, grade_type: str) -> float:
+        """Trọng số lưu vào Grade.weight khi nhập điểm mới"""
+        if self.weights is None:
+            return DEFAULT_COMPONENT_WEIGHTS.get(grade_type, 0.0)
+        return self.weights.get(grade_type, 0.0)
+
+    def _round(self, value: float) -> float:
+        # Làm tròn nửa lên (4.25 -> 4.3), tránh sai số dấu phẩy động của round()
+        return math.floor(value * self._scale + 0.5 + 1e-9) / self._scale
+
+    def final_score(self, components: Iterable[Tuple[str, float, Optional[float]]]) -> Optional[float]:
+        """
+        Điểm tổng kết (thang 10) từ các bộ (grade_type, score, weight)
+
+        Returns:
+            Điểm tổng kết đã làm tròn, None nếu chưa đủ điểm
+        """
+        if self.weights is None:
+            weighted = total_weight = total_score = 0.0
+            count = 0
+            for _, score, weight in components:
+                if score is None:
+                    continue
+                weight = 1.0 if weight is None else weight
+                weighted += score * weight
+                total_weight += weight
+                total_score += score
+                count += 1
+            if not count:
+                return None
+            if total_weight <= 0:
+                return self._round(total_score / count)
+            return self._round(weighted / total_weight)
+
+        scores = {grade_type: score for grade_type, score, _ in components if score is not None}
+        weighted = 0.0
+        for grade_type, weight in self.weights.items():
+            score = scores.get(grade_type)
+            if score is None:
+                return None
+            weighted += score * weight
+        return self._round(weighted / self._total_weight)
+
+    def evaluate(self, components: List[Tuple[str, float, Optional[float]]]) -> Optional[Tuple[float, bool]]:
+        """
+        Returns:
+            Tuple (điểm tổng kết thang 10, qua môn hay không), None nếu chưa đủ điểm
+        """
+        final_score = self.final_score(components)
+        if final_score is None:
+            return None
+        passed = final_score >= self.pass_score
+        if passed and self.min_scores:
+            scores = {grade_type: score for grade_type, score, _ in components}
+            passed = all(
+                scores.get(grade_type) is not None and scores[grade_type] >= min_score
+                for grade_type, min_score in self.min_scores.items()
+            )
+        return final_score, passed
+
+    def evaluate_matrix(self, grade_rows) -> Dict[int, Tuple[float, bool]]:
+        """
+        Tính điểm tổng kết cho cả lớp trong 1 lượt
+
+        Args:
+            grade_rows: Các bộ (enrollment_id, grade_type, score, weight) sắp xếp theo enrollment_id
+
+        Returns:
+            Dict enrollment_id -> (điểm tổng kết, qua môn), bỏ qua enrollment chưa đủ điểm
+        """
+        results = {}
+        current_id, components = None, []
+        for enrollment_id, grade_type, score, weight in grade_rows:
+            if enrollment_id != current_id:
+                if components:
+                    result = self.evaluate(components)
+                    if result is not None:
+                        results[current_id] = result
+                current_id, components = enrollment_id, []
+            components.append((grade_type, score, weight))
+        if components:
+            result = self.evaluate(components)
+            if result is not None:
+                results[current_id] = result
+        return results
+
+DEFAULT_POLICY = CompiledPolicy()
+
+def compile_policy(policy: GradingPolicy) -> CompiledPolicy:
+    return CompiledPolicy(
+        course_id=policy.course_id,
+        version=policy.version,
+        policy_id=policy.id,
+        weights={c.grade_type: c.weight for c in policy.components},
+        min_scores={c.grade_type: c.min_score for c in policy.components if c.min_score is not None},
+        pass_score=policy.pass_score,
+        rounding=policy.rounding
+    )
+
+class GradingPolicyRegistry:
+    """
+    Cache các policy đã biên dịch theo course_id
+
+    Mỗi refresh_interval giây chỉ đọc (course_id, id, version) của bảng grading_policies
+    và biên dịch lại những policy có (id, version) thay đổi, nên đường nhập điểm chỉ tra dict.
+    Khóa gồm cả id vì xóa rồi tạo lại policy sẽ bắt đầu lại từ version 1.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._policies: Dict[int, CompiledPolicy] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, course_id: int) -> CompiledPolicy:
+        self._refresh_if_stale(db)
+        return self._policies.get(course_id, DEFAULT_POLICY)
+
+    def invalidate(self):
+        """Buộc kiểm tra lại version ở lần get() tiếp theo"""
+        self._checked_at = None
+
+    def _refresh_if_stale(self, db: Session):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+                return
+
+            versions = {
+                course_id: (policy_id, version)
+                for course_id, policy_id, version in db.query(
+                    GradingPolicy.course_id, GradingPolicy.id, GradingPolicy.version
+                ).all()
+            }
+            policies = {
+                course_id: policy for course_id, policy in self._policies.items()
+                if versions.get(course_id) == (policy.policy_id, policy.version)
+            }
+            stale = [course_id for course_id in versions if course_id not in policies]
+            if stale:
+                rows = db.query(GradingPolicy).options(
+                    selectinload(GradingPolicy.components)
+                ).filter(GradingPolicy.course_id.in_(stale)).all()
+                for row in rows:
+                    policies[row.course_id] = compile_policy(row)
+
+            self._policies = policies
+            self._checked_at = time.monotonic()
+
+grading_policies = GradingPolicyRegistry(refresh_interval=settings.GRADING_POLICY_REFRESH_SECONDS)
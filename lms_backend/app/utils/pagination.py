@@ -0,0 +1,117 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+from fastapi import Response
+from sqlalchemy import tuple_
+from app.core.config import settings
+
+class Page(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Cursor mờ: base64 của khóa sắp xếp của dòng cuối trang"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> Tuple[Any, ...]:
+    """
+    Giải mã cursor do encode_cursor tạo
+
+    Raises:
+        ValueError: Cursor hỏng hoặc không khớp số cột sắp xếp
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if any(isinstance(value, bool) or not isinstance(value, (int, float, str)) for value in values):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+def keyset_paginate(
+    query,
+    columns: Sequence,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = False,
+    key: Optional[Callable[[Any], Sequence[Any]]] = None
+) -> Page:
+    """
+    Phân trang theo khóa (keyset) trên các cột có index, thứ tự ổn định
+
+    Mỗi trang là một lần tìm theo index từ khóa của dòng cuối trang trước (WHERE (cols) > cursor),
+    nên chi phí không tăng theo độ sâu trang và dòng không bị lệch khi có ghi xen giữa.
+    skip chỉ áp dụng khi không có cursor, để client cũ dùng OFFSET vẫn chạy.
+
+    Args:
+        query: Query ORM đã lọc, chưa order_by/limit
+        columns: Các cột sắp xếp, tổ hợp phải là duy nhất (thường kết thúc bằng khóa chính)
+        key: Lấy giá trị khóa từ một dòng; mặc định getattr theo tên cột
+
+    Returns:
+        Page(items, next_cursor); next_cursor là None ở trang cuối
+    """
+    ordered = query.order_by(*(column.desc() if descending else column for column in columns))
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        left = columns[0] if len(columns) == 1 else tuple_(*columns)
+        right = values[0] if len(columns) == 1 else tuple_(*values)
+        ordered = ordered.filter(left < right if descending else left > right)
+    elif skip:
+        ordered = ordered.offset(skip)
+
+    rows = ordered.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    last = key(rows[-1]) if key else [getattr(rows[-1], column.key) for column in columns]
+    return Page(rows, encode_cursor(last))
+
+class CountCache:
+    """
+    Tổng số dòng của các danh sách, cache theo khóa trong ttl giây
+
+    COUNT(*) trên bảng lớn đắt hơn chính trang dữ liệu; giao diện chỉ cần con số gần đúng
+    nên mỗi khóa (danh sách + bộ lọc) chỉ đếm lại sau khi hết hạn.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, key: Hashable, counter: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and now - entry[0] < self.ttl:
+            return entry[1]
+        value = counter()
+        with self._lock:
+            self._entries[key] = (now, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+count_cache = CountCache(ttl=settings.PAGINATION_COUNT_TTL_SECONDS)
+
+def cached_total(key: Hashable, query) -> int:
+    """Tổng số dòng của query (đã lọc, chưa phân trang), lấy từ count_cache"""
+    return count_cache.get_or_count(key, lambda: query.order_by(None).count())
+
+def set_page_headers(response: Response, page: Page) -> List[Any]:
+    """Đưa cursor trang sau và tổng số dòng vào header, trả về items làm body"""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
+    return page.items
@@ -0,0 +1,87 @@
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+class PoolStats:
+    """Bộ đếm lấy kết nối từ pool: số lần, thời gian chờ, số lần hết thời gian chờ"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+replica_pool_stats = PoolStats()
+async_replica_pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool đo thời gian chờ lấy kết nối (kể cả khi phải mở kết nối mới)"""
+
+    stats = pool_stats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Bản cho engine async, bộ đếm riêng"""
+
+    stats = async_pool_stats
+
+class InstrumentedReplicaQueuePool(InstrumentedQueuePool):
+    stats = replica_pool_stats
+
+class InstrumentedAsyncReplicaQueuePool(InstrumentedAsyncQueuePool):
+    stats = async_replica_pool_stats
+
+def pool_metrics(engine) -> dict:
+    """Trạng thái hiện tại của pool và các bộ đếm tích lũy"""
+    pool = engine.pool
+    metrics = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0)
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        metrics.update(stats.snapshot())
+    return metrics
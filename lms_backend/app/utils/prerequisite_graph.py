@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.academic import Class, Enrollment
+from app.models.course_prerequisite import CoursePrerequisite
+
+EMPTY: FrozenSet[int] = frozenset()
+
+def transitive_closure(edges: Iterable[Tuple[int, int]]) -> Dict[int, FrozenSet[int]]:
+    """
+    Bao đóng bắc cầu của đồ thị môn tiên quyết
+
+    Args:
+        edges: Các cặp (course_id, prerequisite_id)
+
+    Returns:
+        course_id -> tập tất cả môn tiên quyết trực tiếp và gián tiếp
+
+    Raises:
+        ValueError: Nếu đồ thị có chu trình
+    """
+    direct = defaultdict(set)
+    for course_id, prerequisite_id in edges:
+        direct[course_id].add(prerequisite_id)
+
+    closure: Dict[int, FrozenSet[int]] = {}
+    visiting: Set[int] = set()
+
+    def visit(course_id: int) -> FrozenSet[int]:
+        if course_id in closure:
+            return closure[course_id]
+        if course_id in visiting:
+            raise ValueError(f"Prerequisite cycle detected at course {course_id}")
+        visiting.add(course_id)
+        result = set()
+        for prerequisite_id in direct.get(course_id, ()):
+            result.add(prerequisite_id)
+            result |= visit(prerequisite_id)
+        visiting.discard(course_id)
+        closure[course_id] = frozenset(result)
+        return closure[course_id]
+
+    for course_id in list(direct):
+        visit(course_id)
+    return {course_id: prerequisites for course_id, prerequisites in closure.items() if prerequisites}
+
+class PrerequisiteGraph:
+    """
+    Đồ thị môn tiên quyết trong bộ nhớ kèm bao đóng bắc cầu tính sẵn
+
+    Mỗi refresh_interval giây chỉ đọc (count, max id) của bảng course_prerequisites;
+    bao đóng chỉ được tính lại khi danh mục thay đổi, nên việc kiểm tra đăng ký chỉ là phép trừ tập.
+    """
+
+    def __init__(self, refresh_interval: float):
+        self.refresh_interval = refresh_interval
+        self._closure: Dict[int, FrozenSet[int]] = {}
+        self._fingerprint: Optional[tuple] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def prerequisites(self, db: Session, course_id: int) -> FrozenSet[int]:
+        """Tất cả môn phải qua (trực tiếp và gián tiếp) trước khi học course_id"""
+        self._refresh_if_stale(db)
+        return self._closure.get(course_id, EMPTY)
+
+    def invalidate(self):
+        """Buộc kiểm tra lại danh mục ở lần đọc tiếp theo"""
+        self._checked_at = None
+
+    def _refresh_if_stale(self, db: Session):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+                return
+
+            # Danh mục chỉ được thay bằng xóa + thêm dòng, nên (count, max id) đổi mỗi khi có thay đổi
+            fingerprint = tuple(db.query(func.count(CoursePrerequisite.id), func.max(CoursePrerequisite.id)).one())
+            if fingerprint != self._fingerprint:
+                edges = db.query(CoursePrerequisite.course_id, CoursePrerequisite.prerequisite_id).all()
+                self._closure = transitive_closure(edges)
+                self._fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+
+prerequisite_graph = PrerequisiteGraph(refresh_interval=settings.PREREQUISITE_REFRESH_SECONDS)
+
+def passed_course_ids(db: Session, student_ids: List[int]) -> Dict[int, Set[int]]:
+    """student_id -> tập course_id đã qua, 1 truy vấn cho cả lô"""
+    rows = db.query(Enrollment.student_id, Class.course_id).join(
+        Class, Enrollment.class_id == Class.id
+    ).filter(
+        Enrollment.student_id.in_(student_ids),
+        Enrollment.is_passed.is_(True)
+    ).distinct().all()
+    passed = defaultdict(set)
+    for student_id, course_id in rows:
+        passed[student_id].add(course_id)
+    return passed
+
+def missing_prerequisites(db: Session, course_id: int, student_ids: List[int]) -> Dict[int, Set[int]]:
+    """
+    Các môn tiên quyết còn thiếu của từng sinh viên khi đăng ký course_id
+
+    Returns:
+        student_id -> tập course_id còn thiếu; chỉ gồm sinh viên chưa đủ điều kiện
+    """
+    required = prerequisite_graph.prerequisites(db, course_id)
+    if not required or not student_ids:
+        return {}
+    passed = passed_course_ids(db, student_ids)
+    missing = {student_id: required - passed.get(student_id, EMPTY) for student_id in student_ids}
+    return {student_id: courses for student_id, courses in missing.items() if courses}
@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+# 0 khi không phải replica hoặc đã replay hết WAL nhận được (primary đang rảnh)
+PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+def replica_lag_seconds(conn) -> float:
+    """Độ trễ replay của replica; các DB không có replication (SQLite) luôn là 0"""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = conn.execute(PG_REPLICA_LAG_SQL).scalar()
+    return float(lag) if lag is not None else 0.0
+
+class ReplicaHealth:
+    """
+    Replica có dùng được để đọc không: kết nối được và trễ không quá max_lag giây
+
+    Kết quả được giữ check_interval giây nên mỗi request chỉ đọc 1 biến; khi replica
+    lỗi giữa chừng thì mark_failed() để các request sau quay về primary ngay.
+    """
+
+    def __init__(self, engine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._available = False
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[bool]:
+        """Kết quả kiểm tra gần nhất, None nếu đã quá hạn (cần gọi available())"""
+        if self.engine is None:
+            return False
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= self.check_interval:
+            return None
+        return self._available
+
+    def available(self) -> bool:
+        state = self.cached()
+        if state is not None:
+            return state
+
+        with self._lock:
+            state = self.cached()
+            if state is not None:
+                return state
+            try:
+                with self.engine.connect() as conn:
+                    self._available = replica_lag_seconds(conn) <= self.max_lag
+            except (SQLAlchemyError, OSError):
+                self._available = False
+            self._checked_at = time.monotonic()
+            return self._available
+
+    def mark_failed(self):
+        self._available = False
+        self._checked_at = time.monotonic()
@@ -0,0 +1,118 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.academic_year import AcademicResult
+from app.models.semester_ranking import SemesterRanking
+from app.models.user import Student
+
+# Các nhóm xếp hạng và cột của Student xác định nhóm
+RANKING_SCOPES = {
+    "department": Student.department_id,
+    "cohort": Student.cohort,
+}
+
+def rank_group(gpas: List[Tuple[int, float]]) -> Dict[int, Tuple[int, float]]:
+    """
+    Xếp hạng 1 nhóm sinh viên theo GPA giảm dần, bằng GPA thì cùng hạng (1, 2, 2, 4)
+
+    Args:
+        gpas: Các bộ (student_id, gpa)
+
+    Returns:
+        Dict student_id -> (hạng, percentile), percentile = % sinh viên trong nhóm có GPA thấp hơn
+    """
+    ordered = sorted(gpas, key=lambda item: item[1], reverse=True)
+    size = len(ordered)
+    ranks = {}
+    rank = 0
+    previous_gpa = None
+    for position, (student_id, gpa) in enumerate(ordered, start=1):
+        if gpa != previous_gpa:
+            rank, previous_gpa = position, gpa
+        percentile = 100.0 if size == 1 else round(100.0 * (size - rank) / (size - 1), 2)
+        ranks[student_id] = (rank, percentile)
+    return ranks
+
+def refresh_semester_rankings(db: Session, semester_id: int, student_ids: Optional[List[int]] = None) -> int:
+    """
+    Cập nhật bảng xếp hạng của học kỳ từ AcademicResult, không commit
+
+    Chỉ xếp hạng lại các nhóm (khoa/khóa) có chứa sinh viên vừa thay đổi kết quả
+    và chỉ ghi những dòng có hạng thay đổi. Sinh viên chưa có tín chỉ nào được
+    tính điểm không được xếp hạng.
+
+    Args:
+        db: Database session
+        semester_id: ID của học kỳ
+        student_ids: Sinh viên vừa thay đổi kết quả (mặc định: xếp hạng lại toàn bộ học kỳ)
+
+    Returns:
+        Số nhóm đã được xếp hạng lại
+    """
+    refreshed = 0
+    for scope, column in RANKING_SCOPES.items():
+        stored_query = db.query(
+            SemesterRanking.id, SemesterRanking.scope_key, SemesterRanking.student_id,
+            SemesterRanking.gpa, SemesterRanking.rank, SemesterRanking.percentile, SemesterRanking.group_size
+        ).filter(
+            SemesterRanking.semester_id == semester_id,
+            SemesterRanking.scope == scope
+        )
+        result_query = db.query(AcademicResult.student_id, AcademicResult.gpa, column).join(
+            Student, Student.user_id == AcademicResult.student_id
+        ).filter(
+            AcademicResult.semester_id == semester_id,
+            AcademicResult.total_credits > 0,
+            column.isnot(None)
+        )
+
+        if student_ids is not None:
+            # Nhóm hiện tại của sinh viên và nhóm cũ (nếu sinh viên vừa chuyển khoa/khóa)
+            keys = {
+                str(key) for (key,) in db.query(column).filter(
+                    Student.user_id.in_(student_ids), column.isnot(None)
+                ).distinct().all()
+            }
+            keys.update(key for (key,) in db.query(SemesterRanking.scope_key).filter(
+                SemesterRanking.semester_id == semester_id,
+                SemesterRanking.scope == scope,
+                SemesterRanking.student_id.in_(student_ids)
+            ).distinct().all())
+            if not keys:
+                continue
+            stored_query = stored_query.filter(SemesterRanking.scope_key.in_(keys))
+            # scope_key lưu dạng chuỗi, so với cột của Student phải đúng kiểu (department_id là số)
+            result_query = result_query.filter(column.in_({column.type.python_type(key) for key in keys}))
+
+        groups = defaultdict(list)
+        for student_id, gpa, key in result_query.all():
+            groups[str(key)].append((student_id, gpa or 0.0))
+
+        stored = {(row.scope_key, row.student_id): row for row in stored_query.all()}
+
+        updates, inserts = [], []
+        for key, gpas in groups.items():
+            ranks = rank_group(gpas)
+            size = len(gpas)
+            for student_id, gpa in gpas:
+                rank, percentile = ranks[student_id]
+                values = {"gpa": gpa, "rank": rank, "percentile": percentile, "group_size": size}
+                current = stored.pop((key, student_id), None)
+                if current is None:
+                    inserts.append({
+                        "semester_id": semester_id, "scope": scope, "scope_key": key,
+                        "student_id": student_id, **values
+                    })
+                elif (current.gpa, current.rank, current.percentile, current.group_size) != (gpa, rank, percentile, size):
+                    updates.append({"id": current.id, **values})
+
+        db.bulk_update_mappings(SemesterRanking, updates)
+        db.bulk_insert_mappings(SemesterRanking, inserts)
+        # Dòng còn lại: sinh viên không còn thuộc nhóm hoặc không còn kết quả
+        if stored:
+            db.query(SemesterRanking).filter(
+                SemesterRanking.id.in_([row.id for row in stored.values()])
+            ).delete(synchronize_session=False)
+
+        refreshed += len(groups)
+    return refreshed
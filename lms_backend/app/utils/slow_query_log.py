@@ -0,0 +1,212 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_STATEMENT_LENGTH = 2000
+MAX_ROUTES_PER_QUERY = 10
+MAX_PENDING_EXPLAINS = 100
+
+# Chỉ EXPLAIN (không ANALYZE) nên câu lệnh không bị thực thi
+EXPLAIN_PREFIXES = {"postgresql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN ", "mysql": "EXPLAIN "}
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|UPDATE|DELETE|INSERT)\b", re.IGNORECASE)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST = re.compile(r"\(\?(?:\.\.\.)?\)(?:\s*,\s*\(\?(?:\.\.\.)?\))+")
+
+def normalize_sql(statement: str) -> str:
+    """
+    Dạng chuẩn hóa của câu SQL để gộp các lần chạy cùng một truy vấn
+
+    Hằng số và placeholder thành ?, danh sách IN (?, ?, ...) và VALUES nhiều dòng được thu gọn,
+    nên cùng một truy vấn với số phần tử khác nhau vẫn chỉ là một mục.
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?...)", normalized)
+    return _ROW_LIST.sub("(?...), ...", normalized)
+
+def _type_name(value: Any) -> str:
+    return "null" if value is None else type(value).__name__
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Kiểu (không phải giá trị) của tham số ràng buộc, để log không chứa dữ liệu người dùng"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"executemany": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: _type_name(value) for key, value in parameters.items()}
+    values = list(parameters)
+    if len(values) > 8:
+        return {"count": len(values), "types": sorted({_type_name(value) for value in values})}
+    return [_type_name(value) for value in values]
+
+class SlowQueryLog:
+    """
+    Nhật ký truy vấn chậm, gộp theo SQL đã chuẩn hóa
+
+    observe() được gọi từ hook after_cursor_execute nên chỉ cập nhật bộ đếm trong bộ nhớ;
+    EXPLAIN chạy trên luồng nền với kết nối riêng, mỗi truy vấn chuẩn hóa chỉ lấy kế hoạch một lần.
+    """
+
+    def __init__(self, threshold_ms: float, explain: bool, max_entries: int):
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._explaining = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    def observe(self, engine, statement: str, parameters: Any, executemany: bool, elapsed: float, source: str):
+        if not self.enabled or elapsed < self.threshold or statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+
+        key = normalize_sql(statement)
+        shape = parameter_shape(parameters, executemany)
+        logger.warning("Slow query %.1f ms [%s] %s params=%s", elapsed * 1000, source, key[:500], shape)
+
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_entries:
+                    self._evict()
+                entry = self._entries[key] = {
+                    "sql": key,
+                    "statement": statement[:MAX_STATEMENT_LENGTH],
+                    "count": 0,
+                    "total_time": 0.0,
+                    "max_time": 0.0,
+                    "last_time": 0.0,
+                    "first_seen": datetime.utcnow(),
+                    "last_seen": None,
+                    "routes": OrderedDict(),
+                    "parameter_shape": shape,
+                    "plan": None,
+                    "explain_requested": False
+                }
+            entry["count"] += 1
+            entry["total_time"] += elapsed
+            entry["max_time"] = max(entry["max_time"], elapsed)
+            entry["last_time"] = elapsed
+            entry["last_seen"] = datetime.utcnow()
+            entry["parameter_shape"] = shape
+            entry["routes"][source] = entry["routes"].get(source, 0) + 1
+            if len(entry["routes"]) > MAX_ROUTES_PER_QUERY:
+                entry["routes"].popitem(last=False)
+
+            if self._wants_plan(engine, statement, executemany, entry):
+                entry["explain_requested"] = True
+                self._pending[key] = (engine, statement, parameters)
+                self._ensure_worker()
+                self._cond.notify()
+
+    def snapshot(self, limit: Optional[int] = None) -> list:
+        """Các truy vấn chậm, tổng thời gian lớn nhất trước"""
+        with self._cond:
+            rows = [
+                {
+                    "sql": e["sql"],
+                    "statement": e["statement"],
+                    "count": e["count"],
+                    "total_ms": round(e["total_time"] * 1000, 3),
+                    "avg_ms": round(e["total_time"] * 1000 / e["count"], 3),
+                    "max_ms": round(e["max_time"] * 1000, 3),
+                    "last_ms": round(e["last_time"] * 1000, 3),
+                    "first_seen": e["first_seen"],
+                    "last_seen": e["last_seen"],
+                    "routes": dict(e["routes"]),
+                    "parameter_shape": e["parameter_shape"],
+                    "plan": e["plan"]
+                }
+                for e in self._entries.values()
+            ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self):
+        with self._cond:
+            self._entries.clear()
+            self._pending.clear()
+
+    def wait_for_plans(self, timeout: float = 5.0) -> bool:
+        """Chờ luồng nền EXPLAIN hết hàng đợi (dùng trong test)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._explaining:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _wants_plan(self, engine, statement: str, executemany: bool, entry: dict) -> bool:
+        return (
+            self.explain
+            and not entry["explain_requested"]
+            and len(self._pending) < MAX_PENDING_EXPLAINS
+            and not executemany
+            # Engine async (asyncpg/aiosqlite) không gọi được từ luồng nền, paramstyle cũng khác
+            and not engine.dialect.is_async
+            and engine.dialect.name in EXPLAIN_PREFIXES
+            and EXPLAINABLE.match(statement) is not None
+        )
+
+    def _evict(self):
+        # Bỏ mục có tổng thời gian nhỏ nhất để giữ lại các truy vấn tốn kém nhất
+        key = min(self._entries, key=lambda k: self._entries[k]["total_time"])
+        del self._entries[key]
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._explaining = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                key, (engine, statement, parameters) = self._pending.popitem(last=False)
+                self._explaining = True
+            plan = self._explain(engine, statement, parameters)
+            with self._cond:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["plan"] = plan
+
+    @staticmethod
+    def _explain(engine, statement: str, parameters: Any) -> str:
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(EXPLAIN_PREFIXES[engine.dialect.name] + statement, parameters).all()
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+        return "\n".join(str(row[-1]) if engine.dialect.name == "sqlite" else " | ".join(map(str, row)) for row in rows)
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    explain=settings.SLOW_QUERY_EXPLAIN,
+    max_entries=settings.SLOW_QUERY_MAX_ENTRIES
+)
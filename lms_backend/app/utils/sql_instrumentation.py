@@ -0,0 +1,149 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event
+from app.utils.slow_query_log import slow_query_log
+
+# Câu SQL lưu lại để xem được, không cần nguyên văn các IN (...) dài
+MAX_STATEMENT_LENGTH = 500
+
+class RequestQueryStats:
+    """Số câu SQL, tổng thời gian DB và câu chậm nhất của một request"""
+
+    __slots__ = ("request", "count", "total_time", "slowest_time", "slowest_statement", "_lock")
+
+    def __init__(self, request=None):
+        self.request = request
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed: float):
+        with self._lock:
+            self.count += 1
+            self.total_time += elapsed
+            if elapsed >= self.slowest_time:
+                self.slowest_time = elapsed
+                self.slowest_statement = statement[:MAX_STATEMENT_LENGTH]
+
+    def server_timing(self) -> str:
+        """Giá trị header Server-Timing (thời gian tính bằng ms)"""
+        return (
+            f'db;dur={self.total_time * 1000:.3f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_time * 1000:.3f}"
+        )
+
+_current: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+# Nhãn nguồn cho truy vấn ngoài request (job nền), dùng trong slow-query log
+_source: ContextVar[Optional[str]] = ContextVar("query_source", default=None)
+
+def start_request(request=None) -> tuple:
+    """Bắt đầu đếm cho request hiện tại; trả về (stats, token) để gọi finish_request"""
+    stats = RequestQueryStats(request)
+    return stats, _current.set(stats)
+
+def finish_request(token):
+    _current.reset(token)
+
+@contextmanager
+def query_source(label: str):
+    """Gắn nhãn nguồn (vd. job:recalculate_all_cpa) cho các truy vấn chạy trong khối này"""
+    token = _source.set(label)
+    try:
+        yield
+    finally:
+        _source.reset(token)
+
+def current_source() -> str:
+    stats = _current.get()
+    if stats is not None and stats.request is not None:
+        return route_key(stats.request)
+    return _source.get() or threading.current_thread().name
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_start_time")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if elapsed >= slow_query_log.threshold and slow_query_log.enabled:
+        slow_query_log.observe(conn.engine, statement, parameters, executemany, elapsed, current_source())
+
+def _handle_error(exception_context):
+    # Câu lỗi không đi qua after_cursor_execute: bỏ mốc thời gian để không lệch các câu sau
+    started = exception_context.connection.info.get("query_start_time") if exception_context.connection else None
+    if started:
+        started.pop()
+
+def instrument_engine(engine):
+    """Gắn bộ đếm vào engine (với AsyncEngine truyền engine.sync_engine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class RouteQueryStats:
+    """Tổng hợp theo route: số request, tổng/lớn nhất số câu SQL và thời gian DB"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+
+    def record(self, route: str, stats: RequestQueryStats):
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0, "queries": 0, "max_queries": 0,
+                    "db_time": 0.0, "max_db_time": 0.0,
+                    "slowest_time": 0.0, "slowest_statement": None
+                }
+            entry["requests"] += 1
+            entry["queries"] += stats.count
+            entry["max_queries"] = max(entry["max_queries"], stats.count)
+            entry["db_time"] += stats.total_time
+            entry["max_db_time"] = max(entry["max_db_time"], stats.total_time)
+            if stats.slowest_time > entry["slowest_time"]:
+                entry["slowest_time"] = stats.slowest_time
+                entry["slowest_statement"] = stats.slowest_statement
+
+    def snapshot(self, limit: Optional[int] = None) -> list:
+        """Các route sắp theo số câu SQL trung bình mỗi request, nhiều nhất trước"""
+        with self._lock:
+            rows = [
+                {
+                    "route": route,
+                    "requests": e["requests"],
+                    "avg_queries": round(e["queries"] / e["requests"], 2),
+                    "max_queries": e["max_queries"],
+                    "avg_db_ms": round(e["db_time"] * 1000 / e["requests"], 3),
+                    "max_db_ms": round(e["max_db_time"] * 1000, 3),
+                    "slowest_ms": round(e["slowest_time"] * 1000, 3),
+                    "slowest_statement": e["slowest_statement"]
+                }
+                for route, e in self._routes.items()
+            ]
+        rows.sort(key=lambda row: row["avg_queries"], reverse=True)
+        return rows[:limit] if limit else rows
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+route_query_stats = RouteQueryStats()
+
+def route_key(request) -> str:
+    """Khóa tổng hợp theo mẫu đường dẫn (vd. GET /deans/classes/{class_id}) để không phình theo id"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{request.method} {path}"
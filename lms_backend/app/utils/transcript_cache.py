@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+class TranscriptCache:
+    """
+    Cache trong bộ nhớ theo sinh viên, mỗi sinh viên có thể có nhiều khóa (vd. theo học kỳ)
+
+    Các đường ghi điểm gọi invalidate(student_id); ttl giới hạn thời gian dữ liệu cũ
+    khi điểm được sửa ở process khác. Giữ tối đa max_students sinh viên dùng gần nhất.
+    """
+
+    def __init__(self, ttl: float, max_students: int = 10000):
+        self.ttl = ttl
+        self.max_students = max_students
+        self._entries: "OrderedDict[int, Dict[Hashable, Tuple[float, Any]]]" = OrderedDict()
+        # Tăng khi invalidate, để không lưu kết quả đã tải trước lúc điểm thay đổi; chỉ cần
+        # cho sinh viên đang có lượt tải dở nên bỏ đi khi lượt tải cuối của sinh viên kết thúc
+        self._generations: Dict[int, int] = {}
+        self._loading: Dict[int, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def _generation(self, student_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(student_id, 0)
+
+    def get_or_load(self, student_id: int, key: Hashable, loader: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(student_id, {}).get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._entries.move_to_end(student_id)
+                return entry[1]
+            generation = self._generation(student_id)
+            self._loading[student_id] = self._loading.get(student_id, 0) + 1
+
+        try:
+            value = loader()
+        except BaseException:
+            with self._lock:
+                self._finish_load(student_id)
+            raise
+        with self._lock:
+            if self._generation(student_id) == generation:
+                self._store(student_id, key, now, value)
+            self._finish_load(student_id)
+        return value
+
+    def _store(self, student_id: int, key: Hashable, now: float, value: Any):
+        entries = self._entries.setdefault(student_id, {})
+        for expired in [k for k, (loaded_at, _) in entries.items() if now - loaded_at >= self.ttl]:
+            del entries[expired]
+        entries[key] = (now, value)
+        self._entries.move_to_end(student_id)
+        while len(self._entries) > self.max_students:
+            self._entries.popitem(last=False)
+
+    def _finish_load(self, student_id: int):
+        remaining = self._loading[student_id] - 1
+        if remaining:
+            self._loading[student_id] = remaining
+        else:
+            del self._loading[student_id]
+            self._generations.pop(student_id, None)
+
+    def invalidate(self, student_id: int):
+        with self._lock:
+            self._entries.pop(student_id, None)
+            if student_id in self._loading:
+                self._generations[student_id] = self._generations.get(student_id, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+transcript_cache = TranscriptCache(
+    ttl=settings.WHAT_IF_CACHE_TTL_SECONDS, max_students=settings.WHAT_IF_CACHE_MAX_STUDENTS
+)
+
+# Khóa trong Session.info: student_id cần invalidate khi transaction hiện tại commit
+_PENDING_INVALIDATIONS = "transcript_cache_invalidations"
+
+def invalidate_on_commit(db: Session, student_id: int):
+    """
+    Invalidate cache của sinh viên sau khi transaction hiện tại của db commit
+
+    Invalidate trước commit thì request đọc xen giữa sẽ nạp lại dữ liệu cũ và cache đến hết ttl;
+    rollback thì bỏ qua.
+    """
+    db.info.setdefault(_PENDING_INVALIDATIONS, set()).add(student_id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for student_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        transcript_cache.invalidate(student_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop(_PENDING_INVALIDATIONS, None)
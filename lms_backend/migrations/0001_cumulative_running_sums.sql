@@ -0,0 +1,5 @@
+-- Running totals for incremental CPA maintenance (CumulativeResult.total_grade_points).
+-- After applying, backfill the totals with:
+--     python -m app.cli rebuild-cumulative
+ALTER TABLE cumulative_results
+    ADD COLUMN IF NOT EXISTS total_grade_points DOUBLE PRECISION NOT NULL DEFAULT 0;
@@ -0,0 +1,9 @@
+-- Final score (10-point), grade points (4-point) and letter stored on each enrollment,
+-- kept in sync with the grades table by the grade write paths.
+-- After applying, backfill the columns and then the CPA totals with:
+--     python -m app.cli rebuild-enrollment-grades
+--     python -m app.cli rebuild-cumulative
+ALTER TABLE enrollments
+    ADD COLUMN IF NOT EXISTS final_score DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS grade_4 DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS letter_grade VARCHAR;
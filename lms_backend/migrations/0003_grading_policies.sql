@@ -0,0 +1,29 @@
+-- Per-course grading policies (component weights, rounding, pass rule) and
+-- the pass flag stored on each enrollment.
+-- Final scores are now weighted by Grade.weight (or the course policy), so after
+-- applying, recompute the stored grades and then the CPA totals with:
+--     python -m app.cli rebuild-enrollment-grades
+--     python -m app.cli rebuild-cumulative
+--     python -m app.cli rebuild-cpa-snapshots
+CREATE TABLE IF NOT EXISTS grading_policies (
+    id SERIAL PRIMARY KEY,
+    course_id INTEGER NOT NULL UNIQUE REFERENCES courses (id),
+    rounding INTEGER NOT NULL DEFAULT 1,
+    pass_score DOUBLE PRECISION NOT NULL DEFAULT 4.0,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_grading_policies_id ON grading_policies (id);
+
+CREATE TABLE IF NOT EXISTS grading_policy_components (
+    id SERIAL PRIMARY KEY,
+    policy_id INTEGER NOT NULL REFERENCES grading_policies (id) ON DELETE CASCADE,
+    grade_type VARCHAR NOT NULL,
+    weight DOUBLE PRECISION NOT NULL,
+    min_score DOUBLE PRECISION,
+    UNIQUE (policy_id, grade_type)
+);
+CREATE INDEX IF NOT EXISTS ix_grading_policy_components_id ON grading_policy_components (id);
+
+ALTER TABLE enrollments
+    ADD COLUMN IF NOT EXISTS is_passed BOOLEAN;
@@ -0,0 +1,24 @@
+-- Student cohort (e.g. "K66") and materialized per-semester GPA rankings
+-- by department and cohort.
+-- After applying, fill the table with:
+--     python -m app.cli rebuild-rankings
+ALTER TABLE students
+    ADD COLUMN IF NOT EXISTS cohort VARCHAR;
+CREATE INDEX IF NOT EXISTS ix_students_cohort ON students (cohort);
+
+CREATE TABLE IF NOT EXISTS semester_rankings (
+    id SERIAL PRIMARY KEY,
+    semester_id INTEGER NOT NULL REFERENCES semesters (id),
+    student_id INTEGER NOT NULL REFERENCES students (user_id),
+    scope VARCHAR NOT NULL,
+    scope_key VARCHAR NOT NULL,
+    gpa DOUBLE PRECISION NOT NULL,
+    rank INTEGER NOT NULL,
+    percentile DOUBLE PRECISION NOT NULL,
+    group_size INTEGER NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE (semester_id, scope, scope_key, student_id)
+);
+CREATE INDEX IF NOT EXISTS ix_semester_rankings_id ON semester_rankings (id);
+CREATE INDEX IF NOT EXISTS ix_semester_rankings_student_id ON semester_rankings (student_id);
+CREATE INDEX IF NOT EXISTS ix_semester_rankings_top ON semester_rankings (semester_id, scope, scope_key, rank);
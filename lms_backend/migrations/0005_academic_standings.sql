@@ -0,0 +1,17 @@
+-- Academic warning records written by the semester standing pipeline
+-- (POST /deans/semesters/{id}/academic-standing or
+--  python -m app.cli evaluate-standing <semester_code>).
+CREATE TABLE IF NOT EXISTS academic_standings (
+    id SERIAL PRIMARY KEY,
+    student_id INTEGER NOT NULL REFERENCES students (user_id),
+    semester_id INTEGER NOT NULL REFERENCES semesters (id),
+    warning_level INTEGER NOT NULL DEFAULT 0,
+    reasons VARCHAR,
+    gpa DOUBLE PRECISION DEFAULT 0,
+    cpa DOUBLE PRECISION DEFAULT 0,
+    failed_credits INTEGER DEFAULT 0,
+    evaluated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE (student_id, semester_id)
+);
+CREATE INDEX IF NOT EXISTS ix_academic_standings_id ON academic_standings (id);
+CREATE INDEX IF NOT EXISTS ix_academic_standings_semester_level ON academic_standings (semester_id, warning_level);
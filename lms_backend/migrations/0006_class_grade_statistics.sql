@@ -0,0 +1,18 @@
+-- Running per-class grade statistics (Welford mean/M2, min/max, pass count)
+-- per grade component plus "overall" for the enrollment final score.
+-- After applying, fill the table with:
+--     python -m app.cli rebuild-class-statistics
+CREATE TABLE IF NOT EXISTS class_grade_statistics (
+    id SERIAL PRIMARY KEY,
+    class_id INTEGER NOT NULL REFERENCES classes (id),
+    component VARCHAR NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+    m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+    min_score DOUBLE PRECISION,
+    max_score DOUBLE PRECISION,
+    pass_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    UNIQUE (class_id, component)
+);
+CREATE INDEX IF NOT EXISTS ix_class_grade_statistics_id ON class_grade_statistics (id);
@@ -0,0 +1,30 @@
+-- Training programs with graduation requirements for the degree audit,
+-- plus students.program_id. Assign programs through PUT /deans/students/{id}.
+CREATE TABLE IF NOT EXISTS programs (
+    id SERIAL PRIMARY KEY,
+    code VARCHAR NOT NULL UNIQUE,
+    name VARCHAR NOT NULL,
+    department_id INTEGER REFERENCES departments (id),
+    min_total_credits INTEGER NOT NULL DEFAULT 0,
+    min_cpa DOUBLE PRECISION NOT NULL DEFAULT 2.0
+);
+CREATE INDEX IF NOT EXISTS ix_programs_id ON programs (id);
+CREATE INDEX IF NOT EXISTS ix_programs_code ON programs (code);
+
+CREATE TABLE IF NOT EXISTS program_requirements (
+    id SERIAL PRIMARY KEY,
+    program_id INTEGER NOT NULL REFERENCES programs (id) ON DELETE CASCADE,
+    name VARCHAR NOT NULL,
+    requirement_type VARCHAR NOT NULL DEFAULT 'REQUIRED_COURSES',
+    min_credits INTEGER
+);
+CREATE INDEX IF NOT EXISTS ix_program_requirements_id ON program_requirements (id);
+
+CREATE TABLE IF NOT EXISTS program_requirement_courses (
+    requirement_id INTEGER NOT NULL REFERENCES program_requirements (id) ON DELETE CASCADE,
+    course_id INTEGER NOT NULL REFERENCES courses (id),
+    PRIMARY KEY (requirement_id, course_id)
+);
+
+ALTER TABLE students ADD COLUMN IF NOT EXISTS program_id INTEGER REFERENCES programs (id);
+CREATE INDEX IF NOT EXISTS ix_students_program_id ON students (program_id);
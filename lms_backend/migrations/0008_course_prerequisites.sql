@@ -0,0 +1,10 @@
+-- Course prerequisites. Bulk enrollment rejects students who have not passed
+-- every direct and transitive prerequisite of the class's course.
+CREATE TABLE IF NOT EXISTS course_prerequisites (
+    id SERIAL PRIMARY KEY,
+    course_id INTEGER NOT NULL REFERENCES courses (id) ON DELETE CASCADE,
+    prerequisite_id INTEGER NOT NULL REFERENCES courses (id) ON DELETE CASCADE,
+    UNIQUE (course_id, prerequisite_id)
+);
+CREATE INDEX IF NOT EXISTS ix_course_prerequisites_id ON course_prerequisites (id);
+CREATE INDEX IF NOT EXISTS ix_course_prerequisites_course_id ON course_prerequisites (course_id);
@@ -0,0 +1,117 @@
+-- Indexes for the hot filter columns, plus unique indexes where the code
+-- already assumes one row per key.
+--
+-- Duplicate tuitions (student_id, semester) are not merged automatically:
+-- each row can carry its own payments. The migration aborts and lists them;
+-- merge them by hand and run it again.
+--
+-- Other duplicates are removed. Every removed or re-pointed row is copied
+-- into a migration_0009_* audit table (same columns plus removed_at) first:
+--   enrollments (student_id, class_id): keep the oldest row, move its
+--       duplicates' grades onto it (migration_0009_moved_grades keeps the
+--       original enrollment_id); the grades dedupe below settles clashes
+--   grades (enrollment_id, grade_type): keep the newest row
+--   academic_results (student_id, semester_id): keep the newest row
+--   chat_group_members (group_id, user_id): keep the oldest row
+-- Because grades may be removed, run these afterwards:
+--     python -m app.cli rebuild-enrollment-grades
+--     python -m app.cli rebuild-cumulative
+--     python -m app.cli rebuild-class-statistics
+BEGIN;
+
+DO $$
+DECLARE
+    total INTEGER;
+    listing TEXT;
+BEGIN
+    SELECT COUNT(*), string_agg(
+        format('student_id=%s semester=%s tuition ids=%s', student_id, semester, ids), E'\n'
+        ORDER BY student_id, semester
+    )
+    INTO total, listing
+    FROM (
+        SELECT student_id, semester, array_agg(id ORDER BY id) AS ids
+        FROM tuitions
+        GROUP BY student_id, semester
+        HAVING COUNT(*) > 1
+    ) d;
+    IF total > 0 THEN
+        RAISE EXCEPTION 'Found % duplicate tuition group(s); merge them by hand before creating uq_tuitions_student_semester', total
+            USING DETAIL = listing;
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS migration_0009_moved_grades (
+    grade_id INTEGER NOT NULL,
+    old_enrollment_id INTEGER NOT NULL,
+    new_enrollment_id INTEGER NOT NULL,
+    moved_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS migration_0009_removed_enrollments (LIKE enrollments);
+CREATE TABLE IF NOT EXISTS migration_0009_removed_grades (LIKE grades);
+CREATE TABLE IF NOT EXISTS migration_0009_removed_academic_results (LIKE academic_results);
+CREATE TABLE IF NOT EXISTS migration_0009_removed_chat_group_members (LIKE chat_group_members);
+ALTER TABLE migration_0009_removed_enrollments ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE migration_0009_removed_grades ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE migration_0009_removed_academic_results ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+ALTER TABLE migration_0009_removed_chat_group_members ADD COLUMN IF NOT EXISTS removed_at TIMESTAMP WITH TIME ZONE DEFAULT now();
+
+WITH moved AS (
+    UPDATE grades g
+    SET enrollment_id = d.keep_id
+    FROM (
+        SELECT id, MIN(id) OVER (PARTITION BY student_id, class_id) AS keep_id
+        FROM enrollments
+    ) d
+    WHERE g.enrollment_id = d.id AND d.id <> d.keep_id
+    RETURNING g.id, d.id AS old_enrollment_id, d.keep_id
+)
+INSERT INTO migration_0009_moved_grades (grade_id, old_enrollment_id, new_enrollment_id)
+SELECT id, old_enrollment_id, keep_id FROM moved;
+
+WITH removed AS (
+    DELETE FROM enrollments e
+    USING enrollments k
+    WHERE e.student_id = k.student_id AND e.class_id = k.class_id AND e.id > k.id
+    RETURNING e.*
+)
+INSERT INTO migration_0009_removed_enrollments SELECT * FROM removed;
+
+WITH removed AS (
+    DELETE FROM grades g
+    USING grades k
+    WHERE g.enrollment_id = k.enrollment_id AND g.grade_type = k.grade_type AND g.id < k.id
+    RETURNING g.*
+)
+INSERT INTO migration_0009_removed_grades SELECT * FROM removed;
+
+WITH removed AS (
+    DELETE FROM academic_results r
+    USING academic_results k
+    WHERE r.student_id = k.student_id AND r.semester_id = k.semester_id AND r.id < k.id
+    RETURNING r.*
+)
+INSERT INTO migration_0009_removed_academic_results SELECT * FROM removed;
+
+WITH removed AS (
+    DELETE FROM chat_group_members m
+    USING chat_group_members k
+    WHERE m.group_id = k.group_id AND m.user_id = k.user_id AND m.id > k.id
+    RETURNING m.*
+)
+INSERT INTO migration_0009_removed_chat_group_members SELECT * FROM removed;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_enrollments_student_class ON enrollments (student_id, class_id);
+CREATE INDEX IF NOT EXISTS ix_enrollments_class_id ON enrollments (class_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_grades_enrollment_type ON grades (enrollment_id, grade_type);
+CREATE INDEX IF NOT EXISTS ix_timetables_class_date ON timetables (class_id, date);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_academic_results_student_semester ON academic_results (student_id, semester_id);
+CREATE INDEX IF NOT EXISTS ix_academic_results_semester_student ON academic_results (semester_id, student_id);
+CREATE INDEX IF NOT EXISTS ix_chat_messages_group_timestamp ON chat_messages (group_id, timestamp);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_chat_group_members_group_user ON chat_group_members (group_id, user_id);
+CREATE INDEX IF NOT EXISTS ix_chat_group_members_user_id ON chat_group_members (user_id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_tuitions_student_semester ON tuitions (student_id, semester);
+
+COMMIT;
+
+ANALYZE enrollments, grades, timetables, academic_results, chat_messages, chat_group_members, tuitions;
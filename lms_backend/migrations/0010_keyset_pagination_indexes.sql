@@ -0,0 +1,11 @@
+-- Keyset pagination: each listing page is one index range scan
+-- (WHERE filter = ? AND id > cursor ORDER BY id LIMIT n).
+--   /deans/students, /deans/lecturers: users (role, id)
+--   /reports/all?status=...:           reports (status, id)
+-- academic_results (semester_id, student_id) comes from 0009; tuitions and
+-- classes page on their primary key.
+CREATE INDEX IF NOT EXISTS ix_users_role_id ON users (role, id);
+CREATE INDEX IF NOT EXISTS ix_reports_status_id ON reports (status, id);
+
+ANALYZE users;
+ANALYZE reports;
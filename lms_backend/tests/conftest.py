@@ -0,0 +1,274 @@
+import datetime
+import random
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import Base, get_db, get_read_db
+from app.models import (
+    User, Student, Lecturer, Department, Course, Class, Enrollment, Grade, Semester, AcademicYear,
+    AcademicResult, Tuition, ChatGroup, ChatGroupMember, ChatMessage, Report
+)
+from app.models.timetable import Timetable
+from app.models.report import ReportStatus, ReportType
+from app.models.enums import UserRole
+
+N_STUDENTS = 2000
+N_CLASSES = 200
+N_LECTURERS = 50
+N_REPORTS = 300
+CLASSES_PER_STUDENT = 8
+DEAN_ID = 1
+LECTURER_IDS = range(5001, 5001 + N_LECTURERS)
+
+def seed_sample_data(engine):
+    """Tạo bảng và dữ liệu mẫu đủ lớn để planner ưu tiên index, rồi ANALYZE"""
+    Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    semesters = ["20231", "20232", "20241", "20242"]
+
+    with engine.begin() as conn:
+        conn.execute(insert(Department), [{"id": d, "name": f"Khoa {d}"} for d in range(1, 6)])
+        conn.execute(insert(AcademicYear), [{
+            "id": 1, "year": "2023-2024",
+            "start_date": datetime.date(2023, 9, 1), "end_date": datetime.date(2025, 6, 1)
+        }])
+        conn.execute(insert(Semester), [
+            {
+                "id": i + 1, "code": code, "name": code, "academic_year_id": 1, "semester_number": i % 2 + 1,
+                "start_date": datetime.date(2023, 9, 1) + datetime.timedelta(days=150 * i),
+                "end_date": datetime.date(2024, 1, 1) + datetime.timedelta(days=150 * i)
+            }
+            for i, code in enumerate(semesters)
+        ])
+        conn.execute(insert(User), [
+            {
+                "id": DEAN_ID, "username": "dean", "email": "dean@x", "hashed_password": "x",
+                "role": UserRole.DEAN, "full_name": "Trưởng khoa"
+            }
+        ] + [
+            {
+                "id": sid, "username": f"s{sid}", "email": f"s{sid}@x", "hashed_password": "x",
+                "role": UserRole.STUDENT, "full_name": f"Sinh viên {sid}"
+            }
+            for sid in range(2, N_STUDENTS + 2)
+        ] + [
+            {
+                "id": lid, "username": f"l{lid}", "email": f"l{lid}@x", "hashed_password": "x",
+                "role": UserRole.LECTURER, "full_name": f"Giảng viên {lid}"
+            }
+            for lid in LECTURER_IDS
+        ])
+        conn.execute(insert(Student), [
+            {"user_id": sid, "student_code": f"SV{sid:05d}", "department_id": sid % 5 + 1}
+            for sid in range(2, N_STUDENTS + 2)
+        ])
+        conn.execute(insert(Lecturer), [
+            {"user_id": lid, "lecturer_code": f"GV{lid}", "department_id": lid % 5 + 1} for lid in LECTURER_IDS
+        ])
+        conn.execute(insert(Course), [
+            {
+                "id": cid, "code": f"C{cid}", "credits": 3,
+                "name": f"đồ án {cid}" if cid % 5 == 0 else f"Course {cid}"
+            }
+            for cid in range(1, 51)
+        ])
+        conn.execute(insert(Class), [
+            {
+                "id": cid, "code": f"L{cid}", "course_id": cid % 50 + 1,
+                "lecturer_id": LECTURER_IDS[cid % N_LECTURERS],
+                "semester": semesters[cid % 4], "max_students": 500
+            }
+            for cid in range(1, N_CLASSES + 1)
+        ])
+        conn.execute(insert(Timetable), [
+            {
+                "class_id": cid, "date": datetime.date(2024, 1, 1) + datetime.timedelta(days=7 * week),
+                "start_period": 1, "end_period": 3, "room": "A1"
+            }
+            for cid in range(1, N_CLASSES + 1) for week in range(10)
+        ])
+
+        enrollments, grades, results, tuitions, members = [], [], [], [], []
+        for sid in range(2, N_STUDENTS + 2):
+            for class_id in rng.sample(range(1, N_CLASSES + 1), CLASSES_PER_STUDENT):
+                eid = len(enrollments) + 1
+                enrollments.append({"id": eid, "student_id": sid, "class_id": class_id, "final_score": 7.0})
+                grades += [
+                    {"enrollment_id": eid, "grade_type": "midterm", "score": 6.0, "weight": 0.5},
+                    {"enrollment_id": eid, "grade_type": "final", "score": 8.0, "weight": 0.5},
+                ]
+                members.append({"group_id": class_id, "user_id": sid})
+            for i, code in enumerate(semesters):
+                results.append({"student_id": sid, "semester_id": i + 1, "gpa": 3.0, "cpa": 3.0})
+                tuitions.append({"student_id": sid, "semester": code, "total_amount": 1, "paid_amount": 0})
+        conn.execute(insert(Enrollment), enrollments)
+        conn.execute(insert(Grade), grades)
+        conn.execute(insert(AcademicResult), results)
+        conn.execute(insert(Tuition), tuitions)
+        conn.execute(insert(ChatGroup), [
+            {"id": cid, "name": f"L{cid}", "class_id": cid, "created_by": DEAN_ID} for cid in range(1, N_CLASSES + 1)
+        ])
+        conn.execute(insert(ChatGroupMember), members)
+        conn.execute(insert(ChatMessage), [
+            {"group_id": m["group_id"], "sender_id": m["user_id"], "encrypted_content": "x"} for m in members
+        ])
+        conn.execute(insert(Report), [
+            {
+                "student_id": 2 + i % 20, "title": f"Report {i}", "description": "x",
+                "report_type": ReportType.OTHER,
+                "status": ReportStatus.RESOLVED if i % 2 else ReportStatus.PENDING,
+                "resolved_by": DEAN_ID if i % 2 else None
+            }
+            for i in range(N_REPORTS)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+
+@pytest.fixture(scope="session")
+def seeded_engine():
+    """SQLite trong bộ nhớ với dữ liệu mẫu"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    seed_sample_data(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(seeded_engine):
+    db = sessionmaker(bind=seeded_engine, autoflush=False)()
+    yield db
+    db.close()
+
+@pytest.fixture
+def client(session):
+    """TestClient dùng session trên dữ liệu mẫu; test tự đặt override cho người dùng hiện tại"""
+    from app.main import app
+
+    def override_db():
+        yield session
+
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_read_db] = override_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def captured_statements(engine, run):
+    """Chạy run() và trả về các câu SQL (statement, parameters) đã gửi xuống engine"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements
+
+@pytest.fixture
+def capture_statements():
+    return captured_statements
+
+SMALL_SEMESTERS = ["20231", "20232"]
+SMALL_STUDENT_IDS = range(2, 8)
+SMALL_CREDITS = {1: 3, 2: 2, 3: 4, 4: 3}
+
+def seed_small_data(engine):
+    """
+    Dữ liệu nhỏ để so sánh kết quả chính xác
+
+    6 sinh viên học đủ 4 môn ở cả 2 học kỳ (20232 đang hoạt động), điểm giữa kỳ/cuối kỳ
+    ngẫu nhiên cố định (có môn trượt); điểm tổng kết trên Enrollment đã được tính.
+    """
+    from app.utils.academic_calculator import rebuild_enrollment_grades
+    from app.utils.grading_policy import grading_policies
+
+    Base.metadata.create_all(engine)
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(insert(Department), [{"id": 1, "name": "Khoa 1"}, {"id": 2, "name": "Khoa 2"}])
+        conn.execute(insert(AcademicYear), [{
+            "id": 1, "year": "2023-2024",
+            "start_date": datetime.date(2023, 9, 1), "end_date": datetime.date(2024, 7, 1)
+        }])
+        conn.execute(insert(Semester), [
+            {
+                "id": 1, "code": "20231", "name": "20231", "academic_year_id": 1, "semester_number": 1,
+                "start_date": datetime.date(2023, 9, 1), "end_date": datetime.date(2024, 1, 15), "is_active": False
+            },
+            {
+                "id": 2, "code": "20232", "name": "20232", "academic_year_id": 1, "semester_number": 2,
+                "start_date": datetime.date(2024, 2, 1), "end_date": datetime.date(2024, 6, 30), "is_active": True
+            },
+        ])
+        conn.execute(insert(User), [
+            {"id": DEAN_ID, "username": "dean", "email": "dean@x", "hashed_password": "x", "role": UserRole.DEAN},
+            {"id": 100, "username": "gv", "email": "gv@x", "hashed_password": "x", "role": UserRole.LECTURER},
+        ] + [
+            {"id": sid, "username": f"s{sid}", "email": f"s{sid}@x", "hashed_password": "x", "role": UserRole.STUDENT}
+            for sid in SMALL_STUDENT_IDS
+        ])
+        conn.execute(insert(Student), [
+            {
+                "user_id": sid, "student_code": f"SV{sid}", "department_id": sid % 2 + 1,
+                "cohort": "K66" if sid < 5 else "K67"
+            }
+            for sid in SMALL_STUDENT_IDS
+        ])
+        conn.execute(insert(Lecturer), [{"user_id": 100, "lecturer_code": "GV100", "department_id": 1}])
+        conn.execute(insert(Course), [
+            {"id": cid, "code": f"C{cid}", "name": f"Course {cid}", "credits": credits}
+            for cid, credits in SMALL_CREDITS.items()
+        ])
+        conn.execute(insert(Class), [
+            {
+                "id": s * 4 + cid, "code": f"L{s * 4 + cid}", "course_id": cid, "lecturer_id": 100,
+                "semester": code, "max_students": 50
+            }
+            for s, code in enumerate(SMALL_SEMESTERS) for cid in SMALL_CREDITS
+        ])
+        enrollments, grades = [], []
+        for sid in SMALL_STUDENT_IDS:
+            for class_id in range(1, 9):
+                eid = len(enrollments) + 1
+                enrollments.append({"id": eid, "student_id": sid, "class_id": class_id})
+                grades += [
+                    {"enrollment_id": eid, "grade_type": "midterm", "score": round(rng.uniform(2, 10), 1), "weight": 0.4},
+                    {"enrollment_id": eid, "grade_type": "final", "score": round(rng.uniform(2, 10), 1), "weight": 0.6},
+                ]
+        conn.execute(insert(Enrollment), enrollments)
+        conn.execute(insert(Grade), grades)
+
+    grading_policies.invalidate()
+    db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        rebuild_enrollment_grades(db)
+    finally:
+        db.close()
+
+@pytest.fixture
+def small_db():
+    """Session trên SQLite trong bộ nhớ riêng cho từng test, với dữ liệu seed_small_data"""
+    from app.utils.grading_policy import grading_policies
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    seed_small_data(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    yield db
+    db.close()
+    engine.dispose()
+    grading_policies.invalidate()
+
+@pytest.fixture
+def recalc_queue(small_db, monkeypatch):
+    """Hàng đợi tính lại riêng trên small_db thay cho hàng đợi của các service ghi điểm; test gọi flush() để xử lý"""
+    from app.services import dean_service, lecturer_service, recalc_queue as recalc_queue_module
+    from app.services.recalc_queue import RecalculationQueue
+
+    queue = RecalculationQueue(max_delay=3600, batch_size=10000)
+    monkeypatch.setattr(recalc_queue_module, "SessionLocal", sessionmaker(bind=small_db.get_bind(), autoflush=False))
+    for service in (dean_service, lecturer_service):
+        monkeypatch.setattr(service, "recalc_queue", queue)
+    yield queue
+    queue.stop()
@@ -0,0 +1,70 @@
+import pytest
+from app.models.academic import Grade
+from app.utils.academic_calculator import (
+    GRADE_CONVERSION, convert_score_to_grade_4, convert_scores_to_grade_4,
+    compute_enrollment_grade
+)
+from app.utils.grading_policy import CompiledPolicy
+from app.utils.semester_ranking import rank_group
+from app.utils.prerequisite_graph import transitive_closure
+from app.services.degree_audit_service import CompiledProgram, CompiledRequirement, evaluate_program
+
+def test_convert_score_boundaries():
+    for min_score, _, grade_4, letter in GRADE_CONVERSION:
+        assert convert_score_to_grade_4(min_score) == (grade_4, letter)
+
+def test_convert_score_between_ranges():
+    assert convert_score_to_grade_4(8.45) == (3.5, "B+")
+    assert convert_score_to_grade_4(3.95) == (0.0, "F")
+    assert convert_score_to_grade_4(4.95) == (1.0, "D")
+
+def test_convert_scores_batch_matches_single():
+    scores = [i / 20 for i in range(201)]
+    assert convert_scores_to_grade_4(scores) == [convert_score_to_grade_4(s) for s in scores]
+
+def test_convert_scores_keeps_missing():
+    assert convert_scores_to_grade_4([None, 9.0]) == [None, (4.0, "A")]
+
+def test_compute_enrollment_grade_uses_grade_weights():
+    grades = [Grade(grade_type="midterm", score=3.0, weight=0.3), Grade(grade_type="final", score=8.0, weight=0.5)]
+    # (3.0×0.3 + 8.0×0.5) / 0.8 = 6.125 -> 6.1
+    assert compute_enrollment_grade(grades) == (6.1, 2.0, "C", True)
+    assert compute_enrollment_grade([]) == (None, None, None, None)
+
+def test_course_policy_requires_components_and_pass_rule():
+    policy = CompiledPolicy(weights={"midterm": 0.4, "final": 0.6}, min_scores={"final": 3.0})
+    assert policy.evaluate([("midterm", 7.0, 1.0)]) is None
+    assert policy.evaluate([("midterm", 7.0, 1.0), ("final", 6.25, 1.0)]) == (6.6, True)
+    assert policy.evaluate([("midterm", 10.0, 1.0), ("final", 2.5, 1.0)]) == (5.5, False)
+
+def test_evaluate_matrix_matches_single():
+    policy = CompiledPolicy(weights={"midterm": 0.3, "final": 0.7}, rounding=2)
+    rows = [(1, "midterm", 5.0, 0.5), (1, "final", 9.0, 0.5), (2, "midterm", 4.0, 0.5), (3, "final", 6.0, 0.5), (3, "midterm", 2.0, 0.5)]
+    assert policy.evaluate_matrix(rows) == {
+        1: policy.evaluate([("midterm", 5.0, 0.5), ("final", 9.0, 0.5)]),
+        3: policy.evaluate([("final", 6.0, 0.5), ("midterm", 2.0, 0.5)]),
+    }
+
+def test_rank_group_shares_rank_on_ties():
+    ranks = rank_group([(1, 3.0), (2, 3.5), (3, 3.0), (4, 2.0)])
+    assert ranks == {2: (1, 100.0), 1: (2, 66.67), 3: (2, 66.67), 4: (4, 0.0)}
+    assert rank_group([(5, 2.5)]) == {5: (1, 100.0)}
+
+def test_degree_audit_requirements():
+    program = CompiledProgram(1, "IT", "IT", 8, 2.0, (
+        CompiledRequirement("Core", "REQUIRED_COURSES", None, {1: ("C1", 3), 2: ("C2", 3)}),
+        CompiledRequirement("Elective", "ELECTIVE_CREDITS", 4, {3: ("C3", 2), 4: ("C4", 2), 5: ("C5", 3)}),
+    ))
+    audit = evaluate_program(program, {1: 3, 3: 2, 4: 2}, 2.5)
+    core, elective = audit["requirements"]
+    assert not core["satisfied"] and core["remaining_courses"] == ["C2"]
+    assert elective["satisfied"] and elective["completed_credits"] == 4
+    assert audit["completed_credits"] == 7 and audit["eligible"] is False
+    assert evaluate_program(program, {1: 3, 2: 3, 3: 2, 4: 2}, 2.5)["eligible"] is True
+    assert evaluate_program(program, {1: 3, 2: 3, 3: 2, 4: 2}, 1.9)["eligible"] is False
+
+def test_prerequisite_transitive_closure():
+    closure = transitive_closure([(3, 2), (2, 1), (4, 1), (4, 3)])
+    assert closure == {3: {1, 2}, 2: {1}, 4: {1, 2, 3}}
+    with pytest.raises(ValueError):
+        transitive_closure([(1, 2), (2, 3), (3, 1)])
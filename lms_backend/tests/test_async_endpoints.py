@@ -0,0 +1,137 @@
+import datetime
+from typing import List
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.auth.security import get_password_hash
+from app.database import get_async_db, get_async_read_db
+from app.models import User
+from app.models.timetable import Timetable
+from app.routers import auth
+from app.schemas.academic import MobileGradeResponse, MobileTimetableResponse
+from app.services import student_service
+from app.utils.grading_policy import grading_policies
+from conftest import seed_small_data
+
+STUDENT_ID = 3
+OTP = "123456"
+
+@pytest.fixture
+def db_path(tmp_path):
+    """File SQLite có dữ liệu seed_small_data, mật khẩu thật cho dean và s3, tên giảng viên, lịch học học kỳ 20232"""
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    seed_small_data(engine)
+    with engine.begin() as conn:
+        conn.execute(update(User).where(User.username == "dean").values(hashed_password=get_password_hash("deanpass")))
+        conn.execute(update(User).where(User.id == STUDENT_ID).values(hashed_password=get_password_hash("s3pass")))
+        conn.execute(update(User).where(User.username == "gv").values(full_name="Giảng viên"))
+        conn.execute(insert(Timetable), [
+            {"class_id": class_id, "date": datetime.date(2024, 3, day), "start_period": period,
+             "end_period": period + 2, "room": f"D{class_id}", "is_makeup": False}
+            for class_id in range(5, 9) for day, period in ((4 + class_id, 1), (2, class_id))
+        ])
+    engine.dispose()
+    yield path
+    grading_policies.invalidate()
+
+@pytest.fixture
+def client(db_path, monkeypatch):
+    # NullPool: TestClient có thể chạy mỗi request trên một event loop khác
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    AsyncTestSession = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+    async def override_async_db():
+        async with AsyncTestSession() as db:
+            yield db
+
+    sent = []
+    monkeypatch.setattr(auth, "generate_otp", lambda: OTP)
+    monkeypatch.setattr(auth, "send_otp_email", lambda email, otp, full_name: sent.append((email, otp)) or True)
+    app.dependency_overrides[get_async_db] = override_async_db
+    app.dependency_overrides[get_async_read_db] = override_async_db
+    try:
+        test_client = TestClient(app)
+        test_client.sent_otps = sent
+        yield test_client
+    finally:
+        app.dependency_overrides.clear()
+        auth.pending_dean_logins.clear()
+
+def login(client, username, password):
+    return client.post("/auth/login", data={"username": username, "password": password})
+
+def serialize(schema, rows):
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+
+def student_headers(client):
+    token = login(client, "s3", "s3pass").json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+def test_student_login(client):
+    response = login(client, "s3", "s3pass")
+    assert response.status_code == 200
+    assert response.json()["role"] == "student" and response.json()["access_token"]
+
+    assert login(client, "s3", "wrong").status_code == 401
+    assert login(client, "nobody", "s3pass").status_code == 401
+
+def test_dean_login_requires_otp(client):
+    response = login(client, "dean", "deanpass")
+    assert response.status_code == 200
+    assert response.json()["requires_otp"] is True and response.json()["email_hint"] == "dea***@x"
+    assert client.sent_otps == [("dean@x", OTP)]
+
+    wrong = client.post("/auth/verify-otp", json={"username": "dean", "otp": "000000"})
+    assert wrong.status_code == 401 and "Còn" in wrong.json()["detail"]
+
+    verified = client.post("/auth/verify-otp", json={"username": "dean", "otp": OTP})
+    assert verified.status_code == 200
+    assert verified.json()["role"] == "dean" and verified.json()["access_token"]
+
+    # Phiên chờ OTP đã dùng xong
+    assert client.post("/auth/verify-otp", json={"username": "dean", "otp": OTP}).status_code == 400
+
+def test_resend_otp(client):
+    assert client.post("/auth/resend-otp", data={"username": "nobody"}).status_code == 404
+    assert client.post("/auth/resend-otp", data={"username": "s3"}).status_code == 400
+
+    response = client.post("/auth/resend-otp", data={"username": "dean"})
+    assert response.status_code == 200
+    assert client.sent_otps == [("dean@x", OTP)]
+    assert client.post("/auth/verify-otp", json={"username": "dean", "otp": OTP}).status_code == 200
+
+def test_student_profile(client):
+    response = client.get("/students/me", headers=student_headers(client))
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["id"], body["username"], body["role"]) == (STUDENT_ID, "s3", "student")
+    assert body["department_name"] == f"Khoa {STUDENT_ID % 2 + 1}"
+
+    assert client.get("/students/me").status_code == 401
+    assert client.get("/students/me", headers={"Authorization": "Bearer invalid"}).status_code == 401
+
+def test_grades_and_timetable_match_sync_service(client, db_path):
+    headers = student_headers(client)
+    grades = client.get("/students/my-grades", headers=headers)
+    timetable = client.get("/students/my-timetable", headers=headers)
+    assert grades.status_code == 200 and timetable.status_code == 200
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    db = sessionmaker(bind=engine)()
+    try:
+        expected_grades = serialize(MobileGradeResponse, student_service.get_student_grades(STUDENT_ID, db))
+        expected_timetable = serialize(MobileTimetableResponse, student_service.get_student_timetable(STUDENT_ID, db))
+    finally:
+        db.close()
+        engine.dispose()
+
+    assert len(grades.json()) == 8 and len(timetable.json()) == 8
+    assert grades.json() == expected_grades
+    assert timetable.json() == expected_timetable
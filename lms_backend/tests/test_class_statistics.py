@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.models.academic import Enrollment, Grade
+from app.models.class_statistic import ClassGradeStatistic
+from app.services import dean_service, lecturer_service
+from app.utils.academic_calculator import rebuild_cumulative_results
+from app.utils.class_statistics import (
+    OVERALL_COMPONENT, _computed_statistics, rebuild_class_statistics, refresh_class_statistics
+)
+from app.utils.grading_policy import grading_policies
+from conftest import SMALL_STUDENT_IDS, captured_statements, seed_small_data
+
+CLASS_ID = 5
+
+@pytest.fixture
+def db(small_db, recalc_queue):
+    """small_db với thống kê lớp và tổng tích lũy đã dựng; process() xử lý lô đang chờ của hàng đợi"""
+    rebuild_class_statistics(small_db)
+    rebuild_cumulative_results(small_db)
+
+    def process():
+        recalc_queue.flush()
+        small_db.expire_all()
+
+    small_db.process = process
+    return small_db
+
+def stored_statistics(db, class_id):
+    return {
+        (stat.class_id, stat.component): (
+            stat.count, stat.mean, stat.m2, stat.min_score, stat.max_score, stat.pass_count
+        )
+        for stat in db.query(ClassGradeStatistic).filter(
+            ClassGradeStatistic.class_id == class_id, ClassGradeStatistic.count > 0
+        ).all()
+    }
+
+def assert_matches_recompute(db, class_id=CLASS_ID):
+    expected = _computed_statistics(db, [class_id])
+    stored = stored_statistics(db, class_id)
+    assert stored.keys() == expected.keys()
+    for key, values in expected.items():
+        assert stored[key][0] == values[0] and stored[key][3:] == values[3:], key
+        assert stored[key][1] == pytest.approx(values[1]) and stored[key][2] == pytest.approx(values[2], abs=1e-6)
+    assert rebuild_class_statistics(db, check_only=True)["mismatched"] == 0
+    assert rebuild_cumulative_results(db, check_only=True)["mismatched"] == 0
+
+def scores(db, grade_type):
+    return sorted(
+        (grade.score, grade.id) for grade in db.query(Grade).join(Enrollment).filter(
+            Enrollment.class_id == CLASS_ID, Grade.grade_type == grade_type
+        ).all()
+    )
+
+def test_grade_writes_keep_statistics_exact(db):
+    assert_matches_recompute(db)
+
+    # Sửa điểm, thêm thành phần mới (chưa có dòng thống kê)
+    lecturer_service.add_or_update_grade(CLASS_ID, 2, {"midterm": 9.5, "final": 3.0}, db)
+    lecturer_service.add_or_update_grade(CLASS_ID, 3, {"lab": 8.0}, db)
+    lecturer_service.add_or_update_grade(CLASS_ID, 4, {"lab": 4.5}, db)
+    db.process()
+    assert_matches_recompute(db)
+
+    # Đổi điểm đang là min và max thành giá trị ở giữa: min/max phải tính lại
+    (low, low_id), (high, high_id) = scores(db, "final")[0], scores(db, "final")[-1]
+    middle = round((low + high) / 2, 1)
+    for grade_id in (low_id, high_id):
+        dean_service.update_grade(grade_id, middle, db)
+    db.process()
+    assert_matches_recompute(db)
+    stat = db.query(ClassGradeStatistic).filter_by(class_id=CLASS_ID, component="final").one()
+    assert stat.min_score > low and stat.max_score < high
+
+    # Xóa điểm đang là min/max của thành phần và của điểm tổng kết
+    dean_service.delete_grade(scores(db, "midterm")[0][1], db)
+    dean_service.delete_grade(scores(db, "midterm")[-1][1], db)
+    for _, grade_id in scores(db, "lab"):
+        dean_service.delete_grade(grade_id, db)
+    db.process()
+    assert_matches_recompute(db)
+    overall = db.query(ClassGradeStatistic).filter_by(class_id=CLASS_ID, component=OVERALL_COMPONENT).one()
+    assert overall.count == len(SMALL_STUDENT_IDS) and "lab" not in {key[1] for key in stored_statistics(db, CLASS_ID)}
+
+def test_grade_entry_defers_statistics_and_cumulative_totals(db, recalc_queue):
+    """Nhập điểm chỉ ghi Grade và Enrollment; thống kê lớp và CPA tích lũy chờ lô của hàng đợi"""
+    before = stored_statistics(db, CLASS_ID)
+    statements = captured_statements(db.get_bind(), lambda: [
+        lecturer_service.add_or_update_grade(CLASS_ID, student_id, {"midterm": 10.0, "final": 10.0}, db)
+        for student_id in (2, 3)
+    ])
+
+    written = [statement for statement, _ in statements if not statement.lstrip().upper().startswith("SELECT")]
+    assert written and all("grades" in statement or "enrollments" in statement for statement in written)
+    assert not any("FOR UPDATE" in statement.upper() for statement, _ in statements)
+    assert not any(
+        table in statement for statement, _ in statements for table in ("class_grade_statistics", "cumulative_results")
+    )
+    assert recalc_queue.pending_count() == 2 and stored_statistics(db, CLASS_ID) == before
+
+    db.process()
+    assert_matches_recompute(db)
+
+def test_concurrent_first_refreshes_create_one_row(tmp_path):
+    """Hai lô cùng không thấy dòng thống kê của lớp rồi cùng tạo: không được lỗi UniqueConstraint"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    seed_small_data(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    first, second = Session(), Session()
+    raced = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def commit_other_refresh_first(conn, cursor, statement, parameters, context, executemany):
+        # Ngay trước khi lô đầu tạo dòng thống kê, lô khác tạo các dòng đó và commit
+        if not raced and statement.lstrip().upper().startswith("INSERT") and "class_grade_statistics" in statement:
+            raced.append(True)
+            refresh_class_statistics(second, [CLASS_ID])
+            second.commit()
+
+    try:
+        refresh_class_statistics(first, [CLASS_ID])
+        first.commit()
+        assert raced
+        assert stored_statistics(first, CLASS_ID).keys() == _computed_statistics(first, [CLASS_ID]).keys()
+        assert first.query(ClassGradeStatistic).count() == 3
+        assert rebuild_class_statistics(first, class_ids=[CLASS_ID], check_only=True)["mismatched"] == 0
+    finally:
+        event.remove(engine, "before_cursor_execute", commit_other_refresh_first)
+        first.close()
+        second.close()
+        engine.dispose()
+        grading_policies.invalidate()
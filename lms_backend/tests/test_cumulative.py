@@ -0,0 +1,212 @@
+import datetime
+from collections import defaultdict
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.models.academic import Class, Enrollment, Grade
+from app.models.academic_year import AcademicResult, Semester
+from app.models.cumulative_result import CumulativeResult
+from app.services import dean_service, job_service
+from app.utils.academic_calculator import (
+    calculate_all_students_in_semester, calculate_and_save_semester_result,
+    rebuild_cumulative_results, refresh_cpa_snapshots, refresh_enrollment_grade, weighted_average
+)
+from conftest import SMALL_CREDITS, SMALL_SEMESTERS, SMALL_STUDENT_IDS, seed_small_data
+
+def result_rows(db):
+    academic = db.query(
+        AcademicResult.student_id, AcademicResult.semester_id, AcademicResult.gpa, AcademicResult.cpa,
+        AcademicResult.total_credits, AcademicResult.completed_credits, AcademicResult.failed_credits,
+        AcademicResult.cumulative_credits
+    ).order_by(AcademicResult.student_id, AcademicResult.semester_id).all()
+    cumulative = db.query(
+        CumulativeResult.student_id, CumulativeResult.cpa, CumulativeResult.total_grade_points,
+        CumulativeResult.total_registered_credits, CumulativeResult.total_completed_credits,
+        CumulativeResult.total_failed_credits
+    ).order_by(CumulativeResult.student_id).all()
+    return [tuple(row) for row in academic], [tuple(row) for row in cumulative]
+
+def expected_gpa_cpa(db):
+    """GPA từng học kỳ và CPA tính đến học kỳ đó, cộng tay từ điểm lưu trên Enrollment"""
+    points = defaultdict(float)
+    for student_id, semester_code, grade_4, course_id in db.query(
+        Enrollment.student_id, Class.semester, Enrollment.grade_4, Class.course_id
+    ).join(Class).all():
+        points[student_id, semester_code] += grade_4 * SMALL_CREDITS[course_id]
+    credits = sum(SMALL_CREDITS.values())
+    expected = {}
+    for student_id in SMALL_STUDENT_IDS:
+        running = 0.0
+        for semester_id, code in enumerate(SMALL_SEMESTERS, start=1):
+            running += points[student_id, code]
+            expected[student_id, semester_id] = (
+                weighted_average(points[student_id, code], credits), weighted_average(running, credits * semester_id)
+            )
+    return expected
+
+@pytest.fixture
+def cpa_job(small_db, monkeypatch):
+    """Job tính lại CPA chạy đồng bộ trên small_db, chia nhóm 2 sinh viên, 2 tổng tích lũy bị lệch"""
+    rebuild_cumulative_results(small_db)
+    small_db.query(CumulativeResult).filter(CumulativeResult.student_id.in_([3, 6])).update(
+        {CumulativeResult.total_grade_points: 0.0}, synchronize_session=False
+    )
+    small_db.commit()
+    monkeypatch.setattr(dean_service, "SessionLocal", sessionmaker(bind=small_db.get_bind(), autoflush=False))
+    monkeypatch.setattr(settings, "RECALCULATE_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "BACKGROUND_WORKERS", 1)
+    return job_service.create_job("recalculate_all_cpa")["job_id"]
+
+def test_recalculate_all_cpa_job(small_db, cpa_job):
+    result = dean_service._recalculate_all_cpa_job(cpa_job)
+
+    assert result["total_students"] == len(SMALL_STUDENT_IDS) and result["updated"] == 2
+    job = job_service.get_job(cpa_job)
+    assert (job["total"], job["processed"], job["success"], job["errors"]) == (6, 6, 6, 0)
+    assert rebuild_cumulative_results(small_db, check_only=True)["mismatched"] == 0
+
+def test_failed_chunk_falls_back_per_student(small_db, cpa_job, monkeypatch):
+    def flaky_rebuild(db, student_ids=None, check_only=False):
+        if len(student_ids) > 1 or student_ids == [6]:
+            raise RuntimeError("boom")
+        return rebuild_cumulative_results(db, student_ids=student_ids, check_only=check_only)
+    monkeypatch.setattr(dean_service, "rebuild_cumulative_results", flaky_rebuild)
+
+    result = dean_service._recalculate_all_cpa_job(cpa_job)
+
+    # Cùng thước đo với lô thành công: chỉ sinh viên 3 có tổng bị sửa, sinh viên 6 lỗi
+    assert result["updated"] == 1
+    job = job_service.get_job(cpa_job)
+    assert (job["processed"], job["success"], job["errors"]) == (6, 5, 1)
+    assert job["error_details"] == ["Student 6: boom"]
+    assert rebuild_cumulative_results(small_db, student_ids=[6], check_only=True)["mismatched_student_ids"] == [6]
+    assert rebuild_cumulative_results(small_db, check_only=True)["mismatched"] == 1
+
+def test_single_student_result_matches_bulk_engine(small_db):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    seed_small_data(engine)
+    per_student_db = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        for semester_id in range(1, len(SMALL_SEMESTERS) + 1):
+            assert calculate_all_students_in_semester(semester_id, small_db) == len(SMALL_STUDENT_IDS)
+            for student_id in SMALL_STUDENT_IDS:
+                result = calculate_and_save_semester_result(student_id, semester_id, per_student_db)
+                assert (result.student_id, result.semester_id) == (student_id, semester_id)
+
+        bulk = result_rows(small_db)
+        assert result_rows(per_student_db) == bulk
+        assert rebuild_cumulative_results(per_student_db, check_only=True)["mismatched"] == 0
+
+        academic, cumulative = bulk
+        expected = expected_gpa_cpa(small_db)
+        assert {row[:2]: row[2:4] for row in academic} == expected
+        assert {row[0]: row[1] for row in cumulative} == {
+            student_id: expected[student_id, len(SMALL_SEMESTERS)][1] for student_id in SMALL_STUDENT_IDS
+        }
+
+        # Không học môn nào trong học kỳ: không ghi gì; học kỳ không tồn tại: ValueError
+        assert calculate_and_save_semester_result(100, 1, per_student_db) is None
+        with pytest.raises(ValueError):
+            calculate_and_save_semester_result(2, 99, per_student_db)
+    finally:
+        per_student_db.close()
+        engine.dispose()
+
+def assert_matches_rebuild(db):
+    report = rebuild_cumulative_results(db, check_only=True)
+    assert report["mismatched"] == 0, report["mismatched_student_ids"]
+    for result in db.query(CumulativeResult).all():
+        assert result.cpa == weighted_average(result.total_grade_points, result.total_registered_credits)
+
+def test_grade_edits_match_rebuild(small_db, recalc_queue):
+    rebuild_cumulative_results(small_db)
+    enrollment = small_db.query(Enrollment).filter(Enrollment.student_id == 4).order_by(Enrollment.id).first()
+    semester_id = SMALL_SEMESTERS.index(enrollment.class_.semester) + 1
+    scores = {grade.grade_type: (grade.score, grade.weight) for grade in enrollment.grades}
+
+    def commit_and_recalculate():
+        # Như các đường ghi điểm: commit rồi để recalc_queue tính lại tổng tích lũy theo lô
+        small_db.commit()
+        recalc_queue.enqueue(4, semester_id, enrollment.class_id)
+        recalc_queue.flush()
+        assert_matches_rebuild(small_db)
+
+    # Xóa: môn không còn điểm tổng kết
+    for grade in list(enrollment.grades):
+        small_db.delete(grade)
+    refresh_enrollment_grade(enrollment, small_db)
+    commit_and_recalculate()
+    assert enrollment.grade_4 is None
+
+    # Tạo: nhập lại điểm
+    for grade_type, (score, weight) in scores.items():
+        small_db.add(Grade(enrollment_id=enrollment.id, grade_type=grade_type, score=score, weight=weight))
+    refresh_enrollment_grade(enrollment, small_db)
+    commit_and_recalculate()
+    assert enrollment.grade_4 is not None
+
+    # Sửa: đổi điểm qua lại giữa trượt và qua môn
+    final = next(grade for grade in enrollment.grades if grade.grade_type == "final")
+    for score in (0.0, 10.0, 6.5):
+        final.score = score
+        refresh_enrollment_grade(enrollment, small_db)
+        commit_and_recalculate()
+
+def snapshots(db):
+    return {
+        (student_id, semester_id): (cpa, cumulative_credits)
+        for student_id, semester_id, cpa, cumulative_credits in db.query(
+            AcademicResult.student_id, AcademicResult.semester_id, AcademicResult.cpa, AcademicResult.cumulative_credits
+        ).all()
+    }
+
+def test_refresh_cpa_snapshots(small_db):
+    for semester_id in (1, 2):
+        calculate_all_students_in_semester(semester_id, small_db)
+    computed = snapshots(small_db)
+    expected = expected_gpa_cpa(small_db)
+    assert {key: cpa for key, (cpa, _) in computed.items()} == {key: cpa for key, (_, cpa) in expected.items()}
+
+    small_db.query(AcademicResult).update({AcademicResult.cpa: 0.0, AcademicResult.cumulative_credits: 0})
+    small_db.commit()
+    assert refresh_cpa_snapshots(small_db, student_ids=[3]) == 1
+    assert {key: value for key, value in snapshots(small_db).items() if value != (0.0, 0)} == {
+        key: value for key, value in computed.items() if key[0] == 3
+    }
+
+    assert refresh_cpa_snapshots(small_db) == len(SMALL_STUDENT_IDS)
+    assert snapshots(small_db) == computed
+
+def test_cpa_snapshots_follow_semester_start_date(small_db):
+    for semester_id in (1, 2):
+        calculate_all_students_in_semester(semester_id, small_db)
+    expected = expected_gpa_cpa(small_db)
+
+    # Học kỳ không có môn nào (bắt đầu sau cùng) giữ nguyên CPA tích lũy
+    small_db.add(Semester(
+        id=3, code="20233", name="20233", academic_year_id=1, semester_number=3,
+        start_date=datetime.date(2024, 7, 1), end_date=datetime.date(2024, 8, 15)
+    ))
+    small_db.add(AcademicResult(student_id=2, semester_id=3))
+    # Thứ tự theo ngày bắt đầu, không theo id hay mã học kỳ: 20232 (id 2) thành học kỳ đầu
+    small_db.get(Semester, 2).start_date = datetime.date(2023, 8, 1)
+    small_db.commit()
+    refresh_cpa_snapshots(small_db)
+
+    gpa = {key: gpa for key, (gpa, _) in expected.items()}
+    result = snapshots(small_db)
+    for student_id in SMALL_STUDENT_IDS:
+        assert result[student_id, 2][0] == gpa[student_id, 2]
+        assert result[student_id, 1][0] == expected[student_id, 2][1]
+    assert result[2, 3] == result[2, 1]
+
+    # Cùng ngày bắt đầu: học kỳ id nhỏ hơn đứng trước
+    small_db.get(Semester, 2).start_date = small_db.get(Semester, 1).start_date
+    small_db.commit()
+    refresh_cpa_snapshots(small_db)
+    result = snapshots(small_db)
+    for student_id in SMALL_STUDENT_IDS:
+        assert result[student_id, 1][0] == gpa[student_id, 1]
+        assert result[student_id, 2][0] == expected[student_id, 2][1]
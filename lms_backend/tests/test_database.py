@@ -0,0 +1,98 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.core.config import settings
+from app.database import engine_options
+from app.utils import replica
+from app.utils.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, PoolStats, pool_metrics
+from app.utils.replica import ReplicaHealth
+
+def test_replica_health_uses_sqlite_replica(tmp_path):
+    health = ReplicaHealth(create_engine(f"sqlite:///{tmp_path / 'replica.db'}"), max_lag=5.0, check_interval=60.0)
+    assert health.cached() is None
+    assert health.available() is True
+    assert health.cached() is True
+
+    health.mark_failed()
+    assert health.available() is False
+
+def test_replica_health_falls_back_without_replica(tmp_path):
+    assert ReplicaHealth(None, max_lag=5.0, check_interval=60.0).available() is False
+    missing = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    assert ReplicaHealth(missing, max_lag=5.0, check_interval=60.0).available() is False
+
+def test_replica_health_rechecks_after_interval(tmp_path, monkeypatch):
+    health = ReplicaHealth(create_engine(f"sqlite:///{tmp_path / 'replica.db'}"), max_lag=5.0, check_interval=0.05)
+    lag = [10.0]
+    monkeypatch.setattr(replica, "replica_lag_seconds", lambda conn: lag[0])
+    assert health.available() is False
+
+    # Hết check_interval thì kiểm tra lại; replica đã theo kịp
+    lag[0] = 1.0
+    assert health.cached() is False
+    time.sleep(0.06)
+    assert health.cached() is None
+    assert health.available() is True
+
+    health.mark_failed()
+    assert health.cached() is False and health.available() is False
+
+def test_engine_options_size_pools_per_engine(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+    monkeypatch.setattr(settings, "DB_ASYNC_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "DB_ASYNC_MAX_OVERFLOW", 1)
+    assert engine_options("sqlite:///x.db") == {}
+
+    sync = engine_options("postgresql://u@h/db")
+    assert (sync["poolclass"], sync["pool_size"], sync["max_overflow"]) == (InstrumentedQueuePool, 7, 3)
+    async_options = engine_options("postgresql+asyncpg://u@h/db", poolclass=InstrumentedAsyncQueuePool, is_async=True)
+    assert (async_options["poolclass"], async_options["pool_size"], async_options["max_overflow"]) == (
+        InstrumentedAsyncQueuePool, 2, 1
+    )
+
+class CountingPool(InstrumentedQueuePool):
+    stats = PoolStats()
+
+class CountingAsyncPool(InstrumentedAsyncQueuePool):
+    stats = PoolStats()
+
+def test_instrumented_pool_records_checkouts_and_timeouts(tmp_path):
+    CountingPool.stats.reset()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=CountingPool, pool_size=1, max_overflow=0, pool_timeout=0.1
+    )
+    try:
+        held = engine.connect()
+        metrics = pool_metrics(engine)
+        assert (metrics["pool_class"], metrics["size"], metrics["checked_out"], metrics["overflow"]) == (
+            "CountingPool", 1, 1, 0
+        )
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        held.close()
+        with engine.connect():
+            pass
+
+        stats = pool_metrics(engine)
+        assert (stats["checkouts"], stats["timeouts"], stats["checked_out"]) == (2, 1, 0)
+        assert stats["max_wait_ms"] >= 100 and stats["avg_wait_ms"] == pytest.approx(stats["total_wait_ms"] / 3, abs=0.001)
+    finally:
+        engine.dispose()
+
+def test_instrumented_async_pool(tmp_path):
+    CountingAsyncPool.stats.reset()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", poolclass=CountingAsyncPool, pool_size=2)
+
+    async def use_pool():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        await engine.dispose()
+
+    asyncio.run(use_pool())
+    assert CountingAsyncPool.stats.snapshot()["checkouts"] == 2
@@ -0,0 +1,205 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.database import get_db
+from app.models import User
+from app.models.academic import Class, Enrollment, Grade
+from app.models.user import Student
+from app.schemas.academic import ProgramCreate
+from app.services import dean_service, degree_audit_service, lecturer_service
+from app.utils.academic_calculator import calculate_all_students_in_semester
+from app.utils.prerequisite_graph import prerequisite_graph
+from app.utils.transcript_cache import transcript_cache
+
+# Sinh viên 7 chưa được gán chương trình. Mọi sinh viên đã qua đủ 4 môn; CPA sau 2 học kỳ:
+# 2: 1.77, 3: 2.65, 4: 1.96, 5: 2.94, 6: 1.65 -> chỉ 3 và 5 đạt CPA tối thiểu 2.0
+PROGRAM_STUDENT_IDS = range(2, 7)
+PROGRAM = {
+    "code": "CNTT", "name": "Công nghệ thông tin", "department_id": 1, "min_total_credits": 12, "min_cpa": 2.0,
+    "requirements": [
+        {"name": "Cơ sở", "requirement_type": "REQUIRED_COURSES", "course_ids": [1, 2]},
+        {"name": "Tự chọn", "requirement_type": "ELECTIVE_CREDITS", "min_credits": 4, "course_ids": [3, 4]},
+    ]
+}
+
+@pytest.fixture
+def db(small_db, monkeypatch):
+    """small_db có CPA của 2 học kỳ và chương trình PROGRAM gán cho PROGRAM_STUDENT_IDS"""
+    for service in (lecturer_service, dean_service):
+        monkeypatch.setattr(service.recalc_queue, "enqueue", lambda student_id, semester_id, class_id=None: None)
+    for semester_id in (1, 2):
+        calculate_all_students_in_semester(semester_id, small_db)
+    program = degree_audit_service.create_program(ProgramCreate(**PROGRAM), small_db)
+    small_db.query(Student).filter(Student.user_id.in_(PROGRAM_STUDENT_IDS)).update(
+        {Student.program_id: program.id}, synchronize_session=False
+    )
+    small_db.commit()
+    small_db.program_id = program.id
+    transcript_cache.clear()
+    prerequisite_graph.invalidate()
+    yield small_db
+    transcript_cache.clear()
+
+@pytest.fixture
+def client(db):
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        test_client = TestClient(app)
+        test_client.login = lambda user_id: app.dependency_overrides.__setitem__(
+            get_current_active_user, lambda: db.get(User, user_id)
+        )
+        yield test_client
+    finally:
+        app.dependency_overrides.clear()
+
+def grades_of(db, student_id, course_id):
+    return db.query(Grade).join(Enrollment).join(Class).filter(
+        Enrollment.student_id == student_id, Class.course_id == course_id
+    ).all()
+
+def mark_failed_without_invalidating(db, student_id, course_id):
+    """Sửa thẳng DB, bỏ qua các đường ghi có invalidate cache"""
+    class_ids = [class_id for (class_id,) in db.query(Class.id).filter(Class.course_id == course_id).all()]
+    db.query(Enrollment).filter(
+        Enrollment.student_id == student_id, Enrollment.class_id.in_(class_ids)
+    ).update({Enrollment.is_passed: False}, synchronize_session=False)
+    db.commit()
+
+def test_student_audit(db):
+    audit = degree_audit_service.get_student_audit(3, db)
+    assert audit["eligible"] and (audit["completed_credits"], audit["cpa"]) == (12, 2.65)
+    assert [(item["name"], item["satisfied"], item["completed_credits"], item["required_credits"])
+            for item in audit["requirements"]] == [("Cơ sở", True, 5, 5), ("Tự chọn", True, 7, 4)]
+
+    low_cpa = degree_audit_service.get_student_audit(2, db)
+    assert not low_cpa["eligible"] and all(item["satisfied"] for item in low_cpa["requirements"])
+    assert degree_audit_service.get_student_audit(7, db) is None
+
+def test_grade_writes_invalidate_cached_audit(db):
+    assert degree_audit_service.get_student_audit(3, db)["eligible"]
+
+    # Cache theo sinh viên: sửa DB không qua đường ghi điểm thì vẫn đọc kết quả cũ
+    mark_failed_without_invalidating(db, 3, 2)
+    assert degree_audit_service.get_student_audit(3, db)["requirements"][0]["satisfied"]
+    assert not degree_audit_service.get_student_audit(5, db)["requirements"][0]["remaining_courses"]
+
+    # Sinh viên 3 trượt C1 ở 20232; sửa điểm 20231 về 0 thì không còn qua C1
+    for grade in grades_of(db, 3, 1):
+        if grade.enrollment.is_passed:
+            dean_service.update_grade(grade.id, 0.0, db)
+    audit = degree_audit_service.get_student_audit(3, db)
+    assert not audit["eligible"] and audit["requirements"][0]["remaining_courses"] == ["C1", "C2"]
+
+    # Giảng viên nhập lại điểm lớp 20232 của C1: qua lại C1, C2 vẫn là dữ liệu đã sửa thẳng
+    lecturer_service.add_or_update_grade(5, 3, {"midterm": 10.0, "final": 10.0}, db)
+    assert degree_audit_service.get_student_audit(3, db)["requirements"][0]["remaining_courses"] == ["C2"]
+
+    # Chỉ sinh viên có điểm thay đổi bị invalidate
+    assert not degree_audit_service.get_student_audit(5, db)["requirements"][0]["remaining_courses"]
+
+def test_enrollment_and_program_changes_invalidate_cached_audit(db, client):
+    client.login(1)
+    assert degree_audit_service.get_student_audit(3, db)["eligible"]
+    mark_failed_without_invalidating(db, 3, 1)
+    assert degree_audit_service.get_student_audit(3, db)["eligible"]
+
+    db.add(Class(id=9, code="L9", course_id=2, lecturer_id=100, semester="20232", max_students=50))
+    db.commit()
+    response = client.post("/deans/classes/9/enrollments/bulk", json={"student_ids": [3]})
+    assert response.status_code == 200, response.text
+    assert degree_audit_service.get_student_audit(3, db)["requirements"][0]["remaining_courses"] == ["C1"]
+
+    # Đổi điều kiện chương trình: kết quả cache của mọi sinh viên bị xóa
+    assert not degree_audit_service.get_student_audit(2, db)["eligible"]
+    response = client.put(f"/deans/programs/{db.program_id}", json={**PROGRAM, "min_cpa": 1.5})
+    assert response.status_code == 200, response.text
+    assert degree_audit_service.get_student_audit(2, db)["eligible"]
+
+def test_audit_cohort(db):
+    expected = degree_audit_service.audit_students(db, list(PROGRAM_STUDENT_IDS))
+
+    k66 = degree_audit_service.audit_cohort(db, cohort="K66", chunk_size=1)
+    assert (k66["evaluated"], k66["eligible"], k66["unmet_requirements"]) == (3, 1, {})
+    assert [student["student_id"] for student in k66["students"]] == [2, 3, 4]
+    for student in k66["students"]:
+        assert student["student_code"] == f"SV{student['student_id']}"
+        assert {key: student[key] for key in expected[student["student_id"]]} == expected[student["student_id"]]
+
+    by_program = degree_audit_service.audit_cohort(db, program_id=db.program_id, eligible_only=True, chunk_size=2)
+    assert (by_program["evaluated"], by_program["eligible"]) == (5, 2)
+    assert [student["student_id"] for student in by_program["students"]] == [3, 5]
+
+    # Sinh viên 7 (K67) chưa có chương trình nên không được xét
+    k67 = degree_audit_service.audit_cohort(db, cohort="K67", department_id=2)
+    assert [student["student_id"] for student in k67["students"]] == [5]
+
+    mark_failed_without_invalidating(db, 4, 3)
+    mark_failed_without_invalidating(db, 4, 4)
+    assert degree_audit_service.audit_cohort(db, cohort="K66")["unmet_requirements"] == {"Tự chọn": 1}
+
+    with pytest.raises(ValueError, match="cohort or program_id"):
+        degree_audit_service.audit_cohort(db)
+
+def test_student_degree_audit_endpoint(db, client):
+    client.login(3)
+    response = client.get("/students/degree-audit")
+    assert response.status_code == 200
+    assert response.json() == degree_audit_service.get_student_audit(3, db)
+
+    client.login(7)
+    assert client.get("/students/degree-audit").status_code == 404
+    client.login(1)
+    assert client.get("/students/degree-audit").status_code == 403
+
+def test_dean_program_endpoints(db, client):
+    client.login(3)
+    assert client.get("/deans/programs").status_code == 403
+
+    client.login(1)
+    programs = client.get("/deans/programs")
+    assert programs.status_code == 200
+    assert [(program["code"], [r["course_ids"] for r in program["requirements"]]) for program in programs.json()] == [
+        ("CNTT", [[1, 2], [3, 4]])
+    ]
+    assert client.get("/deans/programs?department_id=2").json() == []
+
+    created = client.post("/deans/programs", json={
+        "code": "KTPM", "name": "Kỹ thuật phần mềm", "min_total_credits": 6, "min_cpa": 0,
+        "requirements": [{"name": "Cơ sở", "course_ids": [1, 3]}]
+    })
+    assert created.status_code == 200, created.text
+    program_id = created.json()["id"]
+    assert client.get(f"/deans/programs/{program_id}").json()["requirements"][0]["course_ids"] == [1, 3]
+
+    for invalid in (
+        {**PROGRAM},
+        {**PROGRAM, "code": "X", "min_cpa": 5},
+        {**PROGRAM, "code": "X", "requirements": [{"name": "A", "requirement_type": "OTHER", "course_ids": [1]}]},
+        {**PROGRAM, "code": "X", "requirements": [{"name": "A", "course_ids": [99]}]},
+        {**PROGRAM, "code": "X", "requirements": [
+            {"name": "A", "requirement_type": "ELECTIVE_CREDITS", "course_ids": [1]}
+        ]},
+    ):
+        assert client.post("/deans/programs", json=invalid).status_code == 400
+    assert client.put(f"/deans/programs/{program_id}", json=PROGRAM).status_code == 400
+    assert client.put("/deans/programs/999", json={**PROGRAM, "code": "X"}).status_code == 404
+    assert client.get("/deans/programs/999").status_code == 404
+
+def test_dean_audit_endpoints(db, client):
+    client.login(1)
+    response = client.get("/deans/students/3/degree-audit")
+    assert response.status_code == 200
+    assert response.json() == degree_audit_service.get_student_audit(3, db)
+    assert client.get("/deans/students/7/degree-audit").status_code == 404
+    assert client.get("/deans/students/999/degree-audit").status_code == 404
+
+    cohort = client.get("/deans/degree-audit", params={"cohort": "K67", "eligible_only": True})
+    assert cohort.status_code == 200
+    assert cohort.json() == degree_audit_service.audit_cohort(db, cohort="K67", eligible_only=True)
+    assert [student["student_id"] for student in cohort.json()["students"]] == [5]
+    assert client.get("/deans/degree-audit").status_code == 400
+
+    client.login(3)
+    assert client.get("/deans/degree-audit?cohort=K66").status_code == 403
+    assert client.get("/deans/students/3/degree-audit").status_code == 403
@@ -0,0 +1,43 @@
+import csv
+import io
+import json
+import pytest
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.database import get_read_engine
+from app.models import User
+from app.services import export_service
+from conftest import DEAN_ID, N_STUDENTS, CLASSES_PER_STUDENT
+
+@pytest.fixture
+def dean_client(seeded_engine, session, client):
+    dean = session.get(User, DEAN_ID)
+    app.dependency_overrides[get_current_active_user] = lambda: dean
+    app.dependency_overrides[get_read_engine] = lambda: seeded_engine
+    return client
+
+def test_students_ndjson(dean_client):
+    response = dean_client.get("/deans/exports/students?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == N_STUDENTS
+    assert rows[0]["student_code"] == "SV00002" and rows[0]["department"]
+
+def test_grades_csv_streams_in_chunks(dean_client, seeded_engine):
+    response = dean_client.get("/deans/exports/grades?semester=20232")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="grades.csv"'
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[:3] == ["enrollment_id", "student_code", "full_name"]
+    assert rows and {row[header.index("semester")] for row in rows} == {"20232"}
+
+    stmt, _ = export_service.prepare_export("grades", "csv")
+    chunks = list(export_service.stream_export(seeded_engine, stmt, "csv", chunk_size=500))
+    total_grades = N_STUDENTS * CLASSES_PER_STUDENT * 2
+    assert len(chunks) == total_grades // 500
+    assert sum(chunk.count("\n") for chunk in chunks) == total_grades + 1
+
+def test_export_validation(dean_client):
+    assert dean_client.get("/deans/exports/payroll").status_code == 404
+    assert dean_client.get("/deans/exports/students?format=xlsx").status_code == 400
@@ -0,0 +1,30 @@
+from app.models.grading_policy import GradingPolicy, GradingPolicyComponent
+from app.utils.grading_policy import DEFAULT_POLICY, GradingPolicyRegistry
+
+def add_policy(db, weights):
+    policy = GradingPolicy(course_id=1, version=1, components=[
+        GradingPolicyComponent(grade_type=grade_type, weight=weight) for grade_type, weight in weights.items()
+    ])
+    db.add(policy)
+    db.commit()
+    return policy
+
+def test_registry_recompiles_recreated_policy(small_db):
+    # Registry của một process khác: không được invalidate, chỉ đọc lại theo chu kỳ
+    registry = GradingPolicyRegistry(refresh_interval=0)
+    first = add_policy(small_db, {"midterm": 0.5, "final": 0.5})
+    assert registry.get(small_db, 1).weights == {"midterm": 0.5, "final": 0.5}
+
+    # Xóa rồi tạo lại giữa hai lần refresh: version lại là 1 nhưng id khác
+    small_db.delete(first)
+    small_db.commit()
+    second = add_policy(small_db, {"midterm": 0.2, "final": 0.8})
+    assert second.id != first.id
+
+    compiled = registry.get(small_db, 1)
+    assert compiled.weights == {"midterm": 0.2, "final": 0.8}
+    assert (compiled.policy_id, compiled.version) == (second.id, 1)
+
+    small_db.delete(second)
+    small_db.commit()
+    assert registry.get(small_db, 1) is DEFAULT_POLICY
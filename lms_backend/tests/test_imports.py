@@ -0,0 +1,112 @@
+import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.auth.security import verify_password
+from app.database import Base, get_db
+from app.models import User, Student, Lecturer, Department, AcademicYear, AcademicResult, Semester
+from app.models.enums import UserRole
+from app.services import import_service
+
+CSV_FILE = (
+    "username,email,password,full_name,student_code,department_id,cohort\n"
+    "an,an@x,secret1,Nguyễn An,,1,K68\n"
+    "binh,binh@x,secret2,Trần Bình,SV900,1,K68\n"
+    "taken,new@x,secret3,,,1,\n"
+    "an,an2@x,secret4,,,1,\n"
+    "chi,chi@x,,,,abc,\n"
+    "dung,dung@x,secret6,,SV900,9,\n"
+    "em,em@x," + "x" * 80 + ",,,,\n"
+)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Department), [{"id": 1, "name": "Khoa 1"}])
+        conn.execute(insert(AcademicYear), [{
+            "id": 1, "year": "2024-2025", "start_date": datetime.date(2024, 9, 1), "end_date": datetime.date(2025, 6, 1)
+        }])
+        conn.execute(insert(Semester), [{
+            "id": 1, "code": "20241", "name": "20241", "academic_year_id": 1, "semester_number": 1,
+            "start_date": datetime.date(2024, 9, 1), "end_date": datetime.date(2025, 1, 15), "is_active": True
+        }])
+        conn.execute(insert(User), [
+            {"id": 1, "username": "dean", "email": "dean@x", "hashed_password": "x", "role": UserRole.DEAN},
+            {"id": 2, "username": "taken", "email": "taken@x", "hashed_password": "x", "role": UserRole.STUDENT},
+        ])
+        conn.execute(insert(Student), [{"user_id": 2, "student_code": "SV001"}])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+def test_validate_reports_every_bad_row(db):
+    rows = import_service.parse_import_file(CSV_FILE.encode(), "students.csv")
+    valid, errors = import_service.validate_import(db, UserRole.STUDENT, rows)
+
+    assert [row.username for _, row in valid] == ["an", "binh"]
+    assert valid[0][1].student_code is None and valid[0][1].department_id == 1
+    report = {error["row"]: error["errors"] for error in errors}
+    assert report[3] == ["username: already exists"]
+    assert report[4] == ["username: duplicate of row 1"]
+    assert {message.split(":")[0] for message in report[5]} == {"password", "department_id"}
+    assert sorted(report[6]) == ["department_id: not found", "student_code: duplicate of row 2"]
+    assert report[7][0].startswith("password:")
+
+def test_import_students_in_batches(db):
+    rows = import_service.parse_import_file(CSV_FILE.encode(), "students.csv")
+    valid, _ = import_service.validate_import(db, UserRole.STUDENT, rows)
+    result = import_service.import_users(db, UserRole.STUDENT, valid, batch_size=1, workers=1)
+
+    assert result == {"created": 2, "failed": 0, "errors": []}
+    an = db.query(User).filter(User.username == "an").one()
+    assert an.role == UserRole.STUDENT and verify_password("secret1", an.hashed_password)
+    assert an.student.student_code == f"STU{an.id}" and an.student.cohort == "K68"
+    assert db.query(Student).filter(Student.student_code == "SV900").count() == 1
+    assert db.query(AcademicResult).filter(AcademicResult.semester_id == 1).count() == 2
+
+def test_failed_batch_is_retried_per_row(db):
+    rows = [
+        {"username": "gv1", "email": "gv1@x", "password": "p1", "department_id": 1},
+        {"username": "gv2", "email": "taken@x", "password": "p2"},
+        {"username": "gv3", "email": "gv3@x", "password": "p3"},
+    ]
+    # Bỏ qua bước kiểm tra để mô phỏng email bị chiếm sau khi kiểm tra (import song song)
+    valid = [(number, import_service.UserImportRow(**row)) for number, row in enumerate(rows, start=1)]
+    result = import_service.import_users(db, UserRole.LECTURER, valid, workers=1)
+
+    assert result["created"] == 2 and result["failed"] == 1
+    assert result["errors"][0]["row"] == 2 and result["errors"][0]["username"] == "gv2"
+    assert db.query(Lecturer).join(User).filter(User.username.in_(["gv1", "gv3"])).count() == 2
+    assert db.query(User).filter(User.username == "gv2").count() == 0
+
+def test_hash_passwords_across_processes():
+    hashes = list(import_service.hash_passwords(["a", "b", "c"], workers=2))
+    assert [verify_password(password, hashed) for password, hashed in zip("abc", hashes)] == [True] * 3
+
+def test_import_endpoint_dry_run(db):
+    dean = db.get(User, 1)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: dean
+    try:
+        client = TestClient(app)
+        response = client.post(
+            "/deans/imports/students?dry_run=true", files={"file": ("students.csv", CSV_FILE.encode(), "text/csv")}
+        )
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["total"], body["valid"], body["invalid"], body["job"]) == (7, 2, 5, None)
+        assert db.query(User).count() == 2
+
+        bad = client.post("/deans/imports/lecturers", files={"file": ("x.json", b"{}", "application/json")})
+        assert bad.status_code == 400
+        missing = client.post("/deans/imports/courses", files={"file": ("x.csv", CSV_FILE.encode(), "text/csv")})
+        assert missing.status_code == 404
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,53 @@
+import pytest
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.models import User
+from app.utils.pagination import count_cache, decode_cursor, encode_cursor
+from conftest import DEAN_ID, N_REPORTS, N_STUDENTS
+
+@pytest.fixture
+def dean_client(session, client):
+    dean = session.get(User, DEAN_ID)
+    app.dependency_overrides[get_current_active_user] = lambda: dean
+    count_cache.clear()
+    return client
+
+def walk(client, path):
+    pages, cursor = [], None
+    while True:
+        url = path + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200, response.text
+        pages.append(response)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return pages
+
+def test_cursor_roundtrip_and_validation():
+    assert decode_cursor(encode_cursor([42, "20231"]), 2) == (42, "20231")
+    for bad in ("not-a-cursor", encode_cursor([1]), encode_cursor([None, 1])):
+        with pytest.raises(ValueError):
+            decode_cursor(bad, 2)
+
+def test_students_keyset_pages_cover_all_rows(dean_client, seeded_engine, capture_statements):
+    pages = walk(dean_client, "/deans/students?limit=300&include_total=true")
+    ids = [row["id"] for page in pages for row in page.json()]
+    assert ids == sorted(set(ids)) and len(ids) == N_STUDENTS
+    assert pages[0].headers["x-total-count"] == str(N_STUDENTS)
+
+    # Trang sâu: một câu SQL tìm theo khóa (users.id > cursor) thay cho OFFSET
+    last = pages[-2].headers["x-next-cursor"]
+    statements = capture_statements(
+        seeded_engine, lambda: dean_client.get(f"/deans/students?limit=300&cursor={last}")
+    )
+    [(statement, parameters)] = statements
+    assert "users.id > ?" in statement and 0 in parameters
+
+def test_reports_newest_first_with_status_filter(dean_client):
+    ids = [row["id"] for page in walk(dean_client, "/reports/all?status=resolved&limit=40") for row in page.json()]
+    assert ids == sorted(ids, reverse=True) and len(ids) == N_REPORTS // 2
+
+def test_skip_still_supported_and_bad_cursor_rejected(dean_client):
+    first = dean_client.get("/deans/tuitions?limit=5").json()
+    assert dean_client.get("/deans/tuitions?skip=5&limit=5").json()[0]["id"] == first[-1]["id"] + 1
+    assert dean_client.get("/deans/tuitions?cursor=garbage").status_code == 400
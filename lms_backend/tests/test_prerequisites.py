@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.database import get_db
+from app.models import User
+from app.models.academic import Class, Course, Enrollment
+from app.models.course_prerequisite import CoursePrerequisite
+from app.services import dean_service
+from app.utils.prerequisite_graph import prerequisite_graph
+
+NEW_CLASS_ID = 9
+
+@pytest.fixture
+def db(small_db, monkeypatch):
+    """
+    small_db thêm môn C5 (lớp 9, học kỳ 20232) với chuỗi tiên quyết C5 <- C4 <- C3
+
+    Mọi sinh viên đã qua cả 4 môn, trừ sinh viên 3 trượt C3 ở cả 2 học kỳ.
+    Đồ thị không tự làm mới trong test, chỉ rebuild khi bị invalidate.
+    """
+    small_db.add(Course(id=5, code="C5", name="Course 5", credits=3))
+    small_db.add(Class(id=NEW_CLASS_ID, code="L9", course_id=5, lecturer_id=100, semester="20232", max_students=50))
+    small_db.add_all([
+        CoursePrerequisite(course_id=5, prerequisite_id=4), CoursePrerequisite(course_id=4, prerequisite_id=3)
+    ])
+    small_db.query(Enrollment).filter(
+        Enrollment.student_id == 3, Enrollment.class_id.in_([3, 7])
+    ).update({Enrollment.is_passed: False}, synchronize_session=False)
+    small_db.commit()
+    monkeypatch.setattr(prerequisite_graph, "refresh_interval", 3600)
+    prerequisite_graph.invalidate()
+    yield small_db
+    prerequisite_graph.invalidate()
+
+@pytest.fixture
+def client(db):
+    dean = db.get(User, 1)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: dean
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+def enrolled(db, class_id=NEW_CLASS_ID):
+    return sorted(sid for (sid,) in db.query(Enrollment.student_id).filter(Enrollment.class_id == class_id).all())
+
+def bulk_enroll(client, student_ids):
+    return client.post(f"/deans/classes/{NEW_CLASS_ID}/enrollments/bulk", json={"student_ids": student_ids})
+
+def test_bulk_enroll_checks_transitive_prerequisites(db, client):
+    assert prerequisite_graph.prerequisites(db, 5) == {3, 4}
+
+    # Sinh viên 3 đã qua C4 nhưng thiếu C3 (tiên quyết gián tiếp): cả lô bị từ chối
+    rejected = bulk_enroll(client, [3, 4, 5])
+    assert rejected.status_code == 400
+    assert "Missing prerequisites for 1 students (student ID 3: C3)" in rejected.json()["detail"]
+    assert enrolled(db) == []
+
+    accepted = bulk_enroll(client, [4, 5])
+    assert accepted.status_code == 200, accepted.text
+    assert enrolled(db) == [4, 5]
+
+def test_graph_rebuilds_after_set_course_prerequisites(db, client):
+    assert prerequisite_graph.prerequisites(db, 5) == {3, 4}
+
+    # Sửa thẳng bảng không qua service: đồ thị trong bộ nhớ chưa đổi cho tới lần làm mới
+    db.query(CoursePrerequisite).filter(CoursePrerequisite.course_id == 4).delete(synchronize_session=False)
+    db.commit()
+    assert prerequisite_graph.prerequisites(db, 5) == {3, 4}
+
+    prerequisites = dean_service.set_course_prerequisites(4, [1, 2, 1], db)
+    assert [course.code for course in prerequisites] == ["C1", "C2"]
+    assert prerequisite_graph.prerequisites(db, 5) == {1, 2, 4}
+    assert bulk_enroll(client, [3]).status_code == 200
+    assert enrolled(db) == [3]
+
+    response = client.put("/deans/courses/5/prerequisites", json={"prerequisite_ids": []})
+    assert response.status_code == 200 and response.json() == []
+    assert prerequisite_graph.prerequisites(db, 5) == frozenset()
+    assert prerequisite_graph.prerequisites(db, 4) == {1, 2}
+    assert [course["code"] for course in client.get("/deans/courses/4/prerequisites").json()] == ["C1", "C2"]
+
+def test_set_course_prerequisites_rejects_cycles(db, client):
+    before = sorted(db.query(CoursePrerequisite.course_id, CoursePrerequisite.prerequisite_id).all())
+
+    with pytest.raises(ValueError, match="cycle"):
+        dean_service.set_course_prerequisites(3, [5], db)
+    with pytest.raises(ValueError, match="own prerequisite"):
+        dean_service.set_course_prerequisites(3, [3], db)
+    with pytest.raises(ValueError, match="not found"):
+        dean_service.set_course_prerequisites(3, [1, 99], db)
+    assert dean_service.set_course_prerequisites(99, [1], db) is None
+
+    response = client.put("/deans/courses/4/prerequisites", json={"prerequisite_ids": [5]})
+    assert response.status_code == 400 and "cycle" in response.json()["detail"]
+    assert client.put("/deans/courses/99/prerequisites", json={"prerequisite_ids": []}).status_code == 404
+    assert client.get("/deans/courses/99/prerequisites").status_code == 404
+
+    assert sorted(db.query(CoursePrerequisite.course_id, CoursePrerequisite.prerequisite_id).all()) == before
+    assert prerequisite_graph.prerequisites(db, 5) == {3, 4}
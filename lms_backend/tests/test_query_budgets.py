@@ -0,0 +1,62 @@
+import pytest
+from app.main import app
+from app.auth.dependencies import get_current_active_user
+from app.models import User
+from app.services import student_service
+from conftest import DEAN_ID, LECTURER_IDS
+
+STUDENT_ID = 42
+LECTURER_ID = LECTURER_IDS[17]
+
+# endpoint -> (người gọi, số câu SQL tối đa, số dòng tối thiểu trong kết quả)
+# Số dòng tối thiểu đảm bảo một lần nạp lười theo từng dòng sẽ vượt ngân sách
+BUDGETS = {
+    "/deans/students?limit=100": (DEAN_ID, 1, 100),
+    "/deans/lecturers?limit=100": (DEAN_ID, 1, 50),
+    "/deans/classes?limit=100": (DEAN_ID, 2, 100),
+    "/deans/classes/17": (DEAN_ID, 2, None),
+    "/deans/classes/17/students": (DEAN_ID, 1, 40),
+    "/deans/classes/17/grades": (DEAN_ID, 3, 40),
+    "/deans/academic-results?semester_id=2&limit=100": (DEAN_ID, 1, 100),
+    "/deans/students/42/academic-results": (DEAN_ID, 3, None),
+    "/deans/students/42/results": (DEAN_ID, 2, 4),
+    "/reports/all?limit=100": (DEAN_ID, 1, 100),
+    "/students/my-classes": (STUDENT_ID, 2, 8),
+    "/students/my-projects": (STUDENT_ID, 2, None),
+    "/students/academic-summary": (STUDENT_ID, 3, None),
+    "/students/search?q=L1": (STUDENT_ID, 4, 10),
+    "/lecturers/my-classes": (LECTURER_ID, 3, 4),
+    "/lecturers/classes/17/students": (LECTURER_ID, 3, 40),
+    "/lecturers/classes/17/grades": (LECTURER_ID, 2, 40),
+}
+
+def result_size(body):
+    if isinstance(body, list):
+        return len(body)
+    if "classes" in body:
+        return sum(len(rows) for rows in body.values())
+    return None
+
+@pytest.mark.parametrize("path", sorted(BUDGETS))
+def test_endpoint_query_budget(seeded_engine, session, client, capture_statements, path):
+    user_id, budget, min_rows = BUDGETS[path]
+    current_user = session.get(User, user_id)
+    app.dependency_overrides[get_current_active_user] = lambda: current_user
+
+    responses = []
+    statements = capture_statements(seeded_engine, lambda: responses.append(client.get(path)))
+    response = responses[0]
+
+    assert response.status_code == 200, response.text
+    if min_rows is not None:
+        assert result_size(response.json()) >= min_rows
+    assert len(statements) <= budget, [statement for statement, _ in statements]
+
+def test_student_timetable_query_budget(seeded_engine, session, capture_statements):
+    rows = []
+    statements = capture_statements(
+        seeded_engine, lambda: rows.extend(student_service.get_student_timetable(STUDENT_ID, session))
+    )
+    assert len(rows) >= 80
+    assert all(row["lecturer_name"] != "Unknown" for row in rows)
+    assert len(statements) == 1
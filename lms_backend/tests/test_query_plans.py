@@ -0,0 +1,104 @@
+import json
+import os
+import re
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import Enrollment, ChatGroup, ChatGroupMember, ChatMessage
+from app.services import student_service, lecturer_service
+from app.services.tuition_service import tuition_service
+from app.utils.academic_calculator import aggregate_credit_totals
+from conftest import seed_sample_data
+
+# CSDL Postgres trống dùng riêng cho test; chưa đặt thì chỉ kiểm tra bằng planner của SQLite
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+# Các bảng lớn: truy vấn theo sinh viên/lớp/nhóm không được quét toàn bảng
+INDEXED_TABLES = {
+    "enrollments", "grades", "timetables", "academic_results",
+    "chat_messages", "chat_group_members", "tuitions"
+}
+SCAN = re.compile(r"^SCAN (\w+)")
+
+@pytest.fixture(scope="module")
+def seeded(seeded_engine):
+    session = sessionmaker(bind=seeded_engine, autoflush=False)()
+    yield seeded_engine, session
+    session.close()
+
+@pytest.fixture(scope="module")
+def postgres_seeded():
+    """Tạo bảng và dữ liệu mẫu trên TEST_POSTGRES_URL, xóa bảng sau khi chạy xong"""
+    engine = create_engine(POSTGRES_URL)
+    Base.metadata.drop_all(engine)
+    seed_sample_data(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    yield engine, session
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+def full_scans(engine, statements):
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all():
+                match = SCAN.match(row[-1])
+                if match and re.sub(r"_\d+$", "", match.group(1)) in INDEXED_TABLES:
+                    scans.append((row[-1], statement))
+    return scans
+
+def seq_scans(engine, statements):
+    """Các nút Seq Scan trên bảng lớn trong EXPLAIN (FORMAT JSON) của Postgres"""
+    scans = []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]["Plan"]]
+            while nodes:
+                node = nodes.pop()
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in INDEXED_TABLES:
+                    scans.append((node["Relation Name"], statement))
+                nodes.extend(node.get("Plans", []))
+    return scans
+
+def chat_history(db, group_id, user_id):
+    db.query(ChatGroupMember.id).filter(
+        ChatGroupMember.group_id == group_id, ChatGroupMember.user_id == user_id
+    ).first()
+    db.query(ChatMessage).filter(ChatMessage.group_id == group_id).order_by(
+        ChatMessage.timestamp.desc()
+    ).limit(100).all()
+    db.query(ChatGroup).join(ChatGroupMember).filter(ChatGroupMember.user_id == user_id).all()
+
+KEY_QUERIES = {
+    "student grades": lambda db: student_service.get_student_grades(42, db),
+    "student timetable": lambda db: student_service.get_student_timetable(42, db),
+    "academic summary": lambda db: student_service.get_academic_summary(42, db),
+    "semester detail": lambda db: student_service.get_semester_detail(42, "20232", db),
+    "class grades": lambda db: lecturer_service.get_class_grades(17, db),
+    "student tuitions": lambda db: tuition_service.get_student_tuitions(db, 42),
+    "credit totals": lambda db: aggregate_credit_totals(db, Enrollment.student_id == 42),
+    "chat history": lambda db: chat_history(db, 17, 42),
+}
+
+@pytest.mark.parametrize("name", sorted(KEY_QUERIES))
+def test_key_queries_use_indexes(seeded, capture_statements, name):
+    engine, db = seeded
+    statements = capture_statements(engine, lambda: KEY_QUERIES[name](db))
+    db.rollback()
+    assert statements
+    assert full_scans(engine, statements) == []
+
+@pytest.mark.postgres
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+@pytest.mark.parametrize("name", sorted(KEY_QUERIES))
+def test_key_queries_use_indexes_postgres(postgres_seeded, capture_statements, name):
+    engine, db = postgres_seeded
+    statements = capture_statements(engine, lambda: KEY_QUERIES[name](db))
+    db.rollback()
+    assert statements
+    assert seq_scans(engine, statements) == []
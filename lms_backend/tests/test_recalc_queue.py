@@ -0,0 +1,124 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from sqlalchemy.orm import sessionmaker
+from app.services import recalc_queue as recalc_queue_module
+from app.services.recalc_queue import RecalculationQueue
+
+@pytest.fixture
+def calls(small_db, monkeypatch):
+    """Các lần gọi tính lại (semester_id, student_ids, thời điểm); fail_times[semester_id] = số lần đầu bị lỗi"""
+    recorded = SimpleNamespace(made=[], fail_times={}, called=threading.Event())
+
+    def calculate(semester_id, db, student_ids=None):
+        recorded.made.append((semester_id, sorted(student_ids), time.monotonic()))
+        recorded.called.set()
+        if recorded.fail_times.get(semester_id, 0) > 0:
+            recorded.fail_times[semester_id] -= 1
+            raise RuntimeError(f"semester {semester_id} failed")
+
+    monkeypatch.setattr(recalc_queue_module, "calculate_all_students_in_semester", calculate)
+    monkeypatch.setattr(recalc_queue_module, "SessionLocal", sessionmaker(bind=small_db.get_bind()))
+    return recorded
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_coalesces_keys_per_semester(calls):
+    queue = RecalculationQueue(max_delay=60, batch_size=100)
+    for student_id, semester_id in [(2, 1), (3, 1), (2, 1), (4, 2), (2, 1), (3, 2)]:
+        queue.enqueue(student_id, semester_id)
+    assert queue.pending_count() == 4
+
+    queue.flush()
+    assert sorted((semester_id, student_ids) for semester_id, student_ids, _ in calls.made) == [(1, [2, 3]), (2, [3, 4])]
+    assert queue.pending_count() == 0
+    queue.stop()
+
+def test_worker_waits_for_deadline_or_full_batch(calls):
+    queue = RecalculationQueue(max_delay=0.3, batch_size=3)
+    enqueued_at = time.monotonic()
+    queue.enqueue(2, 1)
+    queue.enqueue(3, 1)
+    time.sleep(0.1)
+    assert calls.made == []
+
+    assert calls.called.wait(5)
+    assert calls.made[0][:2] == (1, [2, 3]) and calls.made[0][2] - enqueued_at >= 0.3
+
+    # Đủ batch_size khóa thì xử lý ngay, không chờ hết max_delay
+    queue.max_delay = 60
+    enqueued_at = time.monotonic()
+    for student_id in (4, 5, 6):
+        queue.enqueue(student_id, 2)
+    wait_until(lambda: len(calls.made) == 2)
+    assert calls.made[1][:2] == (2, [4, 5, 6]) and calls.made[1][2] - enqueued_at < 5
+    queue.stop()
+
+def test_stop_processes_pending_keys(calls):
+    queue = RecalculationQueue(max_delay=60, batch_size=100)
+    queue.enqueue(2, 1)
+    worker = queue._worker
+    queue.stop()
+
+    assert not worker.is_alive()
+    assert [call[:2] for call in calls.made] == [(1, [2])]
+    assert queue.pending_count() == 0
+
+def test_failed_keys_are_retried_with_backoff(calls):
+    calls.fail_times[1] = 2
+    queue = RecalculationQueue(max_delay=0, batch_size=100, max_attempts=5, retry_delay=0.1)
+    queue.enqueue(2, 1)
+    wait_until(lambda: len(calls.made) == 3)
+
+    first, second, third = (call[2] for call in calls.made)
+    assert second - first >= 0.1 and third - second >= 0.2
+    assert queue.snapshot() == {"pending": 0, "retrying": 0, "failed": []}
+    queue.stop()
+
+def test_keys_out_of_attempts_are_recorded(calls):
+    calls.fail_times[1] = 10
+    queue = RecalculationQueue(max_delay=0, batch_size=100, max_attempts=2, retry_delay=0.05)
+    queue.enqueue(2, 1)
+    wait_until(lambda: queue.failed())
+
+    [record] = queue.failed()
+    assert (record["student_id"], record["semester_id"], record["attempts"]) == (2, 1, 2)
+    assert record["error"] == "semester 1 failed" and len(calls.made) == 2
+
+    # Còn lượt thử lại lúc dừng: không bị bỏ mất, ghi vào failed
+    queue.max_attempts = 5
+    queue.retry_delay = 60
+    queue.enqueue(3, 1)
+    wait_until(lambda: queue.snapshot()["retrying"] == 1)
+    queue.stop()
+    assert [(r["student_id"], r["attempts"]) for r in queue.failed()] == [(2, 2), (3, 1)]
+    assert queue.failed()[1]["error"].endswith("(retry pending at shutdown)")
+
+    # Tính lại thành công thì bỏ khỏi danh sách lỗi
+    calls.fail_times[1] = 0
+    queue.enqueue(2, 1)
+    queue.stop()
+    assert [r["student_id"] for r in queue.failed()] == [3]
+
+def test_class_statistics_follow_their_keys_across_retries(calls, monkeypatch):
+    refreshed = []
+    monkeypatch.setattr(
+        recalc_queue_module, "refresh_class_statistics", lambda db, class_ids: refreshed.append(sorted(class_ids))
+    )
+    calls.fail_times[1] = 1
+    queue = RecalculationQueue(max_delay=0, batch_size=100, retry_delay=0.05)
+    with queue._cond:  # cùng 1 lô
+        for student_id, semester_id, class_id in [(2, 1, 5), (2, 1, 6), (3, 1, 5), (4, 2, 7), (4, 2, None)]:
+            queue.enqueue(student_id, semester_id, class_id)
+    wait_until(lambda: len(calls.made) == 3)
+
+    # Học kỳ 1 lỗi lần đầu: lần thử lại vẫn tính lại thống kê các lớp của khóa đó
+    assert sorted(refreshed) == [[5, 6], [5, 6], [7]]
+    assert queue.snapshot() == {"pending": 0, "retrying": 0, "failed": []}
+    queue.stop()
+    assert not queue._class_ids
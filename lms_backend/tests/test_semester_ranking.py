@@ -0,0 +1,43 @@
+from sqlalchemy import event
+from app.models.semester_ranking import SemesterRanking
+from app.models.user import Student
+from app.utils.academic_calculator import calculate_all_students_in_semester
+from app.utils.semester_ranking import refresh_semester_rankings
+
+def rankings(db):
+    return sorted(
+        (row.scope, row.scope_key, row.student_id, row.rank, row.percentile, row.group_size)
+        for row in db.query(SemesterRanking).filter(SemesterRanking.semester_id == 2).all()
+    )
+
+def test_incremental_refresh_matches_full_refresh(small_db):
+    calculate_all_students_in_semester(2, small_db)
+    before = rankings(small_db)
+    assert {(scope, key) for scope, key, *_ in before} == {
+        ("department", "1"), ("department", "2"), ("cohort", "K66"), ("cohort", "K67")
+    }
+
+    # Sinh viên 3 chuyển từ khoa 2 sang khoa 1: cả nhóm cũ và nhóm mới được xếp lại
+    small_db.get(Student, 3).department_id = 1
+    small_db.flush()
+    department_filters = []
+
+    @event.listens_for(small_db.get_bind(), "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        # Tham số IN đã được mở rộng thành department_id_1_1, department_id_1_2, ...
+        department_filters.extend(
+            value for name, value in context.compiled_parameters[0].items() if name.startswith("department_id_")
+        )
+
+    try:
+        assert refresh_semester_rankings(small_db, 2, [3]) == 3
+    finally:
+        event.remove(small_db.get_bind(), "before_cursor_execute", capture)
+    small_db.commit()
+    incremental = rankings(small_db)
+
+    assert sorted(department_filters) == [1, 2]
+    small_db.query(SemesterRanking).delete()
+    refresh_semester_rankings(small_db, 2)
+    small_db.commit()
+    assert incremental == rankings(small_db) != before
@@ -0,0 +1,28 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from app.utils.slow_query_log import SlowQueryLog, normalize_sql, parameter_shape
+
+def test_normalize_sql_groups_same_query():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (?, ?, ?) AND name = 'x'") == \
+        normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?) AND name = 'yy'")
+    assert normalize_sql("SELECT a_1 FROM t LIMIT 10") == "SELECT a_1 FROM t LIMIT ?"
+    assert parameter_shape((1, "a", None)) == ["int", "str", "null"]
+    assert parameter_shape([(1,), (2,)], executemany=True) == {"executemany": 2, "row": ["int"]}
+
+def test_slow_queries_deduplicated_with_plan():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE t (id INTEGER PRIMARY KEY, v INTEGER)")
+
+    log = SlowQueryLog(threshold_ms=100, explain=True, max_entries=10)
+    log.observe(engine, "SELECT * FROM t WHERE v = ?", (1,), False, 0.05, "GET /fast")
+    for elapsed in (0.2, 0.4):
+        log.observe(engine, "SELECT * FROM t WHERE v = ?", (2,), False, elapsed, "GET /t")
+    log.observe(engine, "UPDATE t SET v = ?", [(1,), (2,)], True, 0.3, "job:recalc")
+    assert log.wait_for_plans()
+
+    select, update = log.snapshot()
+    assert (select["count"], select["max_ms"], select["routes"]) == (2, 400.0, {"GET /t": 2})
+    assert "SCAN t" in select["plan"]
+    assert update["plan"] is None
+    assert update["parameter_shape"] == {"executemany": 2, "row": ["int"]}
@@ -0,0 +1,29 @@
+from sqlalchemy import create_engine, text
+from app.utils.sql_instrumentation import (
+    RequestQueryStats, RouteQueryStats, instrument_engine, start_request, finish_request
+)
+
+def test_statements_counted_only_inside_request():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        stats, token = start_request()
+        try:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        finally:
+            finish_request(token)
+        conn.execute(text("SELECT 3"))
+
+    assert stats.count == 2
+    assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+    assert stats.server_timing().startswith("db;dur=")
+
+    routes = RouteQueryStats()
+    routes.record("GET /a", stats)
+    routes.record("GET /a", RequestQueryStats())
+    [row] = routes.snapshot()
+    assert (row["route"], row["requests"], row["avg_queries"], row["max_queries"]) == ("GET /a", 2, 1.0, 2)
@@ -0,0 +1,98 @@
+import datetime
+import pytest
+from app.core.config import settings
+from app.models.academic_standing import AcademicStanding
+from app.models.academic_year import AcademicResult, Semester
+from app.services.standing_service import evaluate_semester_standing
+from app.utils.academic_calculator import calculate_all_students_in_semester
+from conftest import SMALL_STUDENT_IDS
+
+@pytest.fixture
+def results(small_db):
+    """Kết quả 2 học kỳ, mặc định không sinh viên nào bị cảnh báo"""
+    for semester_id in (1, 2):
+        calculate_all_students_in_semester(semester_id, small_db)
+    small_db.query(AcademicResult).update({
+        AcademicResult.gpa: 3.0, AcademicResult.cpa: 3.0, AcademicResult.failed_credits: 0
+    })
+    small_db.commit()
+    return small_db
+
+def set_result(db, student_id, semester_id, **values):
+    db.query(AcademicResult).filter(
+        AcademicResult.student_id == student_id, AcademicResult.semester_id == semester_id
+    ).update(values)
+    db.commit()
+
+def standings(db, semester_id):
+    return {
+        student_id: (level, reasons)
+        for student_id, level, reasons in db.query(
+            AcademicStanding.student_id, AcademicStanding.warning_level, AcademicStanding.reasons
+        ).filter(AcademicStanding.semester_id == semester_id).all()
+    }
+
+def test_consecutive_warnings_escalate(results, monkeypatch):
+    monkeypatch.setattr(settings, "STANDING_MAX_WARNING_LEVEL", 2)
+    set_result(results, 2, 1, gpa=0.5)
+    set_result(results, 3, 1, cpa=1.0, failed_credits=9)
+    set_result(results, 2, 2, gpa=0.5)
+    set_result(results, 4, 2, failed_credits=12)
+
+    first = evaluate_semester_standing(1, results, chunk_size=2)
+    assert (first["evaluated"], first["warnings"], first["by_level"]) == (6, 2, {"0": 4, "1": 2})
+    assert standings(results, 1)[3] == (1, "LOW_CPA,FAILED_CREDITS")
+
+    second = evaluate_semester_standing(2, results, chunk_size=2)
+    assert second["by_reason"] == {"LOW_GPA": 1, "FAILED_CREDITS": 1}
+    current = standings(results, 2)
+    # 2: cảnh báo liên tiếp -> mức 2; 4: lần đầu -> mức 1; 3: hết cảnh báo -> mức 0
+    assert (current[2], current[4], current[3]) == ((2, "LOW_GPA"), (1, "FAILED_CREDITS"), (0, None))
+
+    # Đã ở mức tối đa thì không tăng thêm
+    results.query(AcademicStanding).filter(
+        AcademicStanding.semester_id == 1, AcademicStanding.student_id == 2
+    ).update({AcademicStanding.warning_level: 2})
+    results.commit()
+    evaluate_semester_standing(2, results)
+    assert standings(results, 2)[2] == (2, "LOW_GPA")
+
+def test_previous_semester_follows_start_date(results):
+    set_result(results, 2, 1, gpa=0.5)
+    set_result(results, 2, 2, gpa=0.5)
+    # 20232 bắt đầu trước 20231: học kỳ trước của 20231 là 20232
+    results.get(Semester, 2).start_date = datetime.date(2023, 8, 1)
+    results.commit()
+
+    evaluate_semester_standing(2, results)
+    evaluate_semester_standing(1, results)
+    assert standings(results, 2)[2] == (1, "LOW_GPA")
+    assert standings(results, 1)[2] == (2, "LOW_GPA")
+
+    # Học kỳ chen giữa (không có kết quả nào): chuỗi cảnh báo bắt đầu lại
+    results.add(Semester(
+        id=3, code="20230", name="20230", academic_year_id=1, semester_number=3,
+        start_date=datetime.date(2023, 8, 15), end_date=datetime.date(2023, 8, 31)
+    ))
+    results.commit()
+    evaluate_semester_standing(1, results)
+    assert standings(results, 1)[2] == (1, "LOW_GPA")
+
+def test_stale_standings_are_removed(results):
+    evaluate_semester_standing(1, results)
+    evaluate_semester_standing(2, results, chunk_size=4)
+    assert set(standings(results, 2)) == set(SMALL_STUDENT_IDS)
+
+    # Sinh viên 5 không còn tín chỉ được tính, kết quả của sinh viên 6 bị xóa
+    set_result(results, 5, 2, total_credits=0)
+    results.query(AcademicResult).filter(AcademicResult.student_id == 6, AcademicResult.semester_id == 2).delete()
+    results.commit()
+
+    report = evaluate_semester_standing(2, results, chunk_size=4)
+    assert report["evaluated"] == len(SMALL_STUDENT_IDS) - 2
+    assert set(standings(results, 2)) == set(SMALL_STUDENT_IDS) - {5, 6}
+    # Chỉ xóa trong học kỳ đang xét
+    assert set(standings(results, 1)) == set(SMALL_STUDENT_IDS)
+
+    with pytest.raises(ValueError):
+        evaluate_semester_standing(99, results)
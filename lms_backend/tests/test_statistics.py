@@ -0,0 +1,72 @@
+from collections import Counter, defaultdict
+import pytest
+from app.models.academic import Class, Course, Enrollment
+from app.models.user import Student
+from app.services.statistics_service import DISTRIBUTION_GROUPS, get_grade_distribution
+from app.utils.academic_calculator import GRADE_CONVERSION
+
+def enrollment_rows(db):
+    """(khóa theo từng group_by, điểm chữ, điểm thang 10) của mọi enrollment đã có điểm"""
+    rows = db.query(
+        Class.course_id, Enrollment.class_id, Student.department_id, Class.semester,
+        Enrollment.letter_grade, Enrollment.final_score
+    ).join(Class, Enrollment.class_id == Class.id).join(
+        Student, Student.user_id == Enrollment.student_id
+    ).filter(Enrollment.final_score.isnot(None)).all()
+    return [(dict(zip(DISTRIBUTION_GROUPS, row[:4])), row[4], row[5]) for row in rows]
+
+def expected_histograms(rows, group_by, bin_width):
+    scores, letters = defaultdict(list), defaultdict(Counter)
+    for keys, letter, score in rows:
+        scores[keys[group_by]].append(score)
+        letters[keys[group_by]][letter] += 1
+    return {
+        key: (len(values), dict(letters[key]), [
+            sum(1 for s in values if i * bin_width <= s < (i + 1) * bin_width or (s == 10.0 and (i + 1) * bin_width == 10.0))
+            for i in range(int(10 / bin_width))
+        ])
+        for key, values in scores.items()
+    }
+
+@pytest.fixture
+def db(small_db):
+    # Điểm đúng biên: 10 thuộc khoảng cuối, 5.0 thuộc khoảng [5, 6)
+    enrollments = small_db.query(Enrollment).order_by(Enrollment.id).limit(2).all()
+    enrollments[0].final_score, enrollments[0].letter_grade = 10.0, "A"
+    enrollments[1].final_score, enrollments[1].letter_grade = 5.0, "D+"
+    small_db.commit()
+    return small_db
+
+@pytest.mark.parametrize("group_by", DISTRIBUTION_GROUPS)
+@pytest.mark.parametrize("bin_width", [1.0, 0.5, 2.0])
+def test_distribution_matches_enrollments(db, group_by, bin_width):
+    expected = expected_histograms(enrollment_rows(db), group_by, bin_width)
+    result = get_grade_distribution(db, group_by=group_by, bin_width=bin_width)
+
+    assert [entry["key"] for entry in result] == sorted(expected, key=str)
+    for entry in result:
+        total, letters, bins = expected[entry["key"]]
+        assert entry["group_by"] == group_by and entry["total"] == total
+        assert entry["letters"] == {letter: letters.get(letter, 0) for _, _, _, letter in GRADE_CONVERSION}
+        assert [score["count"] for score in entry["scores"]] == bins
+        assert entry["scores"][-1]["max"] == 10.0
+
+def test_distribution_labels_and_filters(db):
+    courses = {entry["key"]: entry for entry in get_grade_distribution(db, group_by="course")}
+    course = db.get(Course, 1)
+    assert (courses[1]["code"], courses[1]["name"]) == (course.code, course.name)
+
+    classes = get_grade_distribution(db, group_by="class", semester_code="20232", course_id=2)
+    assert [(entry["key"], entry["code"]) for entry in classes] == [(6, db.get(Class, 6).code)]
+
+    departments = get_grade_distribution(db, group_by="department", department_id=2)
+    assert [(entry["key"], entry["name"]) for entry in departments] == [(2, "Khoa 2")]
+
+    rows = [row for row in enrollment_rows(db) if row[0]["department"] == 1 and row[0]["semester"] == "20231"]
+    semesters = get_grade_distribution(db, group_by="semester", semester_code="20231", department_id=1)
+    assert [(entry["key"], entry["code"], entry["total"]) for entry in semesters] == [("20231", "20231", len(rows))]
+
+    with pytest.raises(ValueError):
+        get_grade_distribution(db, group_by="student")
+    with pytest.raises(ValueError):
+        get_grade_distribution(db, bin_width=3)
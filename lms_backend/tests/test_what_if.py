@@ -0,0 +1,113 @@
+import time
+import pytest
+from app.models.academic import Class, Enrollment, Grade
+from app.schemas.academic import WhatIfRequest
+from app.services import what_if_service
+from app.utils.academic_calculator import refresh_enrollment_grade, weighted_average
+from app.utils.transcript_cache import TranscriptCache, transcript_cache
+from conftest import SMALL_CREDITS
+
+STUDENT_ID = 3
+
+def stored_points(db, semester_code):
+    rows = db.query(Enrollment.grade_4, Class.course_id).join(Class).filter(
+        Enrollment.student_id == STUDENT_ID, Class.semester == semester_code
+    ).all()
+    return sum(grade_4 * SMALL_CREDITS[course_id] for grade_4, course_id in rows), sum(SMALL_CREDITS.values())
+
+def test_scenario_projects_gpa_and_cpa(small_db):
+    transcript_cache.clear()
+    request = WhatIfRequest(scenarios=[
+        {"name": "all A", "scores": [
+            {"course_code": f"C{cid}", "grade_type": grade_type, "score": 10}
+            for cid in SMALL_CREDITS for grade_type in ("midterm", "final")
+        ]}
+    ])
+    result = what_if_service.simulate(STUDENT_ID, request, small_db)
+
+    points, credits = stored_points(small_db, "20232")
+    prior_points, prior_credits = stored_points(small_db, "20231")
+    assert result["semester_code"] == "20232"
+    assert result["current"]["gpa"] == weighted_average(points, credits)
+    assert result["current"]["cpa"] == weighted_average(prior_points + points, prior_credits + credits)
+
+    best = result["scenarios"][0]
+    assert best["name"] == "all A" and best["gpa"] == 4.0
+    assert best["cpa"] == weighted_average(prior_points + 4.0 * credits, prior_credits + credits)
+    assert all(course["letter_grade"] == "A" and course["passed"] for course in best["courses"])
+
+def test_scenario_validation(small_db):
+    too_many = WhatIfRequest(scenarios=[{"scores": []}] * (what_if_service.MAX_SCENARIOS + 1))
+    with pytest.raises(ValueError, match="At most"):
+        what_if_service.simulate(STUDENT_ID, too_many, small_db)
+
+    unknown_course = WhatIfRequest(scenarios=[{"scores": [{"course_code": "X1", "score": 5}]}])
+    with pytest.raises(ValueError, match="not in semester"):
+        what_if_service.simulate(STUDENT_ID, unknown_course, small_db)
+
+    assert what_if_service.simulate(STUDENT_ID, WhatIfRequest(semester_code="20991"), small_db) is None
+
+def test_grade_edit_invalidates_after_commit(small_db):
+    transcript_cache.clear()
+    before = what_if_service.simulate(STUDENT_ID, WhatIfRequest(), small_db)["current"]
+
+    grade = small_db.query(Grade).join(Enrollment).join(Class).filter(
+        Enrollment.student_id == STUDENT_ID, Class.semester == "20232", Grade.grade_type == "final"
+    ).order_by(Grade.id).first()
+    grade.score = 0.0 if grade.score > 5 else 10.0
+    refresh_enrollment_grade(grade.enrollment, small_db)
+
+    # Chưa commit: bảng điểm cache vẫn là dữ liệu đã commit
+    assert what_if_service.simulate(STUDENT_ID, WhatIfRequest(), small_db)["current"] == before
+    small_db.commit()
+    after = what_if_service.simulate(STUDENT_ID, WhatIfRequest(), small_db)["current"]
+    assert after["gpa"] != before["gpa"]
+    assert after["gpa"] == weighted_average(*stored_points(small_db, "20232"))
+
+def test_rollback_keeps_cached_transcript(small_db):
+    transcript_cache.clear()
+    what_if_service.simulate(STUDENT_ID, WhatIfRequest(), small_db)
+    enrollment = small_db.query(Enrollment).filter(Enrollment.student_id == STUDENT_ID).first()
+    refresh_enrollment_grade(enrollment, small_db)
+    small_db.rollback()
+    small_db.commit()
+    assert STUDENT_ID in transcript_cache._entries
+
+def test_cache_skips_results_loaded_across_invalidate():
+    cache = TranscriptCache(ttl=60)
+
+    def load_while_invalidated(student_id, value):
+        def loader():
+            cache.invalidate(student_id)
+            return value
+        return loader
+
+    assert cache.get_or_load(STUDENT_ID, "k", load_while_invalidated(STUDENT_ID, "stale")) == "stale"
+    assert cache.get_or_load(STUDENT_ID, "k", lambda: "fresh") == "fresh"
+    assert cache.get_or_load(STUDENT_ID, "k", lambda: "unused") == "fresh"
+
+    # Invalidate sinh viên khác trong lúc tải không chặn việc lưu cache
+    assert cache.get_or_load(4, "k", load_while_invalidated(5, "kept")) == "kept"
+    assert cache.get_or_load(4, "k", lambda: "unused") == "kept"
+
+def test_cache_state_stays_bounded():
+    cache = TranscriptCache(ttl=0.05, max_students=3)
+    for student_id in range(10):
+        cache.get_or_load(student_id, "k", lambda: student_id)
+        cache.invalidate(student_id + 100)
+    # Chỉ giữ sinh viên dùng gần nhất; không giữ generation khi không có lượt tải dở
+    assert list(cache._entries) == [7, 8, 9]
+    assert cache._generations == {} and cache._loading == {}
+
+    cache.get_or_load(8, "k", lambda: "unused")
+    cache.get_or_load(10, "k", lambda: 10)
+    assert list(cache._entries) == [9, 8, 10]
+
+    # Mục hết hạn bị bỏ khi sinh viên được nạp lại
+    time.sleep(0.06)
+    cache.get_or_load(8, "other", lambda: "other")
+    assert list(cache._entries[8]) == ["other"]
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load(11, "k", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert cache._loading == {} and 11 not in cache._entries
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import api from '../services/api';
 import { Plus, User, Mail, Phone, Trash2, Edit2 } from 'lucide-react';
 
@@ -31,6 +31,7 @@ const Students: React.FC = () => {
     const [page, setPage] = useState(0);
     const [pageSize] = useState(20);
     const [hasMore, setHasMore] = useState(true);
+    const cursors = useRef<string[]>([]);
 
     useEffect(() => {
         fetchStudents();
@@ -49,9 +50,14 @@ const Students: React.FC = () => {
     const fetchStudents = async () => {
         setLoading(true);
         try {
-            const response = await api.get(`/deans/students?skip=${page * pageSize}&limit=${pageSize}`);
+            // Trang sau dùng cursor server trả về (keyset), chỉ rơi về skip khi chưa có cursor
+            const cursor = cursors.current[page];
+            const query = cursor ? `cursor=${encodeURIComponent(cursor)}` : `skip=${page * pageSize}`;
+            const response = await api.get(`/deans/students?${query}&limit=${pageSize}`);
             setStudents(response.data);
-            setHasMore(response.data.length === pageSize);
+            const next = response.headers['x-next-cursor'];
+            if (next) cursors.current[page + 1] = next;
+            setHasMore(Boolean(next));
         } catch (err) {
             console.error(err);
         } finally {